@@ -1,3 +1,64 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.translation import gettext_lazy as _
+
+from . import importacion
+from .models import Cliente
 
 # Register your models here.
+
+
+class ImportarClientesForm(forms.Form):
+    archivo = forms.FileField(
+        label=_('Archivo'),
+        help_text=_('CSV con cabecera o JSONL (un objeto por línea) con los campos del cliente')
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if importacion.detectar_formato(archivo.name) is None:
+            raise forms.ValidationError(_('El archivo debe tener extensión .csv o .jsonl'))
+        return archivo
+
+
+@admin.register(Cliente)
+class ClienteAdmin(admin.ModelAdmin):
+    list_display = ('numero_identificacion', 'apellidos', 'nombres', 'telefono', 'ingreso_mensual', 'fecha_registro')
+    list_filter = ('tipo_identificacion', 'estado_civil')
+    search_fields = ('numero_identificacion', 'apellidos', 'nombres')
+    change_list_template = 'admin/clientes/cliente/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('importar/', self.admin_site.admin_view(self.importar_view), name='clientes_cliente_importar'),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        """Carga de un archivo CSV/JSONL con la misma importación que el comando import_clientes"""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:clientes_cliente_changelist')
+
+        form = ImportarClientesForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            # Se lee por fragmentos desde el archivo subido, sin cargarlo entero en memoria
+            resultado = importacion.importar_clientes(archivo.file, importacion.detectar_formato(archivo.name))
+            messages.success(request, _(
+                'Importadas %(leidas)d filas: %(creados)d nuevos, %(actualizados)d actualizados, '
+                '%(duplicados)d duplicados, %(errores)d con errores (%(filas_por_segundo).0f filas/s).'
+            ) % resultado)
+            for error in resultado['detalle_errores'][:20]:
+                messages.warning(request, _('Línea %(linea)d: %(errores)s') % error)
+            return redirect('admin:clientes_cliente_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': _('Importar clientes'),
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/clientes/cliente/importar.html', context)
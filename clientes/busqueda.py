@@ -0,0 +1,269 @@
+"""
+Índice de búsqueda de clientes por nombre, apellido o número de identificación.
+
+El índice guarda una copia normalizada (sin acentos y en minúsculas) de los
+campos buscables en una tabla aparte, mantenida al día por señales y por el
+comando rebuild_search_index:
+
+- SQLite: tabla virtual FTS5 con tokenizador de trigramas (búsqueda por
+  subcadena, ordenada por bm25).
+- PostgreSQL: tabla con índice GIN de trigramas (pg_trgm), ordenada por similitud.
+
+Con otros motores, o si el índice no está disponible, se recurre a __icontains.
+"""
+import logging
+import re
+import unicodedata
+
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+logger = logging.getLogger(__name__)
+
+TABLA_INDICE = 'clientes_cliente_busqueda'
+CAMPOS_INDEXADOS = ('nombres', 'apellidos', 'numero_identificacion')
+LONGITUD_MINIMA_TERMINO = 3  # Los trigramas no permiten buscar términos más cortos
+TAMANO_BLOQUE = 2000
+
+
+def normalizar(texto):
+    """Pasa el texto a minúsculas y elimina los acentos"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def terminos_busqueda(texto):
+    """
+    Divide la búsqueda en términos normalizados; todos deben aparecer en el
+    cliente. Los términos demasiado cortos para el índice se descartan.
+    """
+    return [
+        termino for termino in re.split(r'[\s,]+', normalizar(texto))
+        if len(termino) >= LONGITUD_MINIMA_TERMINO
+    ]
+
+
+class BackendSQLite:
+    def crear(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_INDICE} "
+            f"USING fts5({', '.join(CAMPOS_INDEXADOS)}, tokenize='trigram')"
+        )
+
+    def eliminar_tabla(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_INDICE}')
+
+    def indexar(self, cursor, filas):
+        self.eliminar(cursor, [fila[0] for fila in filas])
+        cursor.executemany(
+            f"INSERT INTO {TABLA_INDICE} (rowid, {', '.join(CAMPOS_INDEXADOS)}) VALUES (%s, %s, %s, %s)",
+            filas
+        )
+
+    def eliminar(self, cursor, ids):
+        cursor.executemany(f'DELETE FROM {TABLA_INDICE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def vaciar(self, cursor):
+        cursor.execute(f'DELETE FROM {TABLA_INDICE}')
+
+    def consulta(self, terminos):
+        # Cada término va entre comillas como frase; varios términos se combinan con AND
+        expresion = ' '.join('"%s"' % termino.replace('"', '""') for termino in terminos)
+        return f'SELECT rowid FROM {TABLA_INDICE} WHERE {TABLA_INDICE} MATCH %s', [expresion]
+
+    def consulta_ordenada(self, terminos, limite):
+        sql, params = self.consulta(terminos)
+        # bm25 devuelve valores menores cuanto más relevante es la coincidencia
+        return f'{sql} ORDER BY bm25({TABLA_INDICE}, 2.0, 2.0, 1.0) LIMIT %s', params + [limite]
+
+
+class BackendPostgreSQL:
+    def crear(self, cursor):
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLA_INDICE} '
+            f'(cliente_id bigint PRIMARY KEY, texto text NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLA_INDICE}_trgm '
+            f'ON {TABLA_INDICE} USING gin (texto gin_trgm_ops)'
+        )
+
+    def eliminar_tabla(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_INDICE}')
+
+    def indexar(self, cursor, filas):
+        cursor.executemany(
+            f'INSERT INTO {TABLA_INDICE} (cliente_id, texto) VALUES (%s, %s) '
+            f'ON CONFLICT (cliente_id) DO UPDATE SET texto = EXCLUDED.texto',
+            [(fila[0], ' '.join(fila[1:])) for fila in filas]
+        )
+
+    def eliminar(self, cursor, ids):
+        cursor.execute(f'DELETE FROM {TABLA_INDICE} WHERE cliente_id = ANY(%s)', [list(ids)])
+
+    def vaciar(self, cursor):
+        cursor.execute(f'TRUNCATE {TABLA_INDICE}')
+
+    def consulta(self, terminos):
+        condiciones = ' AND '.join(['texto LIKE %s'] * len(terminos))
+        params = ['%' + re.sub(r'([\\%_])', r'\\\1', termino) + '%' for termino in terminos]
+        return f'SELECT cliente_id FROM {TABLA_INDICE} WHERE {condiciones}', params
+
+    def consulta_ordenada(self, terminos, limite):
+        sql, params = self.consulta(terminos)
+        return (
+            f'{sql} ORDER BY similarity(texto, %s) DESC LIMIT %s',
+            params + [' '.join(terminos), limite]
+        )
+
+
+BACKENDS = {
+    'sqlite': BackendSQLite,
+    'postgresql': BackendPostgreSQL,
+}
+
+# Caché por alias de conexión: None si el índice no está disponible
+_backends_disponibles = {}
+
+
+def obtener_backend():
+    """Devuelve el backend del índice para la conexión actual, o None si no está disponible"""
+    if connection.alias not in _backends_disponibles:
+        backend = None
+        if connection.vendor in BACKENDS:
+            with connection.cursor() as cursor:
+                if TABLA_INDICE in connection.introspection.table_names(cursor):
+                    backend = BACKENDS[connection.vendor]()
+        _backends_disponibles[connection.alias] = backend
+    return _backends_disponibles[connection.alias]
+
+
+def crear_indice(schema_editor):
+    """Crea la tabla del índice si el motor lo permite"""
+    backend_class = BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is None:
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            backend_class().crear(cursor)
+    except DatabaseError as e:
+        # Por ejemplo, SQLite compilado sin FTS5: la búsqueda usará __icontains
+        logger.warning('No se pudo crear el índice de búsqueda de clientes: %s', e)
+    _backends_disponibles.pop(schema_editor.connection.alias, None)
+
+
+def eliminar_indice(schema_editor):
+    backend_class = BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is not None:
+        with schema_editor.connection.cursor() as cursor:
+            backend_class().eliminar_tabla(cursor)
+    _backends_disponibles.pop(schema_editor.connection.alias, None)
+
+
+def _filas_indice(filas):
+    """Convierte tuplas (id, nombres, apellidos, numero_identificacion) al formato del índice"""
+    return [(pk, *(normalizar(valor) for valor in valores)) for pk, *valores in filas]
+
+
+def indexar_clientes(filas):
+    """
+    Añade o actualiza clientes en el índice. Recibe tuplas
+    (id, nombres, apellidos, numero_identificacion).
+    """
+    backend = obtener_backend()
+    filas = _filas_indice(filas)
+    if backend is None or not filas:
+        return
+    with connection.cursor() as cursor:
+        backend.indexar(cursor, filas)
+
+
+def indexar_cliente(cliente):
+    indexar_clientes([(cliente.pk, *(getattr(cliente, campo) for campo in CAMPOS_INDEXADOS))])
+
+
+def desindexar_clientes(ids):
+    backend = obtener_backend()
+    ids = list(ids)
+    if backend is None or not ids:
+        return
+    with connection.cursor() as cursor:
+        backend.eliminar(cursor, ids)
+
+
+def reconstruir_indice(tamano_bloque=TAMANO_BLOQUE, modelo_cliente=None):
+    """
+    Vacía el índice y lo vuelve a llenar recorriendo los clientes por bloques.
+    La migración 0002_indice_busqueda tiene su propia copia de la tabla y la
+    normalización: si cambian aquí, hay que ejecutar rebuild_search_index.
+    """
+    if modelo_cliente is None:
+        from .models import Cliente as modelo_cliente
+
+    backend = obtener_backend()
+    if backend is None:
+        return 0
+    with connection.cursor() as cursor:
+        backend.vaciar(cursor)
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        filas = list(
+            modelo_cliente.objects.filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', *CAMPOS_INDEXADOS)[:tamano_bloque]
+        )
+        if not filas:
+            return total
+        with connection.cursor() as cursor:
+            backend.indexar(cursor, _filas_indice(filas))
+        total += len(filas)
+        ultimo_id = filas[-1][0]
+
+
+def _usa_indice(terminos):
+    return bool(terminos) and obtener_backend() is not None
+
+
+def q_clientes(texto, campo='pk', prefijo=''):
+    """
+    Devuelve un filtro Q para buscar clientes. `campo` es el campo que
+    contiene el id del cliente (por ejemplo 'cliente_id' desde otro modelo) y
+    `prefijo` la ruta a los campos del cliente para el filtro de respaldo
+    (por ejemplo 'cliente__').
+    """
+    terminos = terminos_busqueda(texto)
+    if _usa_indice(terminos):
+        sql, params = obtener_backend().consulta(terminos)
+        return Q(**{f'{campo}__in': RawSQL(sql, params)})
+
+    # Respaldo: búsqueda por subcadena sin índice
+    return (
+        Q(**{f'{prefijo}nombres__icontains': texto}) |
+        Q(**{f'{prefijo}apellidos__icontains': texto}) |
+        Q(**{f'{prefijo}numero_identificacion__icontains': texto})
+    )
+
+
+def filtrar_clientes(queryset, texto):
+    """Filtra un queryset de clientes por el texto de búsqueda"""
+    return queryset.filter(q_clientes(texto))
+
+
+def buscar_clientes(texto, limite=10):
+    """Devuelve hasta `limite` clientes que coinciden con el texto, los más relevantes primero"""
+    from .models import Cliente
+
+    terminos = terminos_busqueda(texto)
+    if not _usa_indice(terminos):
+        return list(filtrar_clientes(Cliente.objects.all(), texto)[:limite])
+
+    sql, params = obtener_backend().consulta_ordenada(terminos, limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ids = [fila[0] for fila in cursor.fetchall()]
+    clientes = Cliente.objects.in_bulk(ids)
+    return [clientes[pk] for pk in ids if pk in clientes]
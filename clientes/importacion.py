@@ -0,0 +1,189 @@
+"""
+Importación masiva de clientes desde CSV o JSONL.
+
+El archivo se lee fila a fila (sin cargarlo entero en memoria), cada fila se
+valida con las reglas de ClienteForm y las filas válidas se acumulan en un
+lote indexado por numero_identificacion: si el número se repite, gana la
+última fila. Cada lote se guarda en una transacción con un bulk_create con
+upsert sobre numero_identificacion (crea los nuevos y actualiza los
+existentes) y se actualiza el índice de búsqueda. De los clientes existentes
+solo se actualizan las columnas que trae el archivo: reimportar un archivo
+sin, por ejemplo, la columna notas conserva las notas guardadas. Un número repetido en
+lotes distintos también se resuelve a favor de la última fila, por el upsert.
+La memoria usada depende del tamaño del lote, no del archivo.
+
+La usan el comando import_clientes y la carga de archivos del admin.
+"""
+import csv
+import io
+import json
+import time
+
+from django import forms
+from django.db import transaction
+
+from . import busqueda, indice_prefijos
+from .forms import ClienteForm
+from .models import Cliente
+
+
+TAMANO_LOTE = 1000
+MAX_ERRORES_DETALLE = 100
+FORMATOS = ('csv', 'jsonl')
+
+
+class ClienteImportacionForm(forms.ModelForm):
+    """
+    Mismos campos y reglas que ClienteForm, sin los atributos de Bootstrap de
+    los widgets, que no se renderizan. La unicidad de numero_identificacion no
+    se valida fila a fila (sería una consulta por fila) porque la importación
+    actualiza los clientes existentes.
+    """
+    class Meta:
+        model = Cliente
+        fields = ClienteForm.Meta.fields
+
+    def validate_unique(self):
+        pass
+
+
+CAMPOS = tuple(ClienteImportacionForm._meta.fields)
+# Valores por defecto del modelo para las columnas que falten en el archivo
+VALORES_DEFECTO = {
+    campo: Cliente._meta.get_field(campo).get_default()
+    for campo in CAMPOS if Cliente._meta.get_field(campo).has_default()
+}
+
+
+def detectar_formato(nombre):
+    for formato in FORMATOS:
+        if nombre.lower().endswith('.' + formato):
+            return formato
+    return None
+
+
+def leer_filas(archivo, formato):
+    """Genera (número de línea, diccionario) a partir de un archivo binario"""
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        if formato == 'csv':
+            lector = csv.DictReader(texto)
+            for fila in lector:
+                yield lector.line_num, fila
+        else:
+            for numero, linea in enumerate(texto, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    fila = None
+                yield numero, fila if isinstance(fila, dict) else None
+    finally:
+        # No cerrar el archivo del llamador junto con el envoltorio de texto
+        texto.detach()
+
+
+def validar_fila(fila):
+    """
+    Devuelve (columnas, datos limpios, None) o (None, None, errores).
+    `columnas` son los campos que trae la fila, los únicos que se actualizan
+    en un cliente existente; los que faltan toman el valor por defecto del
+    modelo en los clientes nuevos.
+    """
+    if fila is None:
+        return None, None, {'__all__': ['Fila con formato inválido']}
+    datos = dict(VALORES_DEFECTO)
+    datos.update({campo: valor for campo, valor in fila.items() if campo in CAMPOS and valor not in (None, '')})
+
+    form = ClienteImportacionForm(data=datos)
+    if not form.is_valid():
+        return None, None, {campo: [str(error) for error in errores] for campo, errores in form.errors.items()}
+    return frozenset(fila).intersection(CAMPOS), form.cleaned_data, None
+
+
+def guardar_lote(lote, dry_run=False):
+    """
+    Inserta o actualiza un lote {numero_identificacion: (columnas, datos
+    limpios)}. Devuelve (creados, actualizados).
+    """
+    existentes = dict(
+        Cliente.objects.filter(numero_identificacion__in=lote.keys())
+        .values_list('numero_identificacion', 'pk')
+    )
+    if dry_run:
+        return len(lote) - len(existentes), len(existentes)
+
+    # Las filas se agrupan por columnas presentes (en un CSV, una sola vez)
+    por_columnas = {}
+    for columnas, datos in lote.values():
+        por_columnas.setdefault(columnas, []).append(Cliente(**datos))
+
+    with transaction.atomic():
+        # Un único INSERT ... ON CONFLICT (numero_identificacion) DO UPDATE por
+        # grupo: mucho más rápido que bulk_update, que genera un CASE por campo
+        for columnas, clientes in por_columnas.items():
+            Cliente.objects.bulk_create(
+                clientes,
+                update_conflicts=True,
+                unique_fields=['numero_identificacion'],
+                update_fields=[
+                    *(campo for campo in CAMPOS if campo in columnas and campo != 'numero_identificacion'),
+                    'actualizado',
+                ],
+            )
+        # bulk_create y bulk_update no envían señales: actualizar el índice de búsqueda aquí
+        busqueda.indexar_clientes(
+            Cliente.objects.filter(numero_identificacion__in=lote.keys())
+            .values_list('pk', *busqueda.CAMPOS_INDEXADOS)
+        )
+    if indice_prefijos.habilitado():
+        transaction.on_commit(indice_prefijos.indice.invalidar)
+    return len(lote) - len(existentes), len(existentes)
+
+
+def importar_clientes(archivo, formato, tamano_lote=TAMANO_LOTE, dry_run=False, progreso=None):
+    """
+    Importa los clientes de un archivo binario abierto. `progreso`, si se
+    indica, se llama con el resultado parcial después de cada lote.
+    """
+    resultado = {
+        'leidas': 0, 'creados': 0, 'actualizados': 0, 'duplicados': 0,
+        'errores': 0, 'detalle_errores': [], 'segundos': 0.0, 'filas_por_segundo': 0.0,
+    }
+    inicio = time.monotonic()
+    lote = {}
+
+    def medir():
+        resultado['segundos'] = time.monotonic() - inicio
+        resultado['filas_por_segundo'] = resultado['leidas'] / max(resultado['segundos'], 1e-9)
+
+    def guardar():
+        creados, actualizados = guardar_lote(lote, dry_run)
+        resultado['creados'] += creados
+        resultado['actualizados'] += actualizados
+        lote.clear()
+        medir()
+        if progreso:
+            progreso(resultado)
+
+    for linea, fila in leer_filas(archivo, formato):
+        resultado['leidas'] += 1
+        columnas, datos, errores = validar_fila(fila)
+        if errores:
+            resultado['errores'] += 1
+            if len(resultado['detalle_errores']) < MAX_ERRORES_DETALLE:
+                resultado['detalle_errores'].append({'linea': linea, 'errores': errores})
+            continue
+        numero = datos['numero_identificacion']
+        if numero in lote:
+            resultado['duplicados'] += 1
+            del lote[numero]  # La última aparición gana y conserva el orden de llegada
+        lote[numero] = (columnas, datos)
+        if len(lote) >= tamano_lote:
+            guardar()
+
+    if lote:
+        guardar()
+    medir()
+    return resultado
@@ -0,0 +1,231 @@
+"""
+Índice en memoria de prefijos para el autocompletado de clientes.
+
+Cada proceso (worker) mantiene un arreglo ordenado de pares (término, id) con
+las palabras normalizadas de nombres y apellidos y el número de
+identificación. El índice se construye la primera vez que se consulta, se
+actualiza de forma incremental con las señales de Cliente y se reconstruye
+cuando caduca (CLIENTES_INDICE_PREFIJOS_TTL), ya que los cambios hechos en
+otros workers no llegan por señales. Las búsquedas resuelven los ids en
+memoria y solo esos ids se leen de la base de datos.
+
+Se activa con CLIENTES_INDICE_PREFIJOS = True. Las estadísticas (memoria,
+latencia de las consultas) se publican a las funciones registradas con
+registrar_hook().
+"""
+import logging
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .busqueda import normalizar
+
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 5000
+FIN_PREFIJO = chr(0x10FFFF)
+
+
+def tokens_cliente(nombres, apellidos, numero_identificacion):
+    """Términos indexados de un cliente"""
+    palabras = re.split(r'\W+', normalizar(f'{nombres} {apellidos}'))
+    return tuple(sorted({palabra for palabra in palabras if palabra} | {normalizar(numero_identificacion)}))
+
+
+class IndicePrefijos:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._claves = None  # Lista ordenada de tuplas (término, id)
+        self._tokens = {}  # id -> términos del cliente, para poder retirarlo
+        self._construido_en = None
+        self._consultas = 0
+        self._latencia_total = 0.0
+        self._latencia_maxima = 0.0
+
+    @property
+    def construido(self):
+        return self._claves is not None
+
+    def construir(self):
+        """Carga todos los clientes de la base de datos por bloques"""
+        from .models import Cliente
+
+        inicio = time.perf_counter()
+        claves = []
+        tokens = {}
+        ultimo_id = 0
+        while True:
+            filas = list(
+                Cliente.objects.filter(pk__gt=ultimo_id).order_by('pk')
+                .values_list('pk', 'nombres', 'apellidos', 'numero_identificacion')[:TAMANO_BLOQUE]
+            )
+            if not filas:
+                break
+            for pk, nombres, apellidos, numero in filas:
+                terminos = tokens_cliente(nombres, apellidos, numero)
+                tokens[pk] = terminos
+                claves.extend((termino, pk) for termino in terminos)
+            ultimo_id = filas[-1][0]
+        claves.sort()
+
+        with self._lock:
+            self._claves = claves
+            self._tokens = tokens
+            self._construido_en = time.monotonic()
+
+        notificar('construccion', dict(
+            self.estadisticas(),
+            duracion_ms=(time.perf_counter() - inicio) * 1000,
+        ))
+
+    def invalidar(self):
+        with self._lock:
+            self._claves = None
+            self._tokens = {}
+
+    def _asegurar_construido(self):
+        caducado = (
+            self.ttl is not None and self._construido_en is not None
+            and time.monotonic() - self._construido_en > self.ttl
+        )
+        if not self.construido or caducado:
+            self.construir()
+
+    def actualizar(self, pk, nombres, apellidos, numero_identificacion):
+        """Añade o reemplaza un cliente. Si el índice aún no se construyó no hace nada."""
+        with self._lock:
+            if not self.construido:
+                return
+            self._retirar(pk)
+            terminos = tokens_cliente(nombres, apellidos, numero_identificacion)
+            for termino in terminos:
+                insort(self._claves, (termino, pk))
+            self._tokens[pk] = terminos
+
+    def eliminar(self, pk):
+        with self._lock:
+            if self.construido:
+                self._retirar(pk)
+
+    def _retirar(self, pk):
+        for termino in self._tokens.pop(pk, ()):
+            posicion = bisect_left(self._claves, (termino, pk))
+            if posicion < len(self._claves) and self._claves[posicion] == (termino, pk):
+                del self._claves[posicion]
+
+    def buscar(self, texto, limite=10):
+        """
+        Devuelve hasta `limite` ids de clientes en los que cada término de la
+        búsqueda es prefijo de alguna de sus palabras o de su identificación.
+        """
+        terminos = [termino for termino in re.split(r'\W+', normalizar(texto)) if termino]
+        if not terminos:
+            return []
+
+        self._asegurar_construido()
+        inicio = time.perf_counter()
+        with self._lock:
+            # Recorrer el rango del término más selectivo y comprobar el resto
+            rangos = [
+                (bisect_left(self._claves, (termino,)),
+                 bisect_left(self._claves, (termino + FIN_PREFIJO,)),
+                 termino)
+                for termino in terminos
+            ]
+            desde, hasta, termino_guia = min(rangos, key=lambda rango: rango[1] - rango[0])
+            otros = [termino for termino in terminos if termino != termino_guia]
+
+            ids = []
+            vistos = set()
+            for _termino, pk in self._claves[desde:hasta]:
+                if pk in vistos:
+                    continue
+                vistos.add(pk)
+                palabras = self._tokens[pk]
+                if all(any(palabra.startswith(otro) for palabra in palabras) for otro in otros):
+                    ids.append(pk)
+                    if len(ids) >= limite:
+                        break
+
+        latencia = time.perf_counter() - inicio
+        self._consultas += 1
+        self._latencia_total += latencia
+        self._latencia_maxima = max(self._latencia_maxima, latencia)
+        notificar('consulta', {'latencia_ms': latencia * 1000, 'resultados': len(ids)})
+        return ids
+
+    def estadisticas(self):
+        """Tamaño, memoria aproximada y latencia de las consultas del índice"""
+        with self._lock:
+            claves = self._claves or []
+            memoria = sys.getsizeof(claves) + sys.getsizeof(self._tokens)
+            memoria += sum(sys.getsizeof(clave) for clave in claves)
+            memoria += sum(sys.getsizeof(terminos) for terminos in self._tokens.values())
+            # Cada término se guarda una vez por cliente en las tuplas de _tokens
+            memoria += sum(
+                sys.getsizeof(termino) for terminos in self._tokens.values() for termino in terminos
+            )
+            return {
+                'construido': self.construido,
+                'clientes': len(self._tokens),
+                'entradas': len(claves),
+                'memoria_bytes': memoria,
+                'consultas': self._consultas,
+                'latencia_media_ms': (self._latencia_total / self._consultas * 1000) if self._consultas else 0.0,
+                'latencia_maxima_ms': self._latencia_maxima * 1000,
+            }
+
+
+_hooks = []
+
+
+def registrar_hook(funcion):
+    """
+    Registra una función que recibe (evento, datos) cada vez que el índice se
+    construye ('construccion', con sus estadísticas) o responde una consulta
+    ('consulta', con la latencia y el número de resultados).
+    """
+    _hooks.append(funcion)
+    return funcion
+
+
+def notificar(evento, datos):
+    for hook in _hooks:
+        try:
+            hook(evento, datos)
+        except Exception:
+            logger.exception('Error en un hook de estadísticas del índice de prefijos')
+
+
+@registrar_hook
+def _registrar_en_log(evento, datos):
+    if evento == 'construccion':
+        logger.info(
+            'Índice de prefijos construido: %(clientes)d clientes, %(entradas)d entradas, '
+            '%(memoria_bytes)d bytes en %(duracion_ms).1f ms', datos
+        )
+    else:
+        logger.debug('Consulta al índice de prefijos: %(resultados)d resultados en %(latencia_ms).3f ms', datos)
+
+
+indice = IndicePrefijos(ttl=getattr(settings, 'CLIENTES_INDICE_PREFIJOS_TTL', 300))
+
+
+def habilitado():
+    return getattr(settings, 'CLIENTES_INDICE_PREFIJOS', False)
+
+
+def buscar_clientes(texto, limite=10):
+    """Resuelve la búsqueda en memoria y lee de la base de datos solo los clientes encontrados"""
+    from .models import Cliente
+
+    ids = indice.buscar(texto, limite)
+    clientes = Cliente.objects.in_bulk(ids)
+    # Un id puede haber sido eliminado en otro worker: se descarta
+    return [clientes[pk] for pk in ids if pk in clientes]
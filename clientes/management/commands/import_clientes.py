@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clientes import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa clientes desde un archivo CSV o JSONL, validando cada fila con las '
+        'reglas de ClienteForm y creando o actualizando por numero_identificacion.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', type=Path, help='Archivo .csv o .jsonl (una fila por cliente)')
+        parser.add_argument(
+            '--formato', choices=importacion.FORMATOS,
+            help='Formato del archivo (por defecto se deduce de la extensión)'
+        )
+        parser.add_argument('--tamano-lote', type=int, default=importacion.TAMANO_LOTE,
+                            help='Clientes por lote (por defecto %(default)s)')
+        parser.add_argument('--dry-run', action='store_true', help='Validar sin escribir en la base de datos')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        formato = options['formato'] or importacion.detectar_formato(archivo.name)
+        if formato is None:
+            raise CommandError('No se reconoce el formato del archivo; use --formato csv|jsonl')
+        if options['tamano_lote'] < 1:
+            raise CommandError('--tamano-lote debe ser mayor que cero')
+        if not archivo.is_file():
+            raise CommandError(f'No existe el archivo {archivo}')
+
+        with archivo.open('rb') as origen:
+            resultado = importacion.importar_clientes(
+                origen, formato,
+                tamano_lote=options['tamano_lote'],
+                dry_run=options['dry_run'],
+                progreso=self.progreso if options['verbosity'] >= 2 else None,
+            )
+
+        for error in resultado['detalle_errores']:
+            self.stderr.write(f"  línea {error['linea']}: {error['errores']}")
+        if resultado['errores'] > len(resultado['detalle_errores']):
+            self.stderr.write(f"  ... y {resultado['errores'] - len(resultado['detalle_errores'])} errores más")
+
+        prefijo = 'Validadas' if options['dry_run'] else 'Importadas'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo} {resultado['leidas']} filas: {resultado['creados']} nuevos, "
+            f"{resultado['actualizados']} actualizados, {resultado['duplicados']} duplicados, "
+            f"{resultado['errores']} con errores en {resultado['segundos']:.1f}s "
+            f"({resultado['filas_por_segundo']:.0f} filas/s)"
+        ))
+
+    def progreso(self, resultado):
+        self.stdout.write(
+            f"  {resultado['leidas']} filas ({resultado['filas_por_segundo']:.0f} filas/s)"
+        )
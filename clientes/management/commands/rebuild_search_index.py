@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clientes import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de clientes (FTS5 en SQLite, pg_trgm en PostgreSQL).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-bloque', type=int, default=busqueda.TAMANO_BLOQUE,
+                            help='Clientes por bloque (por defecto %(default)s)')
+
+    def handle(self, *args, **options):
+        if busqueda.obtener_backend() is None:
+            raise CommandError(
+                'El índice de búsqueda no está disponible en esta base de datos; '
+                'se usará la búsqueda por subcadena.'
+            )
+
+        inicio = time.monotonic()
+        with transaction.atomic():
+            total = busqueda.reconstruir_indice(options['tamano_bloque'])
+        segundos = max(time.monotonic() - inicio, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexados {total} clientes en {segundos:.1f}s ({total / segundos:.0f} clientes/s)'
+        ))
@@ -0,0 +1,83 @@
+import logging
+import unicodedata
+
+from django.db import DatabaseError, migrations
+
+
+logger = logging.getLogger(__name__)
+
+# Copia congelada del índice de clientes/busqueda.py tal como era al crear esta
+# migración: las migraciones no deben depender del código actual de la app.
+TABLA_INDICE = 'clientes_cliente_busqueda'
+TAMANO_BLOQUE = 2000
+
+SQL_CREAR = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_INDICE} "
+        f"USING fts5(nombres, apellidos, numero_identificacion, tokenize='trigram')",
+    ],
+    'postgresql': [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE TABLE IF NOT EXISTS {TABLA_INDICE} (cliente_id bigint PRIMARY KEY, texto text NOT NULL)',
+        f'CREATE INDEX IF NOT EXISTS {TABLA_INDICE}_trgm ON {TABLA_INDICE} USING gin (texto gin_trgm_ops)',
+    ],
+}
+SQL_INSERTAR = {
+    'sqlite': (
+        f'INSERT INTO {TABLA_INDICE} (rowid, nombres, apellidos, numero_identificacion) '
+        f'VALUES (%s, %s, %s, %s)'
+    ),
+    'postgresql': f'INSERT INTO {TABLA_INDICE} (cliente_id, texto) VALUES (%s, %s)',
+}
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in SQL_CREAR:
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            for sql in SQL_CREAR[vendor]:
+                cursor.execute(sql)
+    except DatabaseError as e:
+        # Por ejemplo, SQLite compilado sin FTS5: la búsqueda usará __icontains
+        logger.warning('No se pudo crear el índice de búsqueda de clientes: %s', e)
+        return
+
+    Cliente = apps.get_model('clientes', 'Cliente')
+    ultimo_id = 0
+    while True:
+        filas = list(
+            Cliente.objects.using(schema_editor.connection.alias).filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', 'nombres', 'apellidos', 'numero_identificacion')[:TAMANO_BLOQUE]
+        )
+        if not filas:
+            break
+        filas_indice = [(pk, *(normalizar(valor) for valor in valores)) for pk, *valores in filas]
+        if vendor == 'postgresql':
+            filas_indice = [(pk, ' '.join(valores)) for pk, *valores in filas_indice]
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(SQL_INSERTAR[vendor], filas_indice)
+        ultimo_id = filas[-1][0]
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor in SQL_CREAR:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLA_INDICE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
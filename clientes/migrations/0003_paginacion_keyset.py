@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['apellidos', 'nombres', 'id'], name='clientes_apellidos_nombres_id'),
+        ),
+    ]
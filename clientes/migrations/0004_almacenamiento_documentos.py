@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:28
+
+import gestion_riesgo.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_paginacion_keyset'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentocliente',
+            name='archivo',
+            field=models.FileField(db_index=True, storage=gestion_riesgo.almacenamiento.almacenamiento_documentos, upload_to='clientes/documentos/', verbose_name='Archivo'),
+        ),
+    ]
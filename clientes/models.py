@@ -3,6 +3,8 @@ from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from gestion_riesgo.almacenamiento import almacenamiento_documentos
+
 class Cliente(models.Model):
     """
     Modelo para almacenar información de los clientes
@@ -69,6 +71,10 @@ class Cliente(models.Model):
         verbose_name = _('Cliente')
         verbose_name_plural = _('Clientes')
         ordering = ['apellidos', 'nombres']
+        indexes = [
+            # Paginación por cursor sobre el orden por defecto
+            models.Index(fields=['apellidos', 'nombres', 'id'], name='clientes_apellidos_nombres_id'),
+        ]
     
     def __str__(self):
         return f"{self.apellidos}, {self.nombres} - {self.get_tipo_identificacion_display()}: {self.numero_identificacion}"
@@ -135,7 +141,10 @@ class DocumentoCliente(models.Model):
     )
     archivo = models.FileField(
         _('Archivo'), 
-        upload_to='clientes/documentos/'
+        upload_to='clientes/documentos/',
+        # Un archivo por contenido, compartido entre documentos (ver gestion_riesgo/almacenamiento.py)
+        storage=almacenamiento_documentos,
+        db_index=True
     )
     fecha_subida = models.DateTimeField(_('Fecha de Subida'), auto_now_add=True)
     notas = models.TextField(_('Notas'), blank=True, null=True)
@@ -147,3 +156,10 @@ class DocumentoCliente(models.Model):
     
     def __str__(self):
         return f"{self.get_tipo_documento_display()} - {self.cliente}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Archivo al cargar, para ajustar las referencias de los blobs si cambia
+        instancia._archivo_original = instancia.__dict__.get('archivo')
+        return instancia
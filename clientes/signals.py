@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from gestion_riesgo import almacenamiento
+from . import busqueda, indice_prefijos
+from .models import Cliente, DocumentoCliente, ReferenciaPersonal
+
+
+@receiver(post_save, sender=Cliente)
+def indexar_cliente(sender, instance, raw=False, **kwargs):
+    """Mantiene los índices de búsqueda al día al crear o editar un cliente"""
+    if raw:
+        return
+    busqueda.indexar_cliente(instance)
+    if indice_prefijos.habilitado():
+        datos = (instance.pk, instance.nombres, instance.apellidos, instance.numero_identificacion)
+        transaction.on_commit(lambda: indice_prefijos.indice.actualizar(*datos))
+
+
+@receiver(post_delete, sender=Cliente)
+def desindexar_cliente(sender, instance, **kwargs):
+    busqueda.desindexar_clientes([instance.pk])
+    if indice_prefijos.habilitado():
+        pk = instance.pk
+        transaction.on_commit(lambda: indice_prefijos.indice.eliminar(pk))
+
+
+@receiver([post_save, post_delete], sender=ReferenciaPersonal)
+@receiver([post_save, post_delete], sender=DocumentoCliente)
+def marcar_cliente_modificado(sender, instance, raw=False, **kwargs):
+    """
+    Actualiza Cliente.actualizado al cambiar una referencia o un documento, que
+    no tienen fecha de modificación propia: invalida los fragmentos cacheados
+    de la ficha del cliente (ver ClienteDetailView)
+    """
+    if raw:
+        return
+    Cliente.objects.filter(pk=instance.cliente_id).update(actualizado=timezone.now())
+
+
+# Recuento de referencias de los blobs de documentos (ver gestion_riesgo/almacenamiento.py)
+post_save.connect(almacenamiento.contar_referencia_blob, sender=DocumentoCliente)
+post_delete.connect(almacenamiento.descontar_referencia_blob, sender=DocumentoCliente)
@@ -1,3 +1,208 @@
+import json
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from gestion_riesgo.testing import crear_analisis
+from . import busqueda, importacion, indice_prefijos
+from .models import Cliente, ReferenciaPersonal
+
+
+def crear_cliente(numero, nombres, apellidos):
+    return Cliente.objects.create(
+        numero_identificacion=numero,
+        nombres=nombres,
+        apellidos=apellidos,
+        fecha_nacimiento=date(1980, 1, 1),
+        lugar_nacimiento='Valencia',
+        estado_civil='soltero',
+        direccion='Calle Mayor 1',
+        telefono='600000000',
+        celular='600000001',
+        ocupacion='Docente',
+        lugar_trabajo='Colegio',
+        ingreso_mensual=2500,
+    )
+
+
+class BusquedaClientesTests(TestCase):
+    def setUp(self):
+        self.ana = crear_cliente('12345678', 'Ana María', 'Pérez Gómez')
+        self.jose = crear_cliente('87654321', 'José', 'Núñez')
+
+    def test_indice_disponible(self):
+        if connection.vendor == 'sqlite':
+            self.assertIsNotNone(busqueda.obtener_backend())
+
+    def test_sin_acentos_y_por_subcadena(self):
+        self.assertEqual(busqueda.buscar_clientes('perez'), [self.ana])
+        self.assertEqual(busqueda.buscar_clientes('NUÑEZ'), [self.jose])
+        self.assertEqual(busqueda.buscar_clientes('5678'), [self.ana])
+        self.assertEqual(busqueda.buscar_clientes('maria gomez'), [self.ana])
+
+    def test_sincronizado_por_senales(self):
+        self.jose.apellidos = 'Castillo'
+        self.jose.save()
+        self.assertEqual(busqueda.buscar_clientes('castillo'), [self.jose])
+        self.assertEqual(busqueda.buscar_clientes('nunez'), [])
+
+        self.jose.delete()
+        self.assertEqual(busqueda.buscar_clientes('castillo'), [])
+
+    def test_filtrar_queryset(self):
+        queryset = busqueda.filtrar_clientes(Cliente.objects.all(), 'jos')
+        self.assertEqual(list(queryset), [self.jose])
+
+    def test_reconstruir(self):
+        salida = StringIO()
+        call_command('rebuild_search_index', stdout=salida)
+        self.assertIn('Indexados 2 clientes', salida.getvalue())
+        self.assertEqual(busqueda.buscar_clientes('ana'), [self.ana])
+
+
+class IndicePrefijosTests(TestCase):
+    def setUp(self):
+        self.ana = crear_cliente('12345678', 'Ana María', 'Pérez Gómez')
+        self.andres = crear_cliente('87654321', 'Andrés', 'Núñez')
+        self.indice = indice_prefijos.IndicePrefijos()
+
+    def test_construccion_perezosa_y_busqueda(self):
+        self.assertFalse(self.indice.construido)
+        self.assertEqual(self.indice.buscar('an'), [self.ana.pk, self.andres.pk])
+        self.assertTrue(self.indice.construido)
+        self.assertEqual(self.indice.buscar('an gom'), [self.ana.pk])
+        self.assertEqual(self.indice.buscar('8765'), [self.andres.pk])
+        self.assertEqual(self.indice.buscar('nunez'), [self.andres.pk])
+
+    def test_actualizacion_incremental(self):
+        self.indice.construir()
+        self.indice.actualizar(self.andres.pk, 'Andrés', 'Castillo', '87654321')
+        self.assertEqual(self.indice.buscar('nunez'), [])
+        self.assertEqual(self.indice.buscar('cast'), [self.andres.pk])
+        self.indice.eliminar(self.andres.pk)
+        self.assertEqual(self.indice.buscar('and'), [])
+
+    def test_estadisticas_y_hook(self):
+        eventos = []
+        hook = indice_prefijos.registrar_hook(lambda evento, datos: eventos.append(evento))
+        try:
+            self.indice.buscar('ana')
+        finally:
+            indice_prefijos._hooks.remove(hook)
+        self.assertEqual(eventos, ['construccion', 'consulta'])
+        estadisticas = self.indice.estadisticas()
+        self.assertEqual(estadisticas['clientes'], 2)
+        self.assertGreater(estadisticas['memoria_bytes'], 0)
+        self.assertEqual(estadisticas['consultas'], 1)
+
+
+FILA_IMPORTACION = {
+    'numero_identificacion': '11112222', 'nombres': 'Lucía', 'apellidos': 'Ramos',
+    'fecha_nacimiento': '1990-02-03', 'lugar_nacimiento': 'Quito', 'estado_civil': 'casado',
+    'direccion': 'Av. Central 5', 'telefono': '600111222', 'celular': '600111223',
+    'ocupacion': 'Ingeniera', 'lugar_trabajo': 'Constructora', 'ingreso_mensual': '3200.50',
+}
+
+
+class ImportacionClientesTests(TestCase):
+    def setUp(self):
+        self.existente = crear_cliente('12345678', 'Ana María', 'Pérez Gómez')
+
+    def test_comando_csv_con_upsert_y_duplicados(self):
+        columnas = list(FILA_IMPORTACION)
+        filas = [
+            FILA_IMPORTACION,
+            dict(FILA_IMPORTACION, numero_identificacion='12345678', apellidos='Pérez Ortiz'),
+            dict(FILA_IMPORTACION, nombres='Lucía Elena'),  # Duplicado: gana esta fila
+            dict(FILA_IMPORTACION, numero_identificacion='99990000', fecha_nacimiento='no-es-fecha'),
+        ]
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = Path(directorio) / 'clientes.csv'
+            archivo.write_text(
+                ','.join(columnas) + '\n' + ''.join(','.join(fila[c] for c in columnas) + '\n' for fila in filas)
+            )
+            salida, errores = StringIO(), StringIO()
+            call_command('import_clientes', str(archivo), stdout=salida, stderr=errores)
+
+        self.assertIn('Importadas 4 filas: 1 nuevos, 1 actualizados, 1 duplicados, 1 con errores', salida.getvalue())
+        self.assertIn('línea 5', errores.getvalue())
+        self.assertEqual(Cliente.objects.get(numero_identificacion='11112222').nombres, 'Lucía Elena')
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.apellidos, 'Pérez Ortiz')
+        self.assertEqual(busqueda.buscar_clientes('ortiz'), [self.existente])
+
+    def test_reimportacion_parcial_conserva_columnas_ausentes(self):
+        Cliente.objects.filter(pk=self.existente.pk).update(notas='Cliente preferente', email='ana@example.com')
+        fila = dict(FILA_IMPORTACION, numero_identificacion='12345678', telefono='699999999')
+        resultado = importacion.importar_clientes(BytesIO((json.dumps(fila) + '\n').encode('utf-8')), 'jsonl')
+        self.assertEqual(resultado['actualizados'], 1)
+
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.telefono, '699999999')
+        self.assertEqual((self.existente.notas, self.existente.email), ('Cliente preferente', 'ana@example.com'))
+
+    def test_carga_desde_el_admin(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.client.force_login(admin)
+        archivo = SimpleUploadedFile('clientes.jsonl', (json.dumps(FILA_IMPORTACION) + '\n').encode('utf-8'))
+        respuesta = self.client.post(reverse('admin:clientes_cliente_importar'), {'archivo': archivo})
+        self.assertRedirects(respuesta, reverse('admin:clientes_cliente_changelist'))
+        self.assertTrue(Cliente.objects.filter(numero_identificacion='11112222').exists())
+
+
+class DetalleClienteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(get_user_model().objects.create_user('analista', password='clave-segura-123'))
+        self.cliente = crear_cliente('12345678', 'Ana', 'Pérez')
+        self.referencia = ReferenciaPersonal.objects.create(
+            cliente=self.cliente, nombre_completo='Luis Gómez', parentesco='Hermano',
+            telefono='611111111', direccion='Calle Real 2',
+        )
+        self.url = reverse('clientes:detalle', args=[self.cliente.pk])
+
+    def obtener(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta, len(consultas)
+
+    def test_fragmentos_cacheados_e_invalidados(self):
+        respuesta, en_frio = self.obtener()
+        self.assertContains(respuesta, 'Luis Gómez')
+        respuesta, en_caliente = self.obtener()
+        self.assertContains(respuesta, 'Luis Gómez')
+        # Referencias, documentos y análisis salen de la caché
+        self.assertEqual(en_frio - en_caliente, 3)
+
+        self.referencia.nombre_completo = 'Luis Gómez Ruiz'
+        self.referencia.save()
+        self.assertContains(self.obtener()[0], 'Luis Gómez Ruiz')
+
+        analisis = crear_analisis(self.cliente, plazo_meses=48)
+        self.assertContains(self.obtener()[0], '48 meses')
+        analisis.plazo_meses = 72
+        analisis.save()
+        respuesta = self.obtener()[0]
+        self.assertContains(respuesta, '72 meses')
+        self.assertNotContains(respuesta, '48 meses')
+
+    def test_fragmento_de_analisis_tras_recalculo_masivo(self):
+        crear_analisis(self.cliente, puntaje_credito=500)
+        self.assertContains(self.obtener()[0], '<td class="text-end">500</td>')
 
-# Create your tests here.
+        # rescore_portfolio guarda con bulk_update, que no pasa por save()
+        call_command('rescore_portfolio', stdout=StringIO())
+        respuesta = self.obtener()[0]
+        self.assertContains(respuesta, '<td class="text-end">700</td>')
+        self.assertContains(respuesta, 'puntaje 700')
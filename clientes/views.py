@@ -1,5 +1,7 @@
+from django.conf import settings
+from django.db.models import Count, Max, OuterRef, Subquery
 from django.shortcuts import render, get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, DeleteView
 )
@@ -7,27 +9,26 @@ from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.mixins import LoginRequiredMixin
 
+from gestion_riesgo.paginacion import KeysetPaginationMixin
+from .busqueda import filtrar_clientes
 from .models import Cliente, ReferenciaPersonal, DocumentoCliente
 from .forms import ClienteForm, ReferenciaPersonalForm, DocumentoClienteForm
 
 
-class ClienteListView(LoginRequiredMixin, ListView):
+class ClienteListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """Vista para listar todos los clientes"""
     model = Cliente
     template_name = 'clientes/cliente_list.html'
     context_object_name = 'clientes'
     paginate_by = 10
+    keyset_ordering = ('apellidos', 'nombres', 'pk')
     
     def get_queryset(self):
         queryset = super().get_queryset()
         # Filtro por búsqueda
         search = self.request.GET.get('q', '')
         if search:
-            queryset = queryset.filter(
-                models.Q(nombres__icontains=search) |
-                models.Q(apellidos__icontains=search) |
-                models.Q(numero_identificacion__icontains=search)
-            )
+            queryset = filtrar_clientes(queryset, search)
         return queryset
     
     def get_context_data(self, **kwargs):
@@ -37,16 +38,71 @@ class ClienteListView(LoginRequiredMixin, ListView):
         return context
 
 
+# Colecciones de la ficha del cliente que se pintan en fragmentos cacheados:
+# {relación: agregados que cambian cuando cambian sus filas}
+VERSIONES_RELACIONADAS = {
+    'referencias_personales': {'total': Count('pk'), 'ultimo': Max('pk')},
+    'documentos': {'total': Count('pk'), 'ultimo': Max('pk')},
+    'analisis_creditos': {'total': Count('pk'), 'ultimo': Max('pk'), 'modificado': Max('fecha_actualizacion')},
+}
+
+
+def _versiones_relacionadas():
+    """
+    Subconsultas correlacionadas con la versión de cada colección del cliente:
+    se leen en la misma consulta que el cliente y forman parte de la clave de
+    su fragmento. Las altas y bajas cambian el total o el último id; las
+    ediciones de referencias y documentos actualizan Cliente.actualizado (ver
+    signals.py) y las de análisis su fecha_actualizacion, que el QuerySet de
+    AnalisisCredito fija también en bulk_update y update.
+    """
+    anotaciones = {}
+    for relacion, agregados in VERSIONES_RELACIONADAS.items():
+        modelo = Cliente._meta.get_field(relacion).related_model
+        for nombre, agregado in agregados.items():
+            anotaciones[f'version_{relacion}_{nombre}'] = Subquery(
+                modelo.objects.filter(cliente=OuterRef('pk'))
+                .order_by().values('cliente').annotate(valor=agregado).values('valor')
+            )
+    return anotaciones
+
+
 class ClienteDetailView(LoginRequiredMixin, DetailView):
-    """Vista para ver los detalles de un cliente"""
+    """
+    Vista para ver los detalles de un cliente. Una sola consulta lee el
+    cliente, su resumen de crédito y las versiones de sus colecciones; cada
+    colección (referencias, documentos y análisis recientes) se consulta solo
+    si su fragmento no está en la caché.
+    """
     model = Cliente
     template_name = 'clientes/cliente_detail.html'
     context_object_name = 'cliente'
     
+    def get_queryset(self):
+        return (
+            super().get_queryset()
+            .select_related('resumen_credito')
+            .annotate(**_versiones_relacionadas())
+        )
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = _('Detalle del Cliente')
+        # None si el cliente no tiene análisis
+        context['resumen_credito'] = getattr(self.object, 'resumen_credito', None)
+        context['cache_timeout'] = settings.CLIENTES_DETALLE_CACHE_TIMEOUT
+        context['versiones'] = self.get_versiones()
         return context
+    
+    def get_versiones(self):
+        """Parte variable de la clave de cada fragmento: {relación: versión}"""
+        cliente = self.object
+        versiones = {}
+        for relacion, agregados in VERSIONES_RELACIONADAS.items():
+            partes = [cliente.actualizado.isoformat()]
+            partes += [str(getattr(cliente, f'version_{relacion}_{nombre}')) for nombre in agregados]
+            versiones[relacion] = '|'.join(partes)
+        return versiones
 
 
 class ClienteCreateView(LoginRequiredMixin, CreateView):
@@ -9,3 +9,7 @@ class ConsentLogAdmin(admin.ModelAdmin):
     list_filter = ("action", "analytics", "created_at")
     search_fields = ("ip", "user_agent")
     ordering = ("-created_at",)
+    # La tabla solo contiene los consentimientos vigentes (los caducados se
+    # archivan con archive_consent); evitar además el COUNT(*) sin filtros
+    show_full_result_count = False
+    list_select_related = ("user",)
@@ -0,0 +1,75 @@
+"""
+Cálculo de cuotas y tablas de amortización (sistema francés).
+
+El factor de anualidad r(1+r)^n / ((1+r)^n - 1) solo depende de la tasa y del
+plazo, por lo que se memoriza en una caché LRU acotada. La tabla completa se
+calcula con operaciones sobre arreglos en lugar de un bucle por periodo.
+"""
+from decimal import Decimal
+from functools import lru_cache
+
+import numpy as np
+
+
+MAX_FACTORES_EN_CACHE = 1024
+
+
+@lru_cache(maxsize=MAX_FACTORES_EN_CACHE)
+def factor_anualidad(tasa_interes, plazo_meses):
+    """Factor de anualidad para una tasa anual en porcentaje (Decimal) y un plazo en meses"""
+    tasa_mensual = (Decimal(tasa_interes) / 100) / 12
+    factor = (1 + tasa_mensual) ** plazo_meses
+    return (tasa_mensual * factor) / (factor - 1)
+
+
+def cuota_mensual(monto, tasa_interes, plazo_meses):
+    """Cuota mensual redondeada a dos decimales; 0 si no hay plazo o tasa"""
+    if not plazo_meses or not tasa_interes:
+        return 0
+    return round(monto * factor_anualidad(tasa_interes, plazo_meses), 2)
+
+
+def tabla_amortizacion(monto, tasa_interes, plazo_meses):
+    """
+    Devuelve la tabla de amortización como un diccionario de arreglos con el
+    periodo, la cuota, el interés, el capital amortizado y el saldo pendiente
+    al final de cada periodo. Con tasa 0 el capital se amortiza linealmente.
+    """
+    monto = float(monto)
+    plazo = int(plazo_meses)
+    if plazo < 1:
+        raise ValueError('El plazo debe ser de al menos un mes')
+    tasa_mensual = float(tasa_interes) / 100 / 12
+    periodos = np.arange(1, plazo + 1)
+
+    if tasa_mensual > 0:
+        cuota = monto * float(factor_anualidad(Decimal(tasa_interes), plazo))
+        crecimiento = np.power(1 + tasa_mensual, periodos)
+        saldo = monto * crecimiento - cuota * (crecimiento - 1) / tasa_mensual
+    else:
+        cuota = monto / plazo
+        saldo = monto - cuota * periodos
+
+    # El último saldo debe ser exactamente cero, sin residuos de coma flotante
+    saldo[-1] = 0.0
+    saldo_inicial = np.concatenate(([monto], saldo[:-1]))
+    interes = saldo_inicial * tasa_mensual
+    capital = saldo_inicial - saldo
+
+    return {
+        'periodo': periodos,
+        'cuota': interes + capital,
+        'interes': interes,
+        'capital': capital,
+        'saldo': saldo,
+    }
+
+
+def tabla_amortizacion_filas(monto, tasa_interes, plazo_meses):
+    """Tabla de amortización como lista de diccionarios, redondeada a dos decimales"""
+    tabla = tabla_amortizacion(monto, tasa_interes, plazo_meses)
+    columnas = {
+        nombre: (valores.tolist() if nombre == 'periodo' else np.round(valores, 2).tolist())
+        for nombre, valores in tabla.items()
+    }
+    return [dict(zip(columnas, fila)) for fila in zip(*columnas.values())]
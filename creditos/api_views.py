@@ -3,12 +3,93 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Q
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from clientes import busqueda, indice_prefijos
 from clientes.models import Cliente
-from .models import AnalisisCredito
+from gestion_riesgo.paginacion import CursorInvalido, KeysetPaginator
+from . import subidas
+from .forms import SubidaFragmentadaForm
+from .models import AnalisisCredito, ResumenCreditoCliente, SubidaFragmentada
+from .puntaje import evaluar_solicitudes
+from .amortizacion import tabla_amortizacion_filas
+from .views import filtrar_analisis, orden_keyset_analisis
+from decimal import Decimal, InvalidOperation
 import json
 
+# Límite de solicitudes por petición en la API de lotes
+MAX_SOLICITUDES_LOTE = 1000
+# Tamaño de página de los listados paginados por cursor
+LIMITE_PAGINA_DEFECTO = 20
+LIMITE_PAGINA_MAXIMO = 100
+
+
+def serializar_cliente(cliente):
+    return {
+        'id': cliente.id,
+        'nombres': cliente.nombres,
+        'apellidos': cliente.apellidos,
+        'tipo_identificacion': cliente.tipo_identificacion,
+        'tipo_identificacion_display': cliente.get_tipo_identificacion_display(),
+        'numero_identificacion': cliente.numero_identificacion,
+        'telefono': cliente.telefono or '',
+        'email': cliente.email or '',
+        'ingreso_mensual': float(cliente.ingreso_mensual) if cliente.ingreso_mensual else None,
+        'url': f'/clientes/{cliente.id}/',
+    }
+
+
+def serializar_analisis(analisis):
+    return {
+        'id': analisis.id,
+        'cliente_id': analisis.cliente_id,
+        'cliente': analisis.cliente.get_nombre_completo(),
+        'tipo_credito': analisis.tipo_credito,
+        'tipo_credito_display': analisis.get_tipo_credito_display(),
+        'monto_solicitado': float(analisis.monto_solicitado),
+        'plazo_meses': analisis.plazo_meses,
+        'tasa_interes': float(analisis.tasa_interes),
+        'estado': analisis.estado,
+        'estado_display': analisis.get_estado_display(),
+        'puntaje_credito': analisis.puntaje_credito,
+        'cuota_mensual_estimada': float(analisis.cuota_mensual_estimada),
+        'capacidad_pago': float(analisis.capacidad_pago),
+        'banda_riesgo': analisis.banda_riesgo,
+        'es_aprobable': analisis.es_aprobable,
+        'fecha_analisis': analisis.fecha_analisis.isoformat(),
+        'url': f'/creditos/{analisis.id}/',
+    }
+
+
+def respuesta_paginada(request, queryset, ordering, serializar):
+    """
+    Devuelve una página del queryset paginada por cursor. Parámetros GET:
+    cursor (el devuelto en "siguiente" o "anterior") y limite.
+    """
+    try:
+        limite = int(request.GET.get('limite', LIMITE_PAGINA_DEFECTO))
+    except ValueError:
+        limite = 0
+    if not 1 <= limite <= LIMITE_PAGINA_MAXIMO:
+        return JsonResponse({
+            'success': False,
+            'error': _('El límite debe estar entre 1 y %(max)d') % {'max': LIMITE_PAGINA_MAXIMO}
+        }, status=400)
+    
+    try:
+        pagina = KeysetPaginator(queryset, ordering, limite).page(request.GET.get('cursor'))
+    except CursorInvalido as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'count': len(pagina),
+        'siguiente': pagina.cursor_siguiente,
+        'anterior': pagina.cursor_anterior,
+        'results': [serializar(obj) for obj in pagina]
+    })
+
 @login_required
 @require_http_methods(["GET"])
 def buscar_clientes(request):
@@ -25,28 +106,14 @@ def buscar_clientes(request):
         }, status=400)
     
     try:
-        # Buscar clientes que coincidan con la consulta
-        clientes = Cliente.objects.filter(
-            Q(nombres__icontains=query) |
-            Q(apellidos__icontains=query) |
-            Q(numero_identificacion__icontains=query)
-        )[:10]  # Limitar a 10 resultados
+        # Buscar en el índice los clientes que coincidan, los más relevantes primero
+        if indice_prefijos.habilitado():
+            clientes = indice_prefijos.buscar_clientes(query, limite=10)  # Resuelto en memoria
+        else:
+            clientes = busqueda.buscar_clientes(query, limite=10)  # Limitar a 10 resultados
         
         # Serializar los resultados
-        resultados = []
-        for cliente in clientes:
-            resultados.append({
-                'id': cliente.id,
-                'nombres': cliente.nombres,
-                'apellidos': cliente.apellidos,
-                'tipo_identificacion': cliente.tipo_identificacion,
-                'tipo_identificacion_display': cliente.get_tipo_identificacion_display(),
-                'numero_identificacion': cliente.numero_identificacion,
-                'telefono': cliente.telefono or '',
-                'email': cliente.email or '',
-                'ingreso_mensual': float(cliente.ingreso_mensual) if cliente.ingreso_mensual else None,
-                'url': f'/clientes/{cliente.id}/',
-            })
+        resultados = [serializar_cliente(cliente) for cliente in clientes]
         
         return JsonResponse({
             'success': True,
@@ -60,6 +127,35 @@ def buscar_clientes(request):
             'error': str(e)
         }, status=500)
 
+@login_required
+@require_http_methods(["GET"])
+def listar_clientes(request):
+    """
+    API view para listar clientes ordenados por apellidos y nombres, paginados
+    por cursor. Admite el filtro de búsqueda q.
+    """
+    queryset = Cliente.objects.all()
+    query = request.GET.get('q', '').strip()
+    if query:
+        queryset = busqueda.filtrar_clientes(queryset, query)
+    return respuesta_paginada(request, queryset, ('apellidos', 'nombres', 'pk'), serializar_cliente)
+
+@login_required
+@require_http_methods(["GET"])
+def listar_analisis(request):
+    """
+    API view para listar análisis de crédito paginados por cursor, con los
+    mismos filtros y ordenamientos que la lista de análisis.
+    """
+    ordering = orden_keyset_analisis(request.GET)
+    if ordering is None:
+        return JsonResponse({
+            'success': False,
+            'error': _('El ordenamiento indicado no admite paginación por cursor')
+        }, status=400)
+    queryset = filtrar_analisis(AnalisisCredito.objects.select_related('cliente'), request.GET)
+    return respuesta_paginada(request, queryset, ordering, serializar_analisis)
+
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt  # Solo para desarrollo, en producción usar CSRF token
@@ -72,78 +168,65 @@ def calcular_puntaje_credito(request):
         # Obtener datos del cuerpo de la petición
         data = json.loads(request.body)
         
-        # Aquí iría la lógica real para calcular el puntaje de crédito
-        # Por ahora, devolvemos un valor simulado basado en los datos de entrada
-        
-        # Simular cálculo de puntaje (300-850)
-        puntaje_base = 650  # Puntaje base
+        # El cálculo se delega al núcleo vectorizado compartido con la API de lotes
+        resultado = evaluar_solicitudes([data])[0]
+        if not resultado['success']:
+            return JsonResponse({
+                'success': False,
+                'error': _('Datos de la solicitud inválidos'),
+                'errores': resultado['errores']
+            }, status=400)
         
-        # Ajustes basados en ingresos vs gastos
-        ingresos = float(data.get('ingresos_mensuales', 0))
-        gastos = float(data.get('gastos_mensuales', 0))
-        deuda_actual = float(data.get('deuda_actual', 0))
-        monto_solicitado = float(data.get('monto_solicitado', 0))
+        return JsonResponse(resultado)
         
-        if ingresos > 0:
-            # Ajuste por relación deuda/ingresos
-            deuda_total = deuda_actual + monto_solicitado
-            ratio_deuda_ingresos = deuda_total / (ingresos * 12)  # Deuda total vs ingreso anual
-            
-            if ratio_deuda_ingresos < 0.3:
-                puntaje_base += 50
-            elif ratio_deuda_ingresos > 0.8:
-                puntaje_base -= 100
-                
-            # Ajuste por capacidad de ahorro
-            capacidad_ahorro = (ingresos - gastos) / ingresos if ingresos > 0 else 0
-            if capacidad_ahorro > 0.3:
-                puntaje_base += 50
-            elif capacidad_ahorro < 0.1:
-                puntaje_base -= 50
-        
-        # Ajuste por monto solicitado
-        if monto_solicitado > 0:
-            if monto_solicitado > ingresos * 12:  # Si el monto es mayor al ingreso anual
-                puntaje_base -= 100
-            
-        # Asegurar que el puntaje esté dentro del rango 300-850
-        puntaje = max(300, min(850, puntaje_base))
-        
-        # Determinar nivel de riesgo
-        if puntaje >= 800:
-            nivel_riesgo = 'Excelente'
-            clase_riesgo = 'success'
-        elif puntaje >= 700:
-            nivel_riesgo = 'Bueno'
-            clase_riesgo = 'success'
-        elif puntaje >= 600:
-            nivel_riesgo = 'Aceptable'
-            clase_riesgo = 'warning'
-        else:
-            nivel_riesgo = 'Riesgoso'
-            clase_riesgo = 'danger'
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': _('Formato de datos inválido')
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt  # Solo para desarrollo, en producción usar CSRF token
+def calcular_puntaje_credito_lote(request):
+    """
+    API view para calcular el puntaje de crédito de varias solicitudes a la vez.
+    Se espera un JSON con una lista de solicitudes, o un objeto con la clave
+    "solicitudes". Cada resultado incluye su índice y, si la solicitud no es
+    válida, sus errores de validación.
+    """
+    try:
+        data = json.loads(request.body)
+        solicitudes = data.get('solicitudes') if isinstance(data, dict) else data
         
-        # Calcular cuota mensual estimada
-        plazo_meses = int(data.get('plazo_meses', 12))
-        tasa_interes = float(data.get('tasa_interes', 0)) / 100 / 12  # Tasa mensual
+        if not isinstance(solicitudes, list):
+            return JsonResponse({
+                'success': False,
+                'error': _('Se esperaba una lista de solicitudes')
+            }, status=400)
         
-        if plazo_meses > 0 and tasa_interes > 0 and monto_solicitado > 0:
-            factor = (1 + tasa_interes) ** plazo_meses
-            cuota_mensual = (monto_solicitado * tasa_interes * factor) / (factor - 1)
-        else:
-            cuota_mensual = 0
+        if len(solicitudes) > MAX_SOLICITUDES_LOTE:
+            return JsonResponse({
+                'success': False,
+                'error': _('Se admiten como máximo %(max)d solicitudes por lote') % {
+                    'max': MAX_SOLICITUDES_LOTE
+                }
+            }, status=400)
         
-        # Calcular capacidad de pago (30% del ingreso disponible)
-        capacidad_pago = (ingresos - gastos) * 0.3 if ingresos > gastos else 0
+        resultados = evaluar_solicitudes(solicitudes)
+        for indice, resultado in enumerate(resultados):
+            resultado['indice'] = indice
         
         return JsonResponse({
             'success': True,
-            'puntaje': puntaje,
-            'nivel_riesgo': nivel_riesgo,
-            'clase_riesgo': clase_riesgo,
-            'cuota_mensual': round(cuota_mensual, 2),
-            'capacidad_pago': round(capacidad_pago, 2),
-            'recomendacion_aprobacion': puntaje >= 650 and cuota_mensual <= capacidad_pago
+            'count': len(resultados),
+            'errores': sum(1 for resultado in resultados if not resultado['success']),
+            'results': resultados
         })
         
     except json.JSONDecodeError:
@@ -157,6 +240,40 @@ def calcular_puntaje_credito(request):
             'error': str(e)
         }, status=500)
 
+@login_required
+@require_http_methods(["GET"])
+def tabla_amortizacion(request):
+    """
+    API view para obtener la tabla de amortización de un préstamo.
+    Parámetros GET: monto, tasa (anual en porcentaje) y plazo (en meses).
+    """
+    try:
+        monto = Decimal(request.GET.get('monto', ''))
+        tasa = Decimal(request.GET.get('tasa', ''))
+        plazo = int(request.GET.get('plazo', ''))
+    except (InvalidOperation, ValueError):
+        return JsonResponse({
+            'success': False,
+            'error': _('Los parámetros monto, tasa y plazo son obligatorios y numéricos')
+        }, status=400)
+    
+    if not monto.is_finite() or monto <= 0 or not tasa.is_finite() or not 0 <= tasa <= 100 or not 1 <= plazo <= 360:
+        return JsonResponse({
+            'success': False,
+            'error': _('Valores fuera de rango: monto > 0, tasa entre 0 y 100, plazo entre 1 y 360')
+        }, status=400)
+    
+    periodos = tabla_amortizacion_filas(monto, tasa, plazo)
+    total_intereses = round(sum(periodo['interes'] for periodo in periodos), 2)
+    
+    return JsonResponse({
+        'success': True,
+        'cuota_mensual': periodos[0]['cuota'],
+        'total_intereses': total_intereses,
+        'total_pagado': round(float(monto) + total_intereses, 2),
+        'periodos': periodos
+    })
+
 @login_required
 @require_http_methods(["GET"])
 def obtener_datos_cliente(request, cliente_id):
@@ -164,12 +281,9 @@ def obtener_datos_cliente(request, cliente_id):
     API view para obtener los datos de un cliente específico por su ID.
     """
     try:
-        cliente = Cliente.objects.get(pk=cliente_id)
-        
-        # Obtener el último análisis de crédito del cliente (si existe)
-        ultimo_analisis = AnalisisCredito.objects.filter(
-            cliente=cliente
-        ).order_by('-fecha_analisis').first()
+        # Una sola consulta: el resumen materializado incluye el último análisis
+        cliente = Cliente.objects.select_related('resumen_credito').get(pk=cliente_id)
+        resumen = ResumenCreditoCliente.de_cliente(cliente)
         
         # Datos del cliente
         datos_cliente = {
@@ -184,24 +298,37 @@ def obtener_datos_cliente(request, cliente_id):
             'fecha_registro': cliente.fecha_registro.strftime('%d/%m/%Y') if cliente.fecha_registro else None,
         }
         
-        # Datos del último análisis (si existe)
+        # Datos del último análisis y totales (si tiene análisis)
         datos_analisis = None
-        if ultimo_analisis:
+        datos_resumen = None
+        if resumen and resumen.ultimo_analisis_id:
             datos_analisis = {
-                'fecha': ultimo_analisis.fecha_analisis.strftime('%d/%m/%Y'),
-                'tipo_credito': ultimo_analisis.get_tipo_credito_display(),
-                'monto_solicitado': float(ultimo_analisis.monto_solicitado) if ultimo_analisis.monto_solicitado else None,
-                'plazo_meses': ultimo_analisis.plazo_meses,
-                'tasa_interes': float(ultimo_analisis.tasa_interes) if ultimo_analisis.tasa_interes else None,
-                'estado': ultimo_analisis.get_estado_display(),
-                'puntaje_credito': ultimo_analisis.puntaje_credito,
-                'url': ultimo_analisis.get_absolute_url(),
+                'fecha': resumen.ultimo_fecha.strftime('%d/%m/%Y'),
+                'tipo_credito': resumen.get_ultimo_tipo_credito_display(),
+                'monto_solicitado': float(resumen.ultimo_monto) if resumen.ultimo_monto else None,
+                'plazo_meses': resumen.ultimo_plazo,
+                'tasa_interes': float(resumen.ultimo_tasa) if resumen.ultimo_tasa else None,
+                'estado': resumen.get_ultimo_estado_display(),
+                'puntaje_credito': resumen.ultimo_puntaje,
+                'url': reverse('creditos:analisis_detalle', kwargs={'pk': resumen.ultimo_analisis_id}),
+            }
+        if resumen:
+            datos_resumen = {
+                'total_analisis': resumen.total_analisis,
+                'pendientes': resumen.pendientes,
+                'aprobados': resumen.aprobados,
+                'rechazados': resumen.rechazados,
+                'en_espera': resumen.en_espera,
+                'cancelados': resumen.cancelados,
+                'monto_aprobado': float(resumen.monto_aprobado),
+                'deuda_actual': float(resumen.deuda_actual),
             }
         
         return JsonResponse({
             'success': True,
             'cliente': datos_cliente,
-            'ultimo_analisis': datos_analisis
+            'ultimo_analisis': datos_analisis,
+            'resumen': datos_resumen
         })
         
     except Cliente.DoesNotExist:
@@ -214,3 +341,140 @@ def obtener_datos_cliente(request, cliente_id):
             'success': False,
             'error': str(e)
         }, status=500)
+
+
+def serializar_subida(subida):
+    return {
+        'id': str(subida.pk),
+        'nombre_archivo': subida.nombre_archivo,
+        'tamano': subida.tamano,
+        'tamano_fragmento': subida.tamano_fragmento,
+        'total_fragmentos': subida.total_fragmentos,
+        'fragmentos_recibidos': subida.fragmentos_recibidos,
+        'estado': subida.estado,
+        'url': reverse('creditos:api_subida', kwargs={'subida_id': subida.pk}),
+    }
+
+
+def subida_no_encontrada():
+    return JsonResponse({
+        'success': False,
+        'error': _('Subida no encontrada')
+    }, status=404)
+
+
+def error_subida(e):
+    return JsonResponse({'success': False, 'error': str(e)}, status=e.estado)
+
+
+@login_required
+@require_http_methods(["POST"])
+def iniciar_subida(request):
+    """
+    API view para iniciar la subida por fragmentos de un documento de un
+    análisis o de un cliente (ver creditos/subidas.py). Se espera un JSON con
+    analisis o cliente, tipo_documento, notas, nombre_archivo y tamano.
+    """
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        data = None
+    if not isinstance(data, dict):
+        return JsonResponse({
+            'success': False,
+            'error': _('Formato de datos inválido')
+        }, status=400)
+    
+    form = SubidaFragmentadaForm(data)
+    if not form.is_valid():
+        return JsonResponse({
+            'success': False,
+            'error': _('Datos de la subida inválidos'),
+            'errores': form.errors
+        }, status=400)
+    
+    subida = subidas.iniciar(request.user, form.cleaned_data)
+    return JsonResponse({'success': True, 'subida': serializar_subida(subida)}, status=201)
+
+
+@login_required
+@require_http_methods(["GET", "DELETE"])
+def estado_subida(request, subida_id):
+    """API view con el progreso de una subida por fragmentos (GET) o para cancelarla (DELETE)"""
+    try:
+        subida = SubidaFragmentada.objects.get(pk=subida_id, usuario=request.user)
+    except SubidaFragmentada.DoesNotExist:
+        return subida_no_encontrada()
+    
+    if request.method == 'DELETE':
+        try:
+            subidas.cancelar(subida)
+        except subidas.ErrorSubida as e:
+            return error_subida(e)
+        return JsonResponse({'success': True})
+    return JsonResponse({'success': True, 'subida': serializar_subida(subida)})
+
+
+@login_required
+@require_http_methods(["PUT"])
+def subir_fragmento(request, subida_id, numero):
+    """
+    API view que recibe el fragmento `numero` de una subida como cuerpo de la
+    petición. El cuerpo se copia al archivo temporal por bloques: no se usa
+    request.body, que lo cargaría entero en memoria.
+    """
+    try:
+        subida = SubidaFragmentada.objects.get(pk=subida_id, usuario=request.user)
+    except SubidaFragmentada.DoesNotExist:
+        return subida_no_encontrada()
+    
+    try:
+        longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        longitud = 0
+    try:
+        escrito = subidas.escribir_fragmento(
+            subida, numero, request, longitud, request.headers.get('X-Checksum-SHA256')
+        )
+    except subidas.ErrorSubida as e:
+        return error_subida(e)
+    
+    return JsonResponse({'success': True, 'escrito': escrito, 'subida': serializar_subida(subida)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def finalizar_subida(request, subida_id):
+    """
+    API view que comprueba la suma de comprobación de una subida completa y
+    crea el documento. Se espera un JSON con sha256 (ver creditos/subidas.py).
+    """
+    try:
+        subida = SubidaFragmentada.objects.get(pk=subida_id, usuario=request.user)
+    except SubidaFragmentada.DoesNotExist:
+        return subida_no_encontrada()
+    
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        data = None
+    if not isinstance(data, dict) or not isinstance(data.get('sha256'), str):
+        return JsonResponse({
+            'success': False,
+            'error': _('Se esperaba un JSON con la suma de comprobación sha256')
+        }, status=400)
+    
+    try:
+        documento = subidas.finalizar(subida, data['sha256'])
+    except subidas.ErrorSubida as e:
+        return error_subida(e)
+    
+    if subida.analisis_id:
+        url_destino = reverse('creditos:analisis_detalle', kwargs={'pk': subida.analisis_id})
+    else:
+        url_destino = reverse('clientes:detalle', kwargs={'pk': subida.cliente_id})
+    return JsonResponse({
+        'success': True,
+        'documento': {'id': documento.pk, 'url': documento.archivo.url},
+        'redirect': url_destino
+    }, status=201)
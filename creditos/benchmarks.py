@@ -0,0 +1,268 @@
+"""
+Micro-benchmarks de las funciones de puntaje y de cálculo financiero.
+
+Cada benchmark mide una ruta caliente (la cuota mensual, la capacidad de
+pago, el nivel de riesgo, las reglas de aprobación y el puntaje de la API)
+sobre una muestra fija de análisis sin guardar, generada con una semilla,
+de modo que no toca la base de datos y dos ejecuciones miden lo mismo. El
+tiempo se da en nanosegundos por operación: el mínimo de varias
+repeticiones, que es la cifra más estable, y la mediana.
+
+Los resultados se guardan como JSON (la línea base) y `comparar` marca como
+regresión todo benchmark cuyo tiempo supere al de la línea base en más del
+umbral indicado. Las líneas base solo son comparables en la misma máquina.
+"""
+import json
+import platform
+import random
+import statistics
+import timeit
+from decimal import Decimal
+
+import django
+import numpy as np
+from django.utils import timezone
+
+from .amortizacion import cuota_mensual, factor_anualidad
+from .puntaje import CAMPOS_SOLICITUD, calcular_puntajes, evaluar_solicitudes
+from .riesgo import CAMPOS_ENTRADA, calcular_capacidad_pago, calcular_metricas
+
+
+VERSION = 1
+MUESTRAS = 200
+SEMILLA = 20240101
+REPETICIONES = 7
+# Segundos que debe durar como mínimo cada repetición
+TIEMPO_MINIMO = 0.2
+UMBRAL = 10.0  # % de aumento a partir del cual hay regresión
+
+BENCHMARKS = {}
+
+
+def benchmark(nombre):
+    """
+    Registra un benchmark. La función recibe la muestra de análisis y
+    devuelve (función sin argumentos a medir, operaciones por llamada).
+    """
+    def registrar(preparar):
+        BENCHMARKS[nombre] = preparar
+        return preparar
+    return registrar
+
+
+def generar_muestra(cantidad=MUESTRAS, semilla=SEMILLA):
+    """Análisis sin guardar con valores representativos de la cartera"""
+    from .models import AnalisisCredito
+
+    aleatorio = random.Random(semilla)
+    muestra = []
+    for _ in range(cantidad):
+        ingresos = aleatorio.randrange(800, 15000)
+        muestra.append(AnalisisCredito(
+            tipo_credito=aleatorio.choice(AnalisisCredito.TipoCredito.values),
+            # Algunos análisis todavía sin puntaje, como en la cartera real
+            puntaje_credito=aleatorio.randrange(300, 851) if aleatorio.random() > 0.05 else None,
+            ingresos_mensuales=Decimal(ingresos),
+            gastos_mensuales=Decimal(int(ingresos * aleatorio.uniform(0.2, 0.9))),
+            deuda_actual=Decimal(aleatorio.randrange(0, 60000)),
+            monto_solicitado=Decimal(aleatorio.randrange(1000, 250000)),
+            plazo_meses=aleatorio.choice((12, 24, 36, 48, 60, 120, 240, 360)),
+            tasa_interes=Decimal(aleatorio.randrange(300, 2500)) / 100,
+        ))
+    return muestra
+
+
+def _solicitud(analisis):
+    """Cuerpo de una petición a la API de puntaje con los datos de un análisis"""
+    return {
+        campo: analisis.plazo_meses if campo == 'plazo_meses' else str(getattr(analisis, campo))
+        for campo in CAMPOS_SOLICITUD
+    }
+
+
+@benchmark('cuota_mensual_estimada')
+def _cuota_mensual_estimada(muestra):
+    entradas = [(a.monto_solicitado, a.tasa_interes, a.plazo_meses) for a in muestra]
+
+    def ejecutar():
+        for monto, tasa, plazo in entradas:
+            cuota_mensual(monto, tasa, plazo)
+    return ejecutar, len(entradas)
+
+
+@benchmark('factor_anualidad_sin_cache')
+def _factor_anualidad_sin_cache(muestra):
+    # El coste de un par (tasa, plazo) que todavía no está en la caché LRU
+    entradas = [(a.tasa_interes, a.plazo_meses) for a in muestra]
+    calcular = factor_anualidad.__wrapped__
+
+    def ejecutar():
+        for tasa, plazo in entradas:
+            calcular(tasa, plazo)
+    return ejecutar, len(entradas)
+
+
+@benchmark('capacidad_pago')
+def _capacidad_pago(muestra):
+    entradas = [(a.ingresos_mensuales, a.gastos_mensuales) for a in muestra]
+
+    def ejecutar():
+        for ingresos, gastos in entradas:
+            calcular_capacidad_pago(ingresos, gastos)
+    return ejecutar, len(entradas)
+
+
+@benchmark('nivel_riesgo')
+def _nivel_riesgo(muestra):
+    def ejecutar():
+        for analisis in muestra:
+            analisis.nivel_riesgo
+    return ejecutar, len(muestra)
+
+
+@benchmark('puede_aprobar')
+def _puede_aprobar(muestra):
+    def ejecutar():
+        for analisis in muestra:
+            analisis.puede_aprobar()
+    return ejecutar, len(muestra)
+
+
+@benchmark('calcular_metricas')
+def _calcular_metricas(muestra):
+    entradas = [tuple(getattr(a, campo) for campo in CAMPOS_ENTRADA) for a in muestra]
+
+    def ejecutar():
+        for entrada in entradas:
+            calcular_metricas(*entrada)
+    return ejecutar, len(entradas)
+
+
+@benchmark('puntaje_solicitud')
+def _puntaje_solicitud(muestra):
+    # Lo que hace calcular_puntaje_credito con cada petición, sin la capa HTTP
+    cuerpos = [json.dumps(_solicitud(a)) for a in muestra]
+
+    def ejecutar():
+        for cuerpo in cuerpos:
+            evaluar_solicitudes([json.loads(cuerpo)])
+    return ejecutar, len(cuerpos)
+
+
+@benchmark('puntaje_lote')
+def _puntaje_lote(muestra):
+    solicitudes = [_solicitud(a) for a in muestra]
+
+    def ejecutar():
+        evaluar_solicitudes(solicitudes)
+    return ejecutar, len(solicitudes)
+
+
+@benchmark('calcular_puntajes_vectorizado')
+def _calcular_puntajes_vectorizado(muestra):
+    columnas = {
+        campo: np.array([float(getattr(a, campo)) for a in muestra])
+        for campo in CAMPOS_SOLICITUD
+    }
+
+    def ejecutar():
+        calcular_puntajes(**columnas)
+    return ejecutar, len(muestra)
+
+
+def medir(funcion, operaciones, repeticiones=REPETICIONES, tiempo_minimo=TIEMPO_MINIMO):
+    """Nanosegundos por operación (mínimo y mediana de las repeticiones)"""
+    temporizador = timeit.Timer(funcion)
+    funcion()  # Calentamiento: cachés e importaciones diferidas
+    llamadas = 1
+    while True:
+        if temporizador.timeit(llamadas) >= tiempo_minimo:
+            break
+        llamadas *= 2
+    tiempos = [
+        segundos / (llamadas * operaciones) * 1e9
+        for segundos in temporizador.repeat(repeticiones, llamadas)
+    ]
+    return {
+        'ns_por_operacion': round(min(tiempos), 1),
+        'mediana_ns': round(statistics.median(tiempos), 1),
+        'operaciones': operaciones,
+        'llamadas': llamadas,
+        'repeticiones': repeticiones,
+    }
+
+
+def entorno():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+    }
+
+
+def ejecutar(nombres=None, muestras=MUESTRAS, semilla=SEMILLA, repeticiones=REPETICIONES,
+             tiempo_minimo=TIEMPO_MINIMO, progreso=None):
+    """
+    Ejecuta los benchmarks indicados (por defecto todos) y devuelve el
+    documento de resultados. Lanza KeyError si algún nombre no existe.
+    """
+    nombres = list(nombres or BENCHMARKS)
+    preparadores = [(nombre, BENCHMARKS[nombre]) for nombre in nombres]
+    muestra = generar_muestra(muestras, semilla)
+    resultados = {}
+    for nombre, preparar in preparadores:
+        resultados[nombre] = medir(*preparar(muestra), repeticiones, tiempo_minimo)
+        if progreso:
+            progreso(nombre, resultados[nombre])
+    return {
+        'version': VERSION,
+        'fecha': timezone.now().isoformat(),
+        'entorno': entorno(),
+        'parametros': {'muestras': muestras, 'semilla': semilla, 'repeticiones': repeticiones},
+        'resultados': resultados,
+    }
+
+
+def comparar(base, actual, umbral=UMBRAL):
+    """
+    Compara dos documentos de resultados. Devuelve una fila por benchmark con
+    los tiempos, el cambio en % y el estado: 'regresion', 'mejora', 'igual',
+    'nuevo' (sin línea base) o 'ausente' (no medido ahora).
+    """
+    resultados_base, resultados_actual = base['resultados'], actual['resultados']
+    filas = []
+    for nombre in list(resultados_base) + [n for n in resultados_actual if n not in resultados_base]:
+        antes = resultados_base.get(nombre, {}).get('ns_por_operacion')
+        despues = resultados_actual.get(nombre, {}).get('ns_por_operacion')
+        cambio = None
+        if antes is None:
+            estado = 'nuevo'
+        elif despues is None:
+            estado = 'ausente'
+        else:
+            cambio = (despues / antes - 1) * 100 if antes else 0.0
+            if cambio > umbral:
+                estado = 'regresion'
+            elif cambio < -umbral:
+                estado = 'mejora'
+            else:
+                estado = 'igual'
+        filas.append({'nombre': nombre, 'base_ns': antes, 'actual_ns': despues, 'cambio': cambio, 'estado': estado})
+    return filas
+
+
+def cargar(ruta):
+    """Lee un documento de resultados; lanza ValueError si no lo es"""
+    with open(ruta, encoding='utf-8') as archivo:
+        documento = json.load(archivo)
+    if not isinstance(documento, dict) or not isinstance(documento.get('resultados'), dict):
+        raise ValueError('%s no es un archivo de resultados de benchmarks' % ruta)
+    return documento
+
+
+def guardar(documento, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(documento, archivo, ensure_ascii=False, indent=2)
+        archivo.write('\n')
@@ -0,0 +1,216 @@
+"""
+Mantenimiento del resumen agregado de la cartera (ResumenCartera).
+
+El resumen tiene una fila por mes, estado, tipo de crédito y nivel de
+riesgo, con el número de análisis y la suma del monto solicitado. Al guardar
+o eliminar un análisis se aplica solo la diferencia (+1/-1 y su monto) a las
+filas afectadas, con un UPDATE ... SET cantidad = cantidad + n, sin volver a
+agregar la tabla de análisis. Las operaciones masivas que no envían señales
+(bulk_update y update) recalculan los meses afectados, y el comando
+rebuild_portfolio_rollup lo reconstruye entero (la migración
+0007_resumen_cartera tiene su propia copia del cálculo). El panel de
+cartera lee solo esta tabla, cuyo tamaño no depende del número de análisis.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+
+CAMPOS_CUBETA = ('estado', 'tipo_credito', 'banda_riesgo')
+# Campos de AnalisisCredito de los que depende el resumen de cartera
+CAMPOS_ORIGEN = ('fecha_analisis', *CAMPOS_CUBETA, 'monto_solicitado')
+MESES_PANEL = 12
+# A partir de este número de filas afectadas las diferencias se aplican en bloque
+MAX_DELTAS_POR_FILA = 20
+TAMANO_LOTE = 500
+
+
+def _modelos(modelo_analisis, modelo_cartera):
+    if modelo_analisis is None or modelo_cartera is None:
+        from .models import AnalisisCredito, ResumenCartera
+        return AnalisisCredito, ResumenCartera
+    return modelo_analisis, modelo_cartera
+
+
+def mes_de(fecha):
+    """Primer día del mes (en la zona horaria actual) de una fecha y hora"""
+    return timezone.localtime(fecha).date().replace(day=1)
+
+
+def _rango_mes(mes):
+    inicio = timezone.make_aware(datetime(mes.year, mes.month, 1))
+    siguiente = (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return inicio, timezone.make_aware(datetime(siguiente.year, siguiente.month, 1))
+
+
+def contribucion(analisis):
+    """
+    ((mes, estado, tipo, nivel), monto) con que cuenta un análisis en el
+    resumen, o None si no se cargaron todos los campos necesarios.
+    """
+    valores = analisis.__dict__
+    if any(campo not in valores for campo in CAMPOS_ORIGEN) or valores['fecha_analisis'] is None:
+        return None
+    clave = (mes_de(valores['fecha_analisis']), *(valores[campo] for campo in CAMPOS_CUBETA))
+    return clave, Decimal(str(valores['monto_solicitado'] or 0))
+
+
+def acumular(deltas, aporte, signo=1):
+    """Suma (o resta, con signo=-1) la contribución de un análisis a un diccionario de diferencias"""
+    if aporte is None:
+        return deltas
+    clave, monto = aporte
+    cantidad_actual, monto_actual = deltas.get(clave, (0, Decimal('0')))
+    deltas[clave] = (cantidad_actual + signo, monto_actual + signo * monto)
+    return deltas
+
+
+def _filtro(clave):
+    mes, estado, tipo_credito, banda_riesgo = clave
+    return {'mes': mes, 'estado': estado, 'tipo_credito': tipo_credito, 'banda_riesgo': banda_riesgo}
+
+
+def aplicar_deltas(deltas, modelo_cartera=None):
+    """Aplica a las filas del resumen las diferencias {clave: (cantidad, monto)}"""
+    _modelo_analisis, modelo_cartera = _modelos(None, modelo_cartera)
+    deltas = {clave: delta for clave, delta in deltas.items() if delta[0] or delta[1]}
+    if len(deltas) > MAX_DELTAS_POR_FILA:
+        _aplicar_deltas_en_bloque(deltas, modelo_cartera)
+        return
+    for clave, (cantidad, monto) in deltas.items():
+        _aplicar_delta(clave, cantidad, monto, modelo_cartera)
+
+
+def _aplicar_delta(clave, cantidad, monto, modelo_cartera):
+    filtro = _filtro(clave)
+    cambios = {'cantidad': F('cantidad') + cantidad, 'monto_total': F('monto_total') + monto}
+    if not modelo_cartera.objects.filter(**filtro).update(**cambios) and cantidad > 0:
+        try:
+            with transaction.atomic():
+                modelo_cartera.objects.create(**filtro, cantidad=cantidad, monto_total=monto)
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            modelo_cartera.objects.filter(**filtro).update(**cambios)
+    if cantidad < 0:
+        modelo_cartera.objects.filter(**filtro, cantidad__lte=0).delete()
+
+
+def _aplicar_deltas_en_bloque(deltas, modelo_cartera):
+    """
+    Igual que aplicar_deltas pero con un número fijo de consultas, para las
+    inserciones masivas: bloquea las filas existentes de los meses afectados,
+    las actualiza con bulk_update y crea las que faltan con bulk_create.
+    """
+    with transaction.atomic():
+        existentes = {
+            (fila.mes, *(getattr(fila, campo) for campo in CAMPOS_CUBETA)): fila
+            for fila in modelo_cartera.objects.select_for_update().filter(mes__in={clave[0] for clave in deltas})
+        }
+        modificadas, vacias, nuevas = [], [], {}
+        for clave, (cantidad, monto) in deltas.items():
+            fila = existentes.get(clave)
+            if fila is None:
+                if cantidad > 0:
+                    nuevas[clave] = (cantidad, monto)
+                continue
+            fila.cantidad += cantidad
+            fila.monto_total += monto
+            (modificadas if fila.cantidad > 0 else vacias).append(fila)
+        modelo_cartera.objects.bulk_update(modificadas, ['cantidad', 'monto_total'], batch_size=TAMANO_LOTE)
+        modelo_cartera.objects.filter(pk__in=[fila.pk for fila in vacias]).delete()
+        try:
+            with transaction.atomic():
+                modelo_cartera.objects.bulk_create([
+                    modelo_cartera(**_filtro(clave), cantidad=cantidad, monto_total=monto)
+                    for clave, (cantidad, monto) in nuevas.items()
+                ], batch_size=TAMANO_LOTE)
+        except IntegrityError:
+            # Otro proceso creó alguna de las filas mientras tanto
+            for clave, (cantidad, monto) in nuevas.items():
+                _aplicar_delta(clave, cantidad, monto, modelo_cartera)
+
+
+def meses_de(queryset):
+    """Meses en los que hay análisis del queryset"""
+    return {mes_de(fecha) for fecha in queryset.order_by().datetimes('fecha_analisis', 'month')}
+
+
+def recalcular_meses(meses, modelo_analisis=None, modelo_cartera=None):
+    """Recalcula desde los análisis las filas del resumen de los meses indicados"""
+    modelo_analisis, modelo_cartera = _modelos(modelo_analisis, modelo_cartera)
+    for mes in sorted(set(meses)):
+        inicio, fin = _rango_mes(mes)
+        filas = (
+            modelo_analisis.objects.filter(fecha_analisis__gte=inicio, fecha_analisis__lt=fin)
+            .order_by().values(*CAMPOS_CUBETA)
+            .annotate(cantidad=Count('pk'), monto_total=Sum('monto_solicitado'))
+        )
+        with transaction.atomic():
+            modelo_cartera.objects.filter(mes=mes).delete()
+            modelo_cartera.objects.bulk_create([
+                modelo_cartera(mes=mes, cantidad=fila.pop('cantidad'),
+                               monto_total=fila.pop('monto_total') or Decimal('0'), **fila)
+                for fila in filas
+            ])
+
+
+def reconstruir_cartera(modelo_analisis=None, modelo_cartera=None):
+    """Reconstruye el resumen completo, mes a mes. Devuelve el número de meses recalculados."""
+    modelo_analisis, modelo_cartera = _modelos(modelo_analisis, modelo_cartera)
+    meses = meses_de(modelo_analisis.objects.all())
+    modelo_cartera.objects.exclude(mes__in=meses).delete()
+    recalcular_meses(meses, modelo_analisis, modelo_cartera)
+    return len(meses)
+
+
+def _distribucion(filas, campo, opciones):
+    por_codigo = {fila[campo]: fila for fila in filas}
+    total = sum(fila['cantidad'] for fila in filas) or 1
+    return [
+        {
+            'codigo': codigo,
+            'nombre': nombre,
+            'cantidad': por_codigo.get(codigo, {}).get('cantidad', 0),
+            'monto': por_codigo.get(codigo, {}).get('monto') or Decimal('0'),
+            'porcentaje': 100 * por_codigo.get(codigo, {}).get('cantidad', 0) / total,
+        }
+        for codigo, nombre in opciones
+    ]
+
+
+def datos_panel(meses=MESES_PANEL):
+    """
+    Distribuciones por estado, tipo de crédito y nivel de riesgo, y serie
+    mensual de los últimos `meses` meses, leídas del resumen de cartera.
+    """
+    from .models import AnalisisCredito, ResumenCartera
+
+    def agrupar(*campos):
+        return list(
+            ResumenCartera.objects.order_by().values(*campos)
+            .annotate(cantidad=Sum('cantidad'), monto=Sum('monto_total'))
+        )
+
+    por_estado = agrupar('estado')
+    desde = mes_de(timezone.now())
+    for _i in range(meses - 1):
+        desde = (desde - timedelta(days=1)).replace(day=1)
+    mensual = list(
+        ResumenCartera.objects.filter(mes__gte=desde).order_by('mes').values('mes')
+        .annotate(cantidad=Sum('cantidad'), monto=Sum('monto_total'))
+    )
+    maximo_mensual = max((fila['monto'] for fila in mensual), default=0) or 1
+    for fila in mensual:
+        fila['porcentaje'] = 100 * fila['monto'] / maximo_mensual
+
+    return {
+        'total_analisis': sum(fila['cantidad'] for fila in por_estado),
+        'monto_total': sum((fila['monto'] for fila in por_estado), Decimal('0')),
+        'por_estado': _distribucion(por_estado, 'estado', AnalisisCredito.EstadoAnalisis.choices),
+        'por_tipo': _distribucion(agrupar('tipo_credito'), 'tipo_credito', AnalisisCredito.TipoCredito.choices),
+        'por_nivel': _distribucion(agrupar('banda_riesgo'), 'banda_riesgo', AnalisisCredito.NivelRiesgo.choices),
+        'mensual': mensual,
+    }
@@ -0,0 +1,172 @@
+"""
+Escritura diferida (write-behind) de los registros de consentimiento.
+
+El endpoint del banner de cookies encola cada ConsentLog en una cola acotada
+del proceso y un hilo en segundo plano los guarda con bulk_create cuando se
+juntan CONSENT_BUFFER_TAMANO_LOTE registros o pasan
+CONSENT_BUFFER_INTERVALO segundos, lo que ocurra primero. Así la escritura
+más frecuente ocupa el bloqueo de escritura de SQLite una vez por lote y no
+una vez por clic.
+
+Si la cola está llena el registro se guarda de forma síncrona y se cuenta
+como desborde. Al terminar el proceso (atexit) se vacía la cola pendiente.
+Como auto_now_add se aplica al guardar, created_at refleja el momento de la
+escritura del lote, a lo sumo CONSENT_BUFFER_INTERVALO segundos más tarde.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class BufferConsentimientos:
+    def __init__(self, tamano_lote=100, intervalo=2.0, capacidad=10000):
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self.encolados = 0
+        self.escritos = 0
+        self.desbordes = 0
+        self.fallidos = 0
+
+    def registrar(self, consentimiento, iniciar_hilo=True):
+        """
+        Encola un ConsentLog sin guardar. Devuelve True si quedó encolado o,
+        con la cola llena, si se pudo guardar directamente.
+        """
+        if iniciar_hilo:
+            self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(consentimiento)
+        except queue.Full:
+            with self._lock:
+                self.desbordes += 1
+            logger.warning('Cola de consentimientos llena (%d desbordes); se guarda de forma síncrona', self.desbordes)
+            return self._escribir([consentimiento]) == 1
+        with self._lock:
+            self.encolados += 1
+        return True
+
+    def _asegurar_hilo(self):
+        # Tras un fork (p. ej. gunicorn con --preload) el hilo del padre no existe en el hijo
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._detener.clear()
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._bucle, name='consent-buffer', daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        try:
+            while not self._detener.is_set():
+                lote = self._tomar_lote()
+                if lote:
+                    self._escribir(lote)
+        finally:
+            close_old_connections()
+
+    def _tomar_lote(self):
+        """Espera hasta completar un lote o hasta que venza el intervalo desde el primer registro"""
+        try:
+            lote = [self._cola.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamano_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote):
+        from .models import ConsentLog
+
+        try:
+            close_old_connections()
+            ConsentLog.objects.bulk_create(lote, batch_size=self.tamano_lote)
+        except Exception:
+            with self._lock:
+                self.fallidos += len(lote)
+            logger.exception('No se pudieron guardar %d registros de consentimiento', len(lote))
+            return 0
+        with self._lock:
+            self.escritos += len(lote)
+        return len(lote)
+
+    def vaciar(self):
+        """Guarda en el hilo actual todo lo pendiente en la cola"""
+        total = 0
+        while True:
+            lote = []
+            while len(lote) < self.tamano_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return total
+            total += self._escribir(lote)
+
+    def detener(self, timeout=5.0):
+        """Detiene el hilo y vacía la cola (se ejecuta al terminar el proceso)"""
+        self._detener.set()
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            self._hilo.join(timeout)
+        self.vaciar()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'pendientes': self._cola.qsize(),
+                'encolados': self.encolados,
+                'escritos': self.escritos,
+                'desbordes': self.desbordes,
+                'fallidos': self.fallidos,
+            }
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def habilitado():
+    return getattr(settings, 'CONSENT_BUFFER_ENABLED', False)
+
+
+def obtener_buffer():
+    """Buffer del proceso, creado con la configuración de settings en el primer uso"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BufferConsentimientos(
+                    tamano_lote=getattr(settings, 'CONSENT_BUFFER_TAMANO_LOTE', 100),
+                    intervalo=getattr(settings, 'CONSENT_BUFFER_INTERVALO', 2.0),
+                    capacidad=getattr(settings, 'CONSENT_BUFFER_CAPACIDAD', 10000),
+                )
+                atexit.register(_buffer.detener)
+    return _buffer
+
+
+def estadisticas():
+    """Contadores del buffer del proceso, o None si aún no se ha creado"""
+    return _buffer.estadisticas() if _buffer is not None else None
@@ -0,0 +1,140 @@
+"""
+Pruebas de estrés de la elegibilidad de aprobación sobre toda la cartera.
+
+Un escenario sube la tasa de interés (en puntos básicos) y cambia ingresos y
+gastos mensuales (en porcentaje). La cartera se recorre por bloques de
+columnas en arreglos de NumPy y, para cada bloque, las tres reglas de
+AnalisisCredito.puede_aprobar (puntaje mínimo, cuota dentro de la capacidad
+de pago y deuda dentro del 40% del ingreso anual) se evalúan a la vez para
+todos los escenarios con puntaje.evaluar_aprobacion, como una matriz
+escenarios × préstamos. Para cada escenario se cuentan los préstamos
+elegibles sin estrés que dejan de serlo y su monto, por tipo de crédito.
+"""
+from array import array
+
+import numpy as np
+
+from .puntaje import evaluar_aprobacion
+
+
+TAMANO_BLOQUE = 20000
+TIPOS_CREDITO = ('PER', 'HIP', 'AUT', 'EDU', 'OTR')
+CAMPOS = (
+    'puntaje_credito', 'ingresos_mensuales', 'gastos_mensuales', 'deuda_actual',
+    'monto_solicitado', 'plazo_meses', 'tasa_interes',
+)
+ESCENARIOS_DEFECTO = (
+    {'nombre': 'tasa+100', 'tasa_pb': 100, 'ingresos_pct': 0, 'gastos_pct': 0},
+    {'nombre': 'tasa+300', 'tasa_pb': 300, 'ingresos_pct': 0, 'gastos_pct': 0},
+    {'nombre': 'ingresos-10', 'tasa_pb': 0, 'ingresos_pct': -10, 'gastos_pct': 0},
+    {'nombre': 'tasa+300 ingresos-10', 'tasa_pb': 300, 'ingresos_pct': -10, 'gastos_pct': 0},
+    {'nombre': 'severo', 'tasa_pb': 500, 'ingresos_pct': -20, 'gastos_pct': 10},
+)
+_CLAVES_ESCENARIO = {'tasa': 'tasa_pb', 'ingresos': 'ingresos_pct', 'gastos': 'gastos_pct'}
+
+
+def parsear_escenario(texto):
+    """Convierte 'tasa=300,ingresos=-10,gastos=5' en un escenario; lanza ValueError si no es válido"""
+    escenario = {'nombre': texto, 'tasa_pb': 0, 'ingresos_pct': 0, 'gastos_pct': 0}
+    for parte in texto.split(','):
+        clave, separador, valor = parte.partition('=')
+        if not separador or clave.strip() not in _CLAVES_ESCENARIO:
+            raise ValueError('Escenario inválido: %r (use tasa=PB,ingresos=%%,gastos=%%)' % texto)
+        escenario[_CLAVES_ESCENARIO[clave.strip()]] = float(valor)
+    if escenario['ingresos_pct'] <= -100:
+        raise ValueError('Los ingresos no pueden caer un 100% o más')
+    return escenario
+
+
+def _bloques(queryset, tamano_bloque):
+    """Genera (columnas numéricas, índices de tipo de crédito) por bloques de la cartera"""
+    indice_tipo = {tipo: i for i, tipo in enumerate(TIPOS_CREDITO)}
+    ultimo_id = 0
+    while True:
+        filas = list(
+            queryset.filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', 'tipo_credito', *CAMPOS)[:tamano_bloque]
+        )
+        if not filas:
+            return
+        ultimo_id = filas[-1][0]
+        tipos = np.frombuffer(array('b', (indice_tipo[fila[1]] for fila in filas)), dtype=np.int8)
+        # Los puntajes nulos cuentan como 0, como en puede_aprobar
+        columnas = {
+            campo: np.array([fila[i] or 0 for fila in filas], dtype=float)
+            for i, campo in enumerate(CAMPOS, 2)
+        }
+        yield columnas, tipos
+
+
+def estresar_cartera(escenarios=ESCENARIOS_DEFECTO, queryset=None, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Evalúa todos los escenarios sobre la cartera (o el queryset indicado).
+    Devuelve una lista con el resultado de cada escenario, en el mismo orden.
+    """
+    if queryset is None:
+        from .models import AnalisisCredito
+        queryset = AnalisisCredito.objects.all()
+
+    escenarios = list(escenarios)
+    numero, tipos_total = len(escenarios), len(TIPOS_CREDITO)
+    tasa = np.array([e['tasa_pb'] for e in escenarios], dtype=float)[:, None] / 100
+    ingresos = 1 + np.array([e['ingresos_pct'] for e in escenarios], dtype=float)[:, None] / 100
+    gastos = 1 + np.array([e['gastos_pct'] for e in escenarios], dtype=float)[:, None] / 100
+
+    prestamos = np.zeros(tipos_total, dtype=np.int64)
+    elegibles_base = np.zeros(tipos_total, dtype=np.int64)
+    monto_base = np.zeros(tipos_total)
+    elegibles = np.zeros(numero * tipos_total, dtype=np.int64)
+    pierden = np.zeros(numero * tipos_total, dtype=np.int64)
+    monto_pierden = np.zeros(numero * tipos_total)
+
+    for columnas, tipos in _bloques(queryset, tamano_bloque):
+        base = evaluar_aprobacion(**columnas)
+        estresado = evaluar_aprobacion(
+            columnas['puntaje_credito'],
+            columnas['ingresos_mensuales'] * ingresos,
+            columnas['gastos_mensuales'] * gastos,
+            columnas['deuda_actual'],
+            columnas['monto_solicitado'],
+            columnas['plazo_meses'],
+            columnas['tasa_interes'] + tasa,
+        )
+        pierde = base & ~estresado
+        # Índice escenario × tipo de crédito para acumular todos los escenarios con un solo bincount
+        celdas = (np.arange(numero)[:, None] * tipos_total + tipos).ravel()
+        monto = np.broadcast_to(columnas['monto_solicitado'], estresado.shape).ravel()
+
+        prestamos += np.bincount(tipos, minlength=tipos_total)
+        elegibles_base += np.bincount(tipos, weights=base, minlength=tipos_total).astype(np.int64)
+        monto_base += np.bincount(tipos, weights=base * columnas['monto_solicitado'], minlength=tipos_total)
+        elegibles += np.bincount(celdas, weights=estresado.ravel(), minlength=elegibles.size).astype(np.int64)
+        pierden += np.bincount(celdas, weights=pierde.ravel(), minlength=pierden.size).astype(np.int64)
+        monto_pierden += np.bincount(celdas, weights=pierde.ravel() * monto, minlength=monto_pierden.size)
+
+    elegibles = elegibles.reshape(numero, tipos_total)
+    pierden = pierden.reshape(numero, tipos_total)
+    monto_pierden = monto_pierden.reshape(numero, tipos_total)
+    resultados = []
+    for i, escenario in enumerate(escenarios):
+        por_tipo = {
+            tipo: {
+                'prestamos': int(prestamos[j]),
+                'elegibles_base': int(elegibles_base[j]),
+                'elegibles': int(elegibles[i, j]),
+                'pierden': int(pierden[i, j]),
+                'monto_pierden': round(float(monto_pierden[i, j]), 2),
+            }
+            for j, tipo in enumerate(TIPOS_CREDITO) if prestamos[j]
+        }
+        resultados.append({
+            **escenario,
+            'prestamos': int(prestamos.sum()),
+            'elegibles_base': int(elegibles_base.sum()),
+            'monto_elegible_base': round(float(monto_base.sum()), 2),
+            'elegibles': int(elegibles[i].sum()),
+            'pierden': int(pierden[i].sum()),
+            'monto_pierden': round(float(monto_pierden[i].sum()), 2),
+            'por_tipo': por_tipo,
+        })
+    return resultados
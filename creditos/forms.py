@@ -1,10 +1,17 @@
 from django import forms
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from clientes.models import Cliente, DocumentoCliente
 from .models import AnalisisCredito, DocumentoAnalisis
 
 
+EXTENSIONES_DOCUMENTO = ['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png']
+# Tamaño máximo de los archivos enviados con el formulario; los mayores se suben por fragmentos
+TAMANO_MAXIMO_FORMULARIO = 10 * 1024 * 1024  # 10MB
+
+
 class AnalisisCreditoForm(forms.ModelForm):
     """Formulario para el modelo AnalisisCredito"""
     class Meta:
@@ -72,16 +79,14 @@ class DocumentoAnalisisForm(forms.ModelForm):
         archivo = self.cleaned_data.get('archivo', False)
         if archivo:
             # Limitar el tamaño del archivo a 10MB
-            max_size = 10 * 1024 * 1024  # 10MB
-            if archivo.size > max_size:
+            if archivo.size > TAMANO_MAXIMO_FORMULARIO:
                 raise forms.ValidationError(
                     _('El archivo es muy grande. El tamaño máximo permitido es 10MB.')
                 )
             
             # Validar la extensión del archivo
             ext = archivo.name.split('.')[-1].lower()
-            valid_extensions = ['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png']
-            if ext not in valid_extensions:
+            if ext not in EXTENSIONES_DOCUMENTO:
                 raise forms.ValidationError(
                     _('Formato de archivo no soportado. Formatos permitidos: PDF, DOC, DOCX, JPG, JPEG, PNG')
                 )
@@ -89,6 +94,44 @@ class DocumentoAnalisisForm(forms.ModelForm):
         return archivo
 
 
+class SubidaFragmentadaForm(forms.Form):
+    """Datos con los que se inicia una subida por fragmentos (ver creditos/subidas.py)"""
+    analisis = forms.ModelChoiceField(queryset=AnalisisCredito.objects.all(), required=False)
+    cliente = forms.ModelChoiceField(queryset=Cliente.objects.all(), required=False)
+    tipo_documento = forms.CharField(max_length=20)
+    notas = forms.CharField(required=False)
+    nombre_archivo = forms.CharField(max_length=255)
+    tamano = forms.IntegerField(min_value=1)
+    
+    def clean_nombre_archivo(self):
+        nombre = self.cleaned_data['nombre_archivo']
+        if nombre.split('.')[-1].lower() not in EXTENSIONES_DOCUMENTO:
+            raise forms.ValidationError(
+                _('Formato de archivo no soportado. Formatos permitidos: PDF, DOC, DOCX, JPG, JPEG, PNG')
+            )
+        return nombre
+    
+    def clean_tamano(self):
+        tamano = self.cleaned_data['tamano']
+        if tamano > settings.SUBIDAS_TAMANO_MAXIMO:
+            raise forms.ValidationError(
+                _('El archivo es muy grande. El tamaño máximo permitido es %(maximo)d MB.'),
+                params={'maximo': settings.SUBIDAS_TAMANO_MAXIMO // (1024 * 1024)}
+            )
+        return tamano
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        analisis, cliente = cleaned_data.get('analisis'), cleaned_data.get('cliente')
+        if bool(analisis) == bool(cliente):
+            raise forms.ValidationError(_('Indique el análisis o el cliente del documento, pero no ambos.'))
+        modelo = DocumentoAnalisis if analisis else DocumentoCliente
+        tipos = [valor for valor, _etiqueta in modelo._meta.get_field('tipo_documento').choices]
+        if 'tipo_documento' in cleaned_data and cleaned_data['tipo_documento'] not in tipos:
+            self.add_error('tipo_documento', _('Tipo de documento no válido.'))
+        return cleaned_data
+
+
 class AnalisisCreditoAprobarForm(forms.Form):
     """Formulario para aprobar o rechazar un análisis de crédito"""
     ESTADO_CHOICES = (
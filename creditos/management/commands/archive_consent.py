@@ -0,0 +1,58 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from creditos.retencion import TAMANO_BLOQUE, archivar_consentimientos, fecha_limite
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los registros de consentimiento caducados a un archivo JSONL '
+        'comprimido con gzip y los elimina de la tabla, por bloques.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directorio', type=Path, default=None,
+            help='Directorio de los archivos (por defecto CONSENT_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--antes', type=fecha_limite,
+            help='Archivar los caducados antes de esta fecha (AAAA-MM-DD); por defecto, ahora'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE, help='Filas por bloque')
+        parser.add_argument('--pausa', type=float, default=0, help='Segundos de espera entre bloques')
+        parser.add_argument('--dry-run', action='store_true', help='Contar sin escribir ni eliminar')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+        if options['antes'] and options['antes'] > timezone.now():
+            raise CommandError('--antes no puede ser una fecha futura: solo se tratan los consentimientos caducados')
+
+        directorio = options['directorio'] or Path(settings.CONSENT_ARCHIVE_DIR)
+        archivo = directorio / f"consentimientos-{timezone.now():%Y%m%d-%H%M%S}.jsonl.gz"
+        if not options['dry_run']:
+            directorio.mkdir(parents=True, exist_ok=True)
+
+        inicio = time.monotonic()
+        total = archivar_consentimientos(
+            archivo,
+            antes=options['antes'],
+            tamano_bloque=options['tamano_bloque'],
+            pausa=options['pausa'],
+            dry_run=options['dry_run'],
+        )
+        duracion = time.monotonic() - inicio
+
+        if options['dry_run']:
+            self.stdout.write(f'Se archivarían {total} registros de consentimiento')
+        elif total:
+            self.stdout.write(self.style.SUCCESS(
+                f'Archivados {total} registros de consentimiento en {archivo} ({duracion:.1f}s)'
+            ))
+        else:
+            self.stdout.write('No hay registros de consentimiento caducados')
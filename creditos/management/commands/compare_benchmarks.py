@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos import benchmarks
+
+
+def informar(comando, filas, umbral):
+    """Escribe la comparación y lanza CommandError si hay regresiones"""
+    for fila in filas:
+        if fila['cambio'] is None:
+            comando.stdout.write(f'{fila["nombre"]:<32} {fila["estado"]}')
+            continue
+        linea = (
+            f'{fila["nombre"]:<32} {fila["base_ns"]:>12,.1f} -> {fila["actual_ns"]:>12,.1f} ns/op '
+            f'({fila["cambio"]:+.1f}%)'
+        )
+        if fila['estado'] == 'regresion':
+            linea = comando.style.ERROR(linea + ' REGRESIÓN')
+        elif fila['estado'] == 'mejora':
+            linea = comando.style.SUCCESS(linea)
+        comando.stdout.write(linea)
+
+    regresiones = [fila['nombre'] for fila in filas if fila['estado'] == 'regresion']
+    if regresiones:
+        raise CommandError(
+            f'{len(regresiones)} benchmarks más de un {umbral:g}% más lentos que la línea base: '
+            + ', '.join(regresiones)
+        )
+    comando.stdout.write(comando.style.SUCCESS(f'Sin regresiones por encima del {umbral:g}%'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara dos archivos de resultados de run_benchmarks y termina con error si algún '
+        'benchmark es más lento que la línea base por encima del umbral.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base', help='Resultados de referencia (línea base)')
+        parser.add_argument('actual', help='Resultados a comparar')
+        parser.add_argument('--umbral', type=float, default=benchmarks.UMBRAL,
+                            help='Aumento en %% a partir del cual hay regresión (por defecto %(default)s)')
+
+    def handle(self, *args, **options):
+        if options['umbral'] < 0:
+            raise CommandError('--umbral no puede ser negativo')
+        try:
+            base = benchmarks.cargar(options['base'])
+            actual = benchmarks.cargar(options['actual'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        if base.get('entorno') != actual.get('entorno'):
+            self.stderr.write('Aviso: los resultados provienen de entornos distintos y pueden no ser comparables')
+        informar(self, benchmarks.comparar(base, actual, options['umbral']), options['umbral'])
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos import exportacion
+from creditos.models import AnalisisCredito
+from creditos.views import filtrar_analisis
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta los análisis de crédito a CSV o JSONL en streaming, con los '
+        'mismos filtros que la lista de análisis.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=exportacion.FORMATOS, default='csv')
+        parser.add_argument('--columnas', default='',
+                            help='Columnas separadas por comas (por defecto todas): %s' % ', '.join(exportacion.COLUMNAS))
+        parser.add_argument('--salida', help='Archivo de salida (por defecto la salida estándar)')
+        parser.add_argument('--tamano-bloque', type=int, default=exportacion.TAMANO_BLOQUE,
+                            help='Filas leídas por bloque (por defecto %(default)s)')
+        parser.add_argument('--q', default='', help='Búsqueda por cliente o estado')
+        parser.add_argument('--estado', default='', choices=['', *AnalisisCredito.EstadoAnalisis.values])
+        parser.add_argument('--tipo', default='', choices=['', *AnalisisCredito.TipoCredito.values])
+        parser.add_argument('--nivel', default='', choices=['', *AnalisisCredito.NivelRiesgo.values])
+        parser.add_argument('--aprobable', default='', choices=['', '1', '0'])
+        parser.add_argument('--orden', default='', help='Ordenación de la lista de análisis (p. ej. -monto)')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+        try:
+            columnas = exportacion.parsear_columnas(options['columnas'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        parametros = {campo: options[campo] for campo in ('q', 'estado', 'tipo', 'nivel', 'aprobable', 'orden')}
+        queryset = filtrar_analisis(AnalisisCredito.objects.all(), parametros)
+
+        total = 0
+
+        def contar(filas):
+            nonlocal total
+            for fila in filas:
+                total += 1
+                yield fila
+
+        filas = contar(exportacion.filas_exportacion(queryset, columnas, options['tamano_bloque']))
+        fragmentos = exportacion.CODIFICADORES[options['formato']](filas, columnas)
+
+        inicio = time.monotonic()
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+                salida.writelines(fragmentos)
+        else:
+            for fragmento in fragmentos:
+                self.stdout.write(fragmento, ending='')
+        segundos = max(time.monotonic() - inicio, 1e-9)
+
+        # El resumen va a stderr para no mezclarse con los datos exportados a stdout
+        self.stderr.write(self.style.SUCCESS(
+            f'Exportados {total} análisis en {segundos:.1f}s ({total / segundos:.0f} filas/s)'
+        ))
@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_riesgo.almacenamiento import TAMANO_LOTE, margen_gc, recolectar, recontar
+from creditos.subidas import purgar_caducadas
+
+
+class Command(BaseCommand):
+    help = (
+        'Recolector de los archivos de documentos guardados por contenido: recuenta las '
+        'referencias de cada blob y borra los que no usa ningún documento desde hace más '
+        'del margen indicado. Elimina también las subidas por fragmentos abandonadas. '
+        'Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--margen-horas', type=float,
+            help='Horas sin uso antes de borrar un blob sin referencias (por defecto DOCUMENTOS_GC_MARGEN_HORAS)'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=TAMANO_LOTE, help='Blobs por bloque')
+        parser.add_argument('--sin-recuento', action='store_true', help='No recontar las referencias antes de recolectar')
+        parser.add_argument('--dry-run', action='store_true', help='Contar sin borrar')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+        if options['margen_horas'] is not None and options['margen_horas'] < 0:
+            raise CommandError('--margen-horas no puede ser negativo')
+        margen = margen_gc() if options['margen_horas'] is None else timedelta(hours=options['margen_horas'])
+
+        inicio = time.monotonic()
+        if not options['dry_run']:
+            caducadas = purgar_caducadas(tamano_lote=options['tamano_bloque'])
+            self.stdout.write(f'Eliminadas {caducadas} subidas por fragmentos abandonadas')
+        if not options['sin_recuento'] and not options['dry_run']:
+            corregidos = recontar(options['tamano_bloque'])
+            self.stdout.write(f'Referencias corregidas en {corregidos} blobs')
+        blobs, liberados = recolectar(margen, options['tamano_bloque'], options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(f'Se borrarían {blobs} blobs ({liberados / 1024 ** 2:.1f} MB)')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Borrados {blobs} blobs, {liberados / 1024 ** 2:.1f} MB liberados ({time.monotonic() - inicio:.1f}s)'
+            ))
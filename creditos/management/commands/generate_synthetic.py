@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos import sintetico
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera clientes (con referencias y metadatos de documentos) y análisis de crédito '
+        'sintéticos con distribuciones verosímiles, por bloques con bulk_create, para pruebas '
+        'de rendimiento. Con la misma semilla se generan los mismos datos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=1000,
+                            help='Clientes a crear (por defecto %(default)s)')
+        parser.add_argument('--analisis', type=int,
+                            help='Análisis a crear, repartidos entre los clientes (por defecto 5 por cliente)')
+        parser.add_argument('--referencias', type=int, default=2,
+                            help='Máximo de referencias personales por cliente (por defecto %(default)s)')
+        parser.add_argument('--documentos', type=int, default=2,
+                            help='Máximo de documentos por cliente (por defecto %(default)s)')
+        parser.add_argument('--semilla', type=int, default=sintetico.SEMILLA,
+                            help='Semilla del generador (por defecto %(default)s)')
+        parser.add_argument('--prefijo', default=sintetico.PREFIJO_IDENTIFICACION,
+                            help='Prefijo de los números de identificación (por defecto %(default)s)')
+        parser.add_argument('--tamano-bloque', type=int, default=sintetico.TAMANO_BLOQUE,
+                            help='Clientes por bloque (por defecto %(default)s)')
+
+    def handle(self, *args, **options):
+        clientes = options['clientes']
+        analisis = 5 * clientes if options['analisis'] is None else options['analisis']
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+        if clientes < 0 or analisis < 0 or options['referencias'] < 0 or options['documentos'] < 0:
+            raise CommandError('Las cantidades no pueden ser negativas')
+        if analisis and not clientes:
+            raise CommandError('No se pueden crear análisis sin clientes')
+        if len(options['prefijo']) > 11:
+            raise CommandError('--prefijo admite como máximo 11 caracteres')
+
+        inicio = time.monotonic()
+
+        def progreso(totales):
+            if options['verbosity'] > 1:
+                segundos = max(time.monotonic() - inicio, 1e-9)
+                self.stdout.write(
+                    f"{totales['clientes']}/{clientes} clientes, {totales['analisis']}/{analisis} análisis "
+                    f"({(totales['clientes'] + totales['analisis']) / segundos:.0f} filas/s)"
+                )
+
+        totales = sintetico.generar(
+            clientes, analisis, options['referencias'], options['documentos'], options['semilla'],
+            options['tamano_bloque'], options['prefijo'], progreso,
+        )
+        segundos = max(time.monotonic() - inicio, 1e-9)
+        filas = sum(totales.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Creados {totales['clientes']} clientes, {totales['referencias']} referencias, "
+            f"{totales['documentos']} documentos y {totales['analisis']} análisis en {segundos:.1f}s "
+            f'({filas / segundos:.0f} filas/s)'
+        ))
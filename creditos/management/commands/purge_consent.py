@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from creditos.retencion import TAMANO_BLOQUE, fecha_limite, purgar_consentimientos
+
+
+class Command(BaseCommand):
+    help = (
+        'Elimina sin archivar los registros de consentimiento caducados, por '
+        'bloques y con transacciones cortas. Para conservarlos use archive_consent.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--antes', type=fecha_limite,
+            help='Eliminar los caducados antes de esta fecha (AAAA-MM-DD); por defecto, ahora'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE, help='Filas por bloque')
+        parser.add_argument('--pausa', type=float, default=0, help='Segundos de espera entre bloques')
+        parser.add_argument('--dry-run', action='store_true', help='Contar sin eliminar')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+        if options['antes'] and options['antes'] > timezone.now():
+            raise CommandError('--antes no puede ser una fecha futura: solo se tratan los consentimientos caducados')
+
+        inicio = time.monotonic()
+        total = purgar_consentimientos(
+            antes=options['antes'],
+            tamano_bloque=options['tamano_bloque'],
+            pausa=options['pausa'],
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'Se eliminarían {total} registros de consentimiento')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Eliminados {total} registros de consentimiento ({time.monotonic() - inicio:.1f}s)'
+            ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos import resumen
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el resumen de crédito de todos los clientes. Normalmente se '
+        'mantiene al día solo mediante señales y las operaciones masivas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-bloque', type=int, default=resumen.TAMANO_BLOQUE,
+                            help='Clientes por bloque (por defecto %(default)s)')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+
+        inicio = time.monotonic()
+        total = resumen.reconstruir_resumenes(options['tamano_bloque'])
+        segundos = max(time.monotonic() - inicio, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Recalculados {total} resúmenes de crédito en {segundos:.1f}s'
+        ))
@@ -0,0 +1,147 @@
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos.models import AnalisisCredito
+from creditos.puntaje import calcular_puntajes
+from creditos.riesgo import CAMPOS_ENTRADA, CAMPOS_METRICAS
+
+
+# El orden de CAMPOS_ENTRADA empieza por puntaje_credito, seguido de los datos de la solicitud
+CAMPOS = ('id', *CAMPOS_ENTRADA, *CAMPOS_METRICAS)
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el puntaje de crédito y la elegibilidad de aprobación de la cartera '
+        'de análisis, recorriéndola por bloques y guardando con bulk_update.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--estado', action='append', choices=AnalisisCredito.EstadoAnalisis.values,
+            help='Filtrar por estado (se puede repetir)'
+        )
+        parser.add_argument(
+            '--tipo-credito', action='append', choices=AnalisisCredito.TipoCredito.values,
+            help='Filtrar por tipo de crédito (se puede repetir)'
+        )
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha de análisis mínima (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha de análisis máxima (AAAA-MM-DD)')
+        parser.add_argument('--tamano-bloque', type=int, default=2000, help='Filas por bloque (por defecto 2000)')
+        parser.add_argument(
+            '--checkpoint', type=Path,
+            help='Archivo JSON donde se guarda el último id procesado para poder reanudar'
+        )
+        parser.add_argument(
+            '--reanudar', action='store_true',
+            help='Continuar desde el último id guardado en el checkpoint'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Calcular sin escribir en la base de datos')
+
+    def handle(self, *args, **options):
+        tamano_bloque = options['tamano_bloque']
+        if tamano_bloque < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+        if options['reanudar'] and not options['checkpoint']:
+            raise CommandError('--reanudar requiere --checkpoint')
+
+        queryset = self.filtrar(AnalisisCredito.objects.all(), options)
+        estado = self.leer_checkpoint(options)
+
+        inicio = time.monotonic()
+        procesados_sesion = 0
+        while True:
+            filas = list(
+                queryset.filter(pk__gt=estado['ultimo_id'])
+                .order_by('pk')
+                .values_list(*CAMPOS)[:tamano_bloque]
+            )
+            if not filas:
+                break
+
+            actualizados, aprobables = self.procesar_bloque(filas, options['dry_run'])
+
+            estado['ultimo_id'] = filas[-1][0]
+            estado['procesados'] += len(filas)
+            estado['actualizados'] += actualizados
+            estado['aprobables'] += aprobables
+            procesados_sesion += len(filas)
+            if options['checkpoint'] and not options['dry_run']:
+                self.guardar_checkpoint(options['checkpoint'], estado)
+
+            if options['verbosity'] >= 2:
+                self.stdout.write(
+                    f"  id <= {estado['ultimo_id']}: {estado['procesados']} filas "
+                    f"({self.velocidad(procesados_sesion, inicio):.0f} filas/s)"
+                )
+
+        if options['checkpoint'] and not options['dry_run']:
+            options['checkpoint'].unlink(missing_ok=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Procesadas {estado['procesados']} filas, {estado['actualizados']} actualizadas, "
+            f"{estado['aprobables']} aprobables "
+            f"({self.velocidad(procesados_sesion, inicio):.0f} filas/s)"
+        ))
+
+    def filtrar(self, queryset, options):
+        if options['estado']:
+            queryset = queryset.filter(estado__in=options['estado'])
+        if options['tipo_credito']:
+            queryset = queryset.filter(tipo_credito__in=options['tipo_credito'])
+        if options['desde']:
+            queryset = queryset.filter(fecha_analisis__date__gte=options['desde'])
+        if options['hasta']:
+            queryset = queryset.filter(fecha_analisis__date__lte=options['hasta'])
+        return queryset
+
+    def procesar_bloque(self, filas, dry_run):
+        """
+        Puntúa un bloque completo de una vez, recalcula las métricas persistidas
+        (incluida la elegibilidad) y escribe solo las filas que cambian.
+        """
+        columnas = list(zip(*filas))
+        ingresos, gastos, deuda, monto, plazo, tasa = (
+            np.array(columna, dtype=float) for columna in columnas[2:8]
+        )
+        puntajes = calcular_puntajes(ingresos, gastos, deuda, monto, plazo, tasa)['puntaje'].tolist()
+
+        cambios = []
+        aprobables = 0
+        for fila, puntaje in zip(filas, puntajes):
+            analisis = AnalisisCredito(**dict(zip(CAMPOS, fila)))
+            cambio = analisis.puntaje_credito != puntaje
+            analisis.puntaje_credito = puntaje
+            if analisis.actualizar_metricas() or cambio:
+                cambios.append(analisis)
+            aprobables += analisis.es_aprobable
+
+        if cambios and not dry_run:
+            AnalisisCredito.objects.bulk_update(cambios, ['puntaje_credito', *CAMPOS_METRICAS])
+        return len(cambios), aprobables
+
+    def leer_checkpoint(self, options):
+        estado = {'ultimo_id': 0, 'procesados': 0, 'actualizados': 0, 'aprobables': 0}
+        checkpoint = options['checkpoint']
+        if options['reanudar'] and checkpoint.exists():
+            try:
+                estado.update(json.loads(checkpoint.read_text()))
+            except ValueError:
+                raise CommandError(f'Checkpoint inválido: {checkpoint}')
+            self.stdout.write(f"Reanudando desde el id {estado['ultimo_id']}")
+        return estado
+
+    def guardar_checkpoint(self, checkpoint, estado):
+        # Escribir a un archivo temporal y renombrar para no dejar un checkpoint a medias
+        temporal = checkpoint.with_name(checkpoint.name + '.tmp')
+        temporal.write_text(json.dumps(estado))
+        temporal.replace(checkpoint)
+
+    @staticmethod
+    def velocidad(filas, inicio):
+        return filas / max(time.monotonic() - inicio, 1e-9)
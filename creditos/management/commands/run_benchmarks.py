@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos import benchmarks
+from creditos.management.commands.compare_benchmarks import informar
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las funciones de puntaje y de cálculo financiero (cuota mensual, capacidad '
+        'de pago, nivel de riesgo, reglas de aprobación y puntaje de la API) y guarda los '
+        'resultados como JSON para compararlos con compare_benchmarks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombres', nargs='*', metavar='benchmark',
+                            help='Benchmarks a ejecutar (por defecto todos: %s)' % ', '.join(benchmarks.BENCHMARKS))
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados (la línea base)')
+        parser.add_argument('--comparar', metavar='BASE',
+                            help='Comparar con una línea base y fallar si hay regresiones')
+        parser.add_argument('--umbral', type=float, default=benchmarks.UMBRAL,
+                            help='Aumento en %% a partir del cual hay regresión (por defecto %(default)s)')
+        parser.add_argument('--muestras', type=int, default=benchmarks.MUESTRAS,
+                            help='Análisis de la muestra (por defecto %(default)s)')
+        parser.add_argument('--semilla', type=int, default=benchmarks.SEMILLA,
+                            help='Semilla de la muestra (por defecto %(default)s)')
+        parser.add_argument('--repeticiones', type=int, default=benchmarks.REPETICIONES,
+                            help='Repeticiones de cada medición (por defecto %(default)s)')
+        parser.add_argument('--tiempo-minimo', type=float, default=benchmarks.TIEMPO_MINIMO,
+                            help='Segundos mínimos por repetición (por defecto %(default)s)')
+
+    def handle(self, *args, **options):
+        desconocidos = [n for n in options['nombres'] if n not in benchmarks.BENCHMARKS]
+        if desconocidos:
+            raise CommandError('Benchmarks desconocidos: %s' % ', '.join(desconocidos))
+        if options['muestras'] < 1 or options['repeticiones'] < 1:
+            raise CommandError('--muestras y --repeticiones deben ser mayores que cero')
+        if options['tiempo_minimo'] <= 0:
+            raise CommandError('--tiempo-minimo debe ser mayor que cero')
+        base = None
+        if options['comparar']:
+            try:
+                base = benchmarks.cargar(options['comparar'])
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+
+        def progreso(nombre, resultado):
+            self.stdout.write(
+                f'{nombre:<32} {resultado["ns_por_operacion"]:>12,.1f} ns/op '
+                f'(mediana {resultado["mediana_ns"]:,.1f})'
+            )
+
+        documento = benchmarks.ejecutar(
+            options['nombres'], options['muestras'], options['semilla'],
+            options['repeticiones'], options['tiempo_minimo'], progreso,
+        )
+        if options['salida']:
+            benchmarks.guardar(documento, options['salida'])
+            self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {options["salida"]}'))
+
+        if base is not None:
+            informar(self, benchmarks.comparar(base, documento, options['umbral']), options['umbral'])
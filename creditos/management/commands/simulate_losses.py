@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos import simulacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Simula por Monte Carlo las pérdidas de la cartera aprobada (modelo de un '
+        'factor) y guarda la pérdida esperada e inesperada, el VaR y el ES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenarios', type=int, default=10000,
+                            help='Número de escenarios (por defecto %(default)s)')
+        parser.add_argument('--semilla', type=int, help='Semilla para reproducir una simulación')
+        parser.add_argument('--correlacion', type=float,
+                            help='Correlación con el factor sistémico (por defecto SIMULACION_CORRELACION)')
+        parser.add_argument('--procesos', type=int,
+                            help='Procesos en paralelo (por defecto SIMULACION_PROCESOS o uno por CPU)')
+        parser.add_argument('--no-guardar', action='store_true', help='No guardar el resultado')
+
+    def handle(self, *args, **options):
+        if options['escenarios'] < 1:
+            raise CommandError('--escenarios debe ser mayor que cero')
+        if options['procesos'] is not None and options['procesos'] < 1:
+            raise CommandError('--procesos debe ser mayor que cero')
+        correlacion = options['correlacion']
+        if correlacion is not None and not 0 <= correlacion < 1:
+            raise CommandError('--correlacion debe estar entre 0 y 1')
+
+        def progreso(completados):
+            if options["verbosity"] > 1:
+                self.stdout.write(f'{completados}/{options["escenarios"]} escenarios')
+
+        resumen = simulacion.ejecutar_simulacion(
+            options['escenarios'], options['semilla'], correlacion, options['procesos'],
+            guardar=not options['no_guardar'], progreso=progreso,
+        )
+        self.stdout.write(f'Préstamos: {resumen["prestamos"]}  Exposición: {resumen["exposicion_total"]:,.2f}')
+        self.stdout.write(f'Pérdida esperada: {resumen["perdida_esperada"]:,.2f} '
+                          f'(analítica {resumen["perdida_esperada_teorica"]:,.2f})')
+        self.stdout.write(f'Pérdida inesperada: {resumen["perdida_inesperada"]:,.2f}')
+        for nivel, valor in resumen['var'].items():
+            self.stdout.write(f'VaR {float(nivel):.1%}: {valor:,.2f}  ES: {resumen["es"][nivel]:,.2f}')
+        sorteos = resumen['prestamos'] * resumen['escenarios'] / max(resumen['segundos'], 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Simulados {resumen["escenarios"]} escenarios en {resumen["segundos"]:.1f}s '
+            f'({sorteos:,.0f} sorteos/s, semilla {resumen["semilla"]})'
+        ))
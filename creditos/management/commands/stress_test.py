@@ -0,0 +1,71 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from creditos import estres
+from creditos.models import AnalisisCredito
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de estrés de la elegibilidad de aprobación de la cartera: cuántos '
+        'análisis elegibles (y por qué monto) dejan de serlo en cada escenario de '
+        'subida de tasas y caída de ingresos, por tipo de crédito.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escenario', action='append', default=[],
+            help='Escenario "tasa=PB,ingresos=%%,gastos=%%", p. ej. "tasa=300,ingresos=-10" '
+                 '(se puede repetir; por defecto un conjunto de escenarios estándar)'
+        )
+        parser.add_argument(
+            '--estado', action='append', choices=AnalisisCredito.EstadoAnalisis.values,
+            help='Filtrar por estado (se puede repetir)'
+        )
+        parser.add_argument(
+            '--tipo-credito', action='append', choices=AnalisisCredito.TipoCredito.values,
+            help='Filtrar por tipo de crédito (se puede repetir)'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=estres.TAMANO_BLOQUE,
+                            help='Filas por bloque (por defecto %(default)s)')
+        parser.add_argument('--json', action='store_true', help='Escribir el resultado en JSON')
+
+    def handle(self, *args, **options):
+        if options['tamano_bloque'] < 1:
+            raise CommandError('--tamano-bloque debe ser mayor que cero')
+        try:
+            escenarios = [estres.parsear_escenario(texto) for texto in options['escenario']]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        queryset = AnalisisCredito.objects.all()
+        if options['estado']:
+            queryset = queryset.filter(estado__in=options['estado'])
+        if options['tipo_credito']:
+            queryset = queryset.filter(tipo_credito__in=options['tipo_credito'])
+
+        inicio = time.monotonic()
+        resultados = estres.estresar_cartera(escenarios or estres.ESCENARIOS_DEFECTO, queryset, options['tamano_bloque'])
+        segundos = max(time.monotonic() - inicio, 1e-9)
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, ensure_ascii=False, indent=2))
+            return
+
+        for resultado in resultados:
+            self.stdout.write(
+                f"{resultado['nombre']}: {resultado['pierden']} de {resultado['elegibles_base']} elegibles "
+                f"dejan de serlo ({resultado['monto_pierden']:,.2f})"
+            )
+            for tipo, datos in resultado['por_tipo'].items():
+                self.stdout.write(
+                    f"  {AnalisisCredito.TipoCredito(tipo).label}: {datos['pierden']} de "
+                    f"{datos['elegibles_base']} ({datos['monto_pierden']:,.2f})"
+                )
+        prestamos = resultados[0]['prestamos'] if resultados else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Evaluados {len(resultados)} escenarios sobre {prestamos} análisis en {segundos:.1f}s '
+            f'({prestamos * len(resultados) / segundos:.0f} evaluaciones/s)'
+        ))
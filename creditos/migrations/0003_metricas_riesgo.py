@@ -0,0 +1,101 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:41
+
+from django.db import migrations, models
+
+from decimal import Decimal
+
+
+# Copia congelada de creditos/riesgo.py tal como era al crear esta migración:
+# las migraciones no deben depender del código actual de la app.
+CAMPOS_ENTRADA = (
+    'puntaje_credito', 'ingresos_mensuales', 'gastos_mensuales', 'deuda_actual',
+    'monto_solicitado', 'plazo_meses', 'tasa_interes',
+)
+CAMPOS_METRICAS = ('capacidad_pago', 'cuota_mensual_estimada', 'banda_riesgo', 'es_aprobable')
+CENTAVOS = Decimal('0.01')
+
+
+def calcular_banda_riesgo(puntaje_credito):
+    if puntaje_credito is None:
+        return 'NOE'
+    for minimo, banda in ((800, 'EXC'), (700, 'BUE'), (600, 'ACE')):
+        if puntaje_credito >= minimo:
+            return banda
+    return 'RIE'
+
+
+def calcular_metricas(puntaje_credito, ingresos_mensuales, gastos_mensuales, deuda_actual,
+                      monto_solicitado, plazo_meses, tasa_interes):
+    if ingresos_mensuales <= 0:
+        capacidad = Decimal(0)
+    else:
+        capacidad = (Decimal(ingresos_mensuales) - Decimal(gastos_mensuales)) * Decimal('0.3')
+    cuota = Decimal(0)
+    if plazo_meses and tasa_interes:
+        tasa_mensual = (Decimal(tasa_interes) / 100) / 12
+        factor = (1 + tasa_mensual) ** plazo_meses
+        cuota = round(monto_solicitado * (tasa_mensual * factor) / (factor - 1), 2)
+    es_aprobable = (
+        bool(puntaje_credito) and puntaje_credito >= 650
+        and cuota <= capacidad
+        and Decimal(deuda_actual) + Decimal(monto_solicitado) <= Decimal(ingresos_mensuales) * 12 * Decimal('0.4')
+    )
+    return {
+        'capacidad_pago': capacidad.quantize(CENTAVOS),
+        'cuota_mensual_estimada': cuota.quantize(CENTAVOS),
+        'banda_riesgo': calcular_banda_riesgo(puntaje_credito),
+        'es_aprobable': es_aprobable,
+    }
+
+
+def calcular_metricas_existentes(apps, schema_editor):
+    AnalisisCredito = apps.get_model('creditos', 'AnalisisCredito')
+    ultimo_id = 0
+    while True:
+        bloque = list(
+            AnalisisCredito.objects.filter(pk__gt=ultimo_id).order_by('pk')
+            .only(*CAMPOS_ENTRADA)[:2000]
+        )
+        if not bloque:
+            break
+        for analisis in bloque:
+            metricas = calcular_metricas(*(getattr(analisis, campo) for campo in CAMPOS_ENTRADA))
+            for campo, valor in metricas.items():
+                setattr(analisis, campo, valor)
+        AnalisisCredito.objects.bulk_update(bloque, CAMPOS_METRICAS)
+        ultimo_id = bloque[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditos', '0002_consentlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analisiscredito',
+            name='banda_riesgo',
+            field=models.CharField(choices=[('NOE', 'No evaluado'), ('EXC', 'Excelente'), ('BUE', 'Bueno'), ('ACE', 'Aceptable'), ('RIE', 'Riesgoso')], db_index=True, default='NOE', editable=False, max_length=3, verbose_name='Nivel de Riesgo'),
+        ),
+        migrations.AddField(
+            model_name='analisiscredito',
+            name='capacidad_pago',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=15, verbose_name='Capacidad de Pago'),
+        ),
+        migrations.AddField(
+            model_name='analisiscredito',
+            name='cuota_mensual_estimada',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=15, verbose_name='Cuota Mensual Estimada'),
+        ),
+        migrations.AddField(
+            model_name='analisiscredito',
+            name='es_aprobable',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Cumple Reglas de Aprobación'),
+        ),
+        migrations.AddIndex(
+            model_name='analisiscredito',
+            index=models.Index(fields=['estado', 'banda_riesgo', 'cuota_mensual_estimada'], name='creditos_estado_banda_cuota'),
+        ),
+        migrations.RunPython(calcular_metricas_existentes, migrations.RunPython.noop),
+    ]
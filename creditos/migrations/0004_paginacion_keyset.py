@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditos', '0003_metricas_riesgo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analisiscredito',
+            index=models.Index(fields=['-fecha_analisis', '-id'], name='creditos_fecha_id'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditos', '0004_paginacion_keyset'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='consentlog',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='consentlog',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
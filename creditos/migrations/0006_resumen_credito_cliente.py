@@ -0,0 +1,106 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:53
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+import django.db.models.deletion
+
+
+# Copia congelada del cálculo de creditos/resumen.py tal como era al crear esta
+# migración: las migraciones no deben depender del código actual de la app.
+CONTADORES_ESTADO = {
+    'pendientes': 'PEN',
+    'aprobados': 'APR',
+    'rechazados': 'REC',
+    'en_espera': 'ESP',
+    'cancelados': 'CAN',
+}
+CAMPOS_ULTIMO = {
+    'ultimo_fecha': 'fecha_analisis',
+    'ultimo_puntaje': 'puntaje_credito',
+    'ultimo_estado': 'estado',
+    'ultimo_tipo_credito': 'tipo_credito',
+    'ultimo_monto': 'monto_solicitado',
+    'ultimo_plazo': 'plazo_meses',
+    'ultimo_tasa': 'tasa_interes',
+    'deuda_actual': 'deuda_actual',
+}
+
+
+def calcular_resumenes(apps, schema_editor):
+    Cliente = apps.get_model('clientes', 'Cliente')
+    AnalisisCredito = apps.get_model('creditos', 'AnalisisCredito')
+    ResumenCreditoCliente = apps.get_model('creditos', 'ResumenCreditoCliente')
+
+    ultimo = (
+        AnalisisCredito.objects.filter(cliente=OuterRef('cliente'))
+        .order_by('-fecha_analisis', '-pk').values('pk')[:1]
+    )
+    ultimo_id = 0
+    while True:
+        ids = list(Cliente.objects.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:500])
+        if not ids:
+            break
+        ultimo_id = ids[-1]
+        agregados = list(
+            AnalisisCredito.objects.filter(cliente_id__in=ids)
+            .order_by().values('cliente')
+            .annotate(
+                total_analisis=Count('pk'),
+                **{campo: Count('pk', filter=Q(estado=estado)) for campo, estado in CONTADORES_ESTADO.items()},
+                monto_aprobado=Sum('monto_solicitado', filter=Q(estado='APR')),
+                ultimo_id=Subquery(ultimo),
+            )
+        )
+        ultimos = AnalisisCredito.objects.in_bulk([fila['ultimo_id'] for fila in agregados])
+        ResumenCreditoCliente.objects.bulk_create([
+            ResumenCreditoCliente(
+                cliente_id=fila['cliente'],
+                total_analisis=fila['total_analisis'],
+                **{campo: fila[campo] for campo in CONTADORES_ESTADO},
+                monto_aprobado=fila['monto_aprobado'] or Decimal('0'),
+                ultimo_analisis_id=fila['ultimo_id'],
+                **{campo: getattr(ultimos[fila['ultimo_id']], origen) for campo, origen in CAMPOS_ULTIMO.items()},
+            )
+            for fila in agregados
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_paginacion_keyset'),
+        ('creditos', '0005_indices_consentimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCreditoCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_credito', serialize=False, to='clientes.cliente', verbose_name='Cliente')),
+                ('total_analisis', models.PositiveIntegerField(default=0, verbose_name='Análisis')),
+                ('pendientes', models.PositiveIntegerField(default=0, verbose_name='Pendientes')),
+                ('aprobados', models.PositiveIntegerField(default=0, verbose_name='Aprobados')),
+                ('rechazados', models.PositiveIntegerField(default=0, verbose_name='Rechazados')),
+                ('en_espera', models.PositiveIntegerField(default=0, verbose_name='En espera')),
+                ('cancelados', models.PositiveIntegerField(default=0, verbose_name='Cancelados')),
+                ('monto_aprobado', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Monto Aprobado')),
+                ('deuda_actual', models.DecimalField(decimal_places=2, default=0, help_text='Deuda actual declarada en el último análisis', max_digits=15, verbose_name='Deuda Actual')),
+                ('ultimo_fecha', models.DateTimeField(null=True, verbose_name='Fecha del Último Análisis')),
+                ('ultimo_puntaje', models.PositiveIntegerField(null=True, verbose_name='Último Puntaje')),
+                ('ultimo_estado', models.CharField(blank=True, choices=[('PEN', 'Pendiente'), ('APR', 'Aprobado'), ('REC', 'Rechazado'), ('ESP', 'En espera'), ('CAN', 'Cancelado')], max_length=3, verbose_name='Estado del Último Análisis')),
+                ('ultimo_tipo_credito', models.CharField(blank=True, choices=[('PER', 'Personal'), ('HIP', 'Hipotecario'), ('AUT', 'Automotriz'), ('EDU', 'Educativo'), ('OTR', 'Otro')], max_length=3, verbose_name='Tipo de Crédito del Último Análisis')),
+                ('ultimo_monto', models.DecimalField(decimal_places=2, max_digits=15, null=True, verbose_name='Monto del Último Análisis')),
+                ('ultimo_plazo', models.PositiveIntegerField(null=True, verbose_name='Plazo del Último Análisis')),
+                ('ultimo_tasa', models.DecimalField(decimal_places=2, max_digits=5, null=True, verbose_name='Tasa del Último Análisis')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('ultimo_analisis', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='creditos.analisiscredito', verbose_name='Último Análisis')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Crédito del Cliente',
+                'verbose_name_plural': 'Resúmenes de Crédito de Clientes',
+            },
+        ),
+        migrations.RunPython(calcular_resumenes, migrations.RunPython.noop),
+    ]
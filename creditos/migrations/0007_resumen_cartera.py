@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:05
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def calcular_cartera(apps, schema_editor):
+    # Cálculo congelado de creditos/cartera.py: las migraciones no deben
+    # depender del código actual de la app. El mes se toma en la zona horaria actual.
+    AnalisisCredito = apps.get_model('creditos', 'AnalisisCredito')
+    ResumenCartera = apps.get_model('creditos', 'ResumenCartera')
+    filas = (
+        AnalisisCredito.objects.order_by()
+        .annotate(mes=TruncMonth('fecha_analisis'))
+        .values('mes', 'estado', 'tipo_credito', 'banda_riesgo')
+        .annotate(cantidad=Count('pk'), monto_total=Sum('monto_solicitado'))
+    )
+    ResumenCartera.objects.bulk_create([
+        ResumenCartera(mes=fila.pop('mes').date(), monto_total=fila.pop('monto_total') or Decimal('0'), **fila)
+        for fila in filas
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditos', '0006_resumen_credito_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCartera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mes')),
+                ('estado', models.CharField(choices=[('PEN', 'Pendiente'), ('APR', 'Aprobado'), ('REC', 'Rechazado'), ('ESP', 'En espera'), ('CAN', 'Cancelado')], max_length=3, verbose_name='Estado')),
+                ('tipo_credito', models.CharField(choices=[('PER', 'Personal'), ('HIP', 'Hipotecario'), ('AUT', 'Automotriz'), ('EDU', 'Educativo'), ('OTR', 'Otro')], max_length=3, verbose_name='Tipo de Crédito')),
+                ('banda_riesgo', models.CharField(choices=[('NOE', 'No evaluado'), ('EXC', 'Excelente'), ('BUE', 'Bueno'), ('ACE', 'Aceptable'), ('RIE', 'Riesgoso')], max_length=3, verbose_name='Nivel de Riesgo')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Análisis')),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Monto Solicitado')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Cartera',
+                'verbose_name_plural': 'Resúmenes de Cartera',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumencartera',
+            constraint=models.UniqueConstraint(fields=('mes', 'estado', 'tipo_credito', 'banda_riesgo'), name='creditos_resumen_cartera_unico'),
+        ),
+        migrations.RunPython(calcular_cartera, migrations.RunPython.noop),
+    ]
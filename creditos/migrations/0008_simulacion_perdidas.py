@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditos', '0007_resumen_cartera'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimulacionPerdidas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha')),
+                ('escenarios', models.PositiveIntegerField(verbose_name='Escenarios')),
+                ('prestamos', models.PositiveIntegerField(verbose_name='Préstamos')),
+                ('semilla', models.CharField(max_length=64, verbose_name='Semilla')),
+                ('correlacion', models.FloatField(verbose_name='Correlación')),
+                ('exposicion_total', models.FloatField(verbose_name='Exposición Total')),
+                ('perdida_esperada', models.FloatField(verbose_name='Pérdida Esperada')),
+                ('perdida_inesperada', models.FloatField(verbose_name='Pérdida Inesperada')),
+                ('desviacion', models.FloatField(verbose_name='Desviación Típica')),
+                ('resultados', models.JSONField(default=dict, verbose_name='Resultados')),
+                ('parametros', models.JSONField(default=dict, verbose_name='Parámetros')),
+                ('segundos', models.FloatField(verbose_name='Duración (s)')),
+            ],
+            options={
+                'verbose_name': 'Simulación de Pérdidas',
+                'verbose_name_plural': 'Simulaciones de Pérdidas',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:28
+
+import gestion_riesgo.almacenamiento
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditos', '0008_simulacion_perdidas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentoanalisis',
+            name='archivo',
+            field=models.FileField(db_index=True, storage=gestion_riesgo.almacenamiento.almacenamiento_documentos, upload_to='creditos/documentos/%Y/%m/%d/', verbose_name='Archivo'),
+        ),
+        migrations.CreateModel(
+            name='BlobDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('tamano', models.PositiveBigIntegerField(verbose_name='Tamaño (bytes)')),
+                ('referencias', models.PositiveIntegerField(default=0, verbose_name='Referencias')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('ultimo_uso', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Último Uso')),
+            ],
+            options={
+                'verbose_name': 'Blob de Documento',
+                'verbose_name_plural': 'Blobs de Documentos',
+                'indexes': [models.Index(fields=['referencias', 'ultimo_uso'], name='creditos_blob_gc')],
+            },
+        ),
+    ]
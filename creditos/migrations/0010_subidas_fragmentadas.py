@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clientes', '0004_almacenamiento_documentos'),
+        ('creditos', '0009_almacenamiento_documentos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaFragmentada',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tipo_documento', models.CharField(max_length=20, verbose_name='Tipo de Documento')),
+                ('notas', models.TextField(blank=True, verbose_name='Notas')),
+                ('nombre_archivo', models.CharField(max_length=255, verbose_name='Nombre del Archivo')),
+                ('tamano', models.PositiveBigIntegerField(verbose_name='Tamaño (bytes)')),
+                ('tamano_fragmento', models.PositiveIntegerField(verbose_name='Tamaño del Fragmento (bytes)')),
+                ('fragmentos_recibidos', models.PositiveIntegerField(default=0, verbose_name='Fragmentos Recibidos')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('analisis', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='creditos.analisiscredito', verbose_name='Análisis de Crédito')),
+                ('cliente', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clientes.cliente', verbose_name='Cliente')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Subida Fragmentada',
+                'verbose_name_plural': 'Subidas Fragmentadas',
+            },
+        ),
+    ]
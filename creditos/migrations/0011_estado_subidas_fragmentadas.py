@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('creditos', '0010_subidas_fragmentadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subidafragmentada',
+            name='estado',
+            field=models.CharField(choices=[('ABI', 'Abierta'), ('FIN', 'Finalizando')], default='ABI', max_length=3, verbose_name='Estado'),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import math
+import uuid
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -6,6 +9,125 @@ from django.urls import reverse
 from django.utils import timezone
 
 from clientes.models import Cliente
+from gestion_riesgo.almacenamiento import almacenamiento_documentos
+from . import cartera
+from .amortizacion import tabla_amortizacion_filas
+from .resumen import CAMPOS_ORIGEN, actualizar_resumenes
+from .riesgo import CAMPOS_ENTRADA, CAMPOS_METRICAS, calcular_banda_riesgo, calcular_metricas
+
+
+class AnalisisCreditoQuerySet(models.QuerySet):
+    """
+    QuerySet que mantiene al día las métricas de riesgo persistidas, el
+    resumen por cliente y el resumen de cartera también en las operaciones
+    masivas (bulk_create, bulk_update y update), que no envían señales.
+    bulk_update y update también fijan fecha_actualizacion, que Django solo
+    actualiza en save(): la ficha del cliente la usa para invalidar el
+    fragmento de sus análisis.
+    """
+    TAMANO_BLOQUE = 2000
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.actualizar_metricas()
+        creados = super().bulk_create(objs, *args, **kwargs)
+        actualizar_resumenes({obj.cliente_id for obj in objs})
+        deltas = {}
+        for obj in objs:
+            cartera.acumular(deltas, cartera.contribucion(obj))
+            obj._cartera_original = cartera.contribucion(obj)
+        cartera.aplicar_deltas(deltas)
+        return creados
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        objs = list(objs)
+        if set(fields) & set(CAMPOS_ENTRADA):
+            for obj in objs:
+                obj.actualizar_metricas()
+            fields += [campo for campo in CAMPOS_METRICAS if campo not in fields]
+        if 'fecha_actualizacion' not in fields:
+            ahora = timezone.now()
+            for obj in objs:
+                obj.fecha_actualizacion = ahora
+            fields.append('fecha_actualizacion')
+        filas = super().bulk_update(objs, fields, *args, **kwargs)
+        if set(fields) & set(CAMPOS_ORIGEN):
+            # Los objetos pueden no traer cliente_id (como en rescore_portfolio): se lee de la base de datos
+            anteriores = {getattr(obj, '_cliente_id_original', None) for obj in objs} - {None}
+            ids = [obj.pk for obj in objs]
+            for inicio in range(0, len(ids), self.TAMANO_BLOQUE):
+                actualizar_resumenes(set(
+                    self.model._default_manager.filter(pk__in=ids[inicio:inicio + self.TAMANO_BLOQUE])
+                    .values_list('cliente_id', flat=True)
+                ))
+            actualizar_resumenes(anteriores)
+        if set(fields) & set(cartera.CAMPOS_ORIGEN):
+            # Meses anteriores (si se conocen) y actuales de los análisis modificados
+            meses = {
+                obj._cartera_original[0][0] for obj in objs
+                if getattr(obj, '_cartera_original', None) is not None
+            }
+            ids = [obj.pk for obj in objs]
+            for inicio in range(0, len(ids), self.TAMANO_BLOQUE):
+                meses |= cartera.meses_de(
+                    self.model._default_manager.filter(pk__in=ids[inicio:inicio + self.TAMANO_BLOQUE])
+                )
+            cartera.recalcular_meses(meses)
+            for obj in objs:
+                obj._cartera_original = cartera.contribucion(obj)
+        return filas
+    
+    def update(self, **kwargs):
+        kwargs.setdefault('fecha_actualizacion', timezone.now())
+        # Si se modifican campos de entrada sin aportar las métricas (como hace
+        # bulk_update), hay que recalcularlas para las filas afectadas
+        recalcular = bool(set(kwargs) & set(CAMPOS_ENTRADA)) and not set(CAMPOS_METRICAS) <= set(kwargs)
+        afecta_resumen = bool(set(kwargs) & set(CAMPOS_ORIGEN))
+        afecta_cartera = recalcular or bool(set(kwargs) & set(cartera.CAMPOS_ORIGEN))
+        if not recalcular and not afecta_resumen and not afecta_cartera:
+            return super().update(**kwargs)
+        afectadas = list(self.values_list('pk', 'cliente_id'))
+        meses = cartera.meses_de(self) if afecta_cartera else set()
+        ids = [pk for pk, _cliente_id in afectadas]
+        filas = super().update(**kwargs)
+        for inicio in range(0, len(ids), self.TAMANO_BLOQUE):
+            bloque = self.model._default_manager.filter(pk__in=ids[inicio:inicio + self.TAMANO_BLOQUE])
+            clientes = {cliente_id for _pk, cliente_id in afectadas[inicio:inicio + self.TAMANO_BLOQUE]}
+            if recalcular:
+                bloque.recalcular_metricas()
+            if afecta_resumen:
+                if 'cliente' in kwargs or 'cliente_id' in kwargs:
+                    # Los análisis pasaron a otro cliente: actualizar también el nuevo
+                    clientes |= set(bloque.values_list('cliente_id', flat=True))
+                actualizar_resumenes(clientes)
+            if afecta_cartera and 'fecha_analisis' in kwargs:
+                meses |= cartera.meses_de(bloque)
+        if meses:
+            cartera.recalcular_meses(meses)
+        return filas
+    
+    update.alters_data = True
+    
+    def recalcular_metricas(self):
+        """Recalcula y guarda por bloques las métricas de todas las filas del queryset"""
+        ultimo_id = 0
+        actualizadas = 0
+        while True:
+            bloque = list(
+                self.filter(pk__gt=ultimo_id).order_by('pk')
+                .only(*CAMPOS_ENTRADA, *CAMPOS_METRICAS)[:self.TAMANO_BLOQUE]
+            )
+            if not bloque:
+                return actualizadas
+            ultimo_id = bloque[-1].pk
+            cambios = [obj for obj in bloque if obj.actualizar_metricas()]
+            if cambios:
+                self.bulk_update(cambios, CAMPOS_METRICAS)
+                actualizadas += len(cambios)
+    
+    recalcular_metricas.alters_data = True
 
 
 class AnalisisCredito(models.Model):
@@ -24,6 +146,13 @@ class AnalisisCredito(models.Model):
         EDUCATIVO = 'EDU', _('Educativo')
         OTRO = 'OTR', _('Otro')
     
+    class NivelRiesgo(models.TextChoices):
+        NO_EVALUADO = 'NOE', _('No evaluado')
+        EXCELENTE = 'EXC', _('Excelente')
+        BUENO = 'BUE', _('Bueno')
+        ACEPTABLE = 'ACE', _('Aceptable')
+        RIESGOSO = 'RIE', _('Riesgoso')
+    
     cliente = models.ForeignKey(
         Cliente,
         on_delete=models.CASCADE,
@@ -120,6 +249,42 @@ class AnalisisCredito(models.Model):
         help_text=_('Observaciones adicionales sobre el análisis')
     )
     
+    # Métricas derivadas, persistidas para poder filtrar y ordenar en la base de datos.
+    # Se recalculan en save() y en las operaciones masivas del QuerySet.
+    capacidad_pago = models.DecimalField(
+        _('Capacidad de Pago'),
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        db_index=True
+    )
+    
+    cuota_mensual_estimada = models.DecimalField(
+        _('Cuota Mensual Estimada'),
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        db_index=True
+    )
+    
+    banda_riesgo = models.CharField(
+        _('Nivel de Riesgo'),
+        max_length=3,
+        choices=NivelRiesgo.choices,
+        default=NivelRiesgo.NO_EVALUADO,
+        editable=False,
+        db_index=True
+    )
+    
+    es_aprobable = models.BooleanField(
+        _('Cumple Reglas de Aprobación'),
+        default=False,
+        editable=False,
+        db_index=True
+    )
+    
     fecha_analisis = models.DateTimeField(
         _('Fecha de Análisis'),
         auto_now_add=True
@@ -130,10 +295,20 @@ class AnalisisCredito(models.Model):
         auto_now=True
     )
     
+    objects = AnalisisCreditoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Análisis de Crédito')
         verbose_name_plural = _('Análisis de Créditos')
         ordering = ['-fecha_analisis']
+        indexes = [
+            models.Index(
+                fields=['estado', 'banda_riesgo', 'cuota_mensual_estimada'],
+                name='creditos_estado_banda_cuota'
+            ),
+            # Paginación por cursor sobre el orden por defecto
+            models.Index(fields=['-fecha_analisis', '-id'], name='creditos_fecha_id'),
+        ]
         permissions = [
             ('can_approve_credit', 'Puede aprobar créditos'),
             ('can_reject_credit', 'Puede rechazar créditos'),
@@ -145,55 +320,47 @@ class AnalisisCredito(models.Model):
     def get_absolute_url(self):
         return reverse('creditos:analisis_detalle', kwargs={'pk': self.pk})
     
-    @property
-    def capacidad_pago(self):
-        """Calcula la capacidad de pago mensual"""
-        if self.ingresos_mensuales <= 0:
-            return 0
-        return (self.ingresos_mensuales - self.gastos_mensuales) * 0.3  # 30% del ingreso disponible
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Cliente al cargar, para actualizar también su resumen si el análisis cambia de cliente
+        instancia._cliente_id_original = instancia.__dict__.get('cliente_id')
+        # Aportación al resumen de cartera al cargar, para aplicar solo la diferencia al guardar
+        instancia._cartera_original = cartera.contribucion(instancia)
+        return instancia
     
-    @property
-    def cuota_mensual_estimada(self):
-        """Calcula la cuota mensual estimada"""
-        if self.plazo_meses == 0 or self.tasa_interes == 0:
-            return 0
-        
-        # Fórmula para calcular la cuota de un préstamo: P * (r(1+r)^n) / ((1+r)^n - 1)
-        # Donde P es el principal, r es la tasa de interés mensual, n es el número de pagos
-        tasa_mensual = (self.tasa_interes / 100) / 12
-        factor = (1 + tasa_mensual) ** self.plazo_meses
-        cuota = self.monto_solicitado * (tasa_mensual * factor) / (factor - 1)
-        return round(cuota, 2)
+    def save(self, *args, **kwargs):
+        self.actualizar_metricas()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(CAMPOS_ENTRADA):
+            kwargs['update_fields'] = set(update_fields) | set(CAMPOS_METRICAS)
+        super().save(*args, **kwargs)
+    
+    def calcular_metricas(self):
+        """Calcula capacidad de pago, cuota, banda de riesgo y elegibilidad a partir de los datos actuales"""
+        return calcular_metricas(*(getattr(self, campo) for campo in CAMPOS_ENTRADA))
+    
+    def actualizar_metricas(self):
+        """Asigna las métricas calculadas a sus columnas. Devuelve True si alguna cambió."""
+        cambio = False
+        for campo, valor in self.calcular_metricas().items():
+            if getattr(self, campo) != valor:
+                setattr(self, campo, valor)
+                cambio = True
+        return cambio
+    
+    def get_tabla_amortizacion(self):
+        """Devuelve la tabla de amortización completa del crédito solicitado"""
+        return tabla_amortizacion_filas(self.monto_solicitado, self.tasa_interes, self.plazo_meses)
     
     @property
     def nivel_riesgo(self):
         """Determina el nivel de riesgo basado en el puntaje de crédito"""
-        if self.puntaje_credito is None:
-            return _('No evaluado')
-        elif self.puntaje_credito >= 800:
-            return _('Excelente')
-        elif self.puntaje_credito >= 700:
-            return _('Bueno')
-        elif self.puntaje_credito >= 600:
-            return _('Aceptable')
-        else:
-            return _('Riesgoso')
+        return self.NivelRiesgo(calcular_banda_riesgo(self.puntaje_credito)).label
     
     def puede_aprobar(self):
         """Determina si el crédito puede ser aprobado basado en reglas de negocio"""
-        if not self.puntaje_credito or self.puntaje_credito < 650:
-            return False
-        
-        # Verificar que la cuota no exceda el 30% de los ingresos mensuales
-        if self.cuota_mensual_estimada > self.capacidad_pago:
-            return False
-            
-        # Verificar que la deuda total no exceda el 40% de los ingresos anuales
-        deuda_total = self.deuda_actual + self.monto_solicitado
-        if deuda_total > (self.ingresos_mensuales * 12 * 0.4):
-            return False
-            
-        return True
+        return self.calcular_metricas()['es_aprobable']
 
 
 class DocumentoAnalisis(models.Model):
@@ -221,7 +388,10 @@ class DocumentoAnalisis(models.Model):
     
     archivo = models.FileField(
         _('Archivo'),
-        upload_to='creditos/documentos/%Y/%m/%d/'
+        upload_to='creditos/documentos/%Y/%m/%d/',
+        # Un archivo por contenido, compartido entre documentos (ver gestion_riesgo/almacenamiento.py)
+        storage=almacenamiento_documentos,
+        db_index=True
     )
     
     fecha_subida = models.DateTimeField(
@@ -244,6 +414,224 @@ class DocumentoAnalisis(models.Model):
     
     def get_absolute_url(self):
         return self.archivo.url if self.archivo else '#'
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Archivo al cargar, para ajustar las referencias de los blobs si cambia
+        instancia._archivo_original = instancia.__dict__.get('archivo')
+        return instancia
+
+
+class BlobDocumento(models.Model):
+    """
+    Archivo de documento guardado una sola vez por su contenido (ver
+    gestion_riesgo/almacenamiento.py). `referencias` cuenta los
+    DocumentoAnalisis y DocumentoCliente que lo usan; gc_document_blobs borra
+    los que llegan a cero.
+    """
+    digest = models.CharField(_('SHA-256'), max_length=64, unique=True)
+    nombre = models.CharField(_('Nombre'), max_length=100, unique=True)
+    tamano = models.PositiveBigIntegerField(_('Tamaño (bytes)'))
+    referencias = models.PositiveIntegerField(_('Referencias'), default=0)
+    creado = models.DateTimeField(_('Creado'), auto_now_add=True)
+    ultimo_uso = models.DateTimeField(_('Último Uso'), default=timezone.now)
+    
+    class Meta:
+        verbose_name = _('Blob de Documento')
+        verbose_name_plural = _('Blobs de Documentos')
+        indexes = [
+            # Candidatos del recolector
+            models.Index(fields=['referencias', 'ultimo_uso'], name='creditos_blob_gc'),
+        ]
+    
+    def __str__(self):
+        return self.nombre
+
+
+class SubidaFragmentada(models.Model):
+    """
+    Subida de un documento por fragmentos, en curso (ver creditos/subidas.py).
+    Se elimina al crear el documento, al cancelarla o, si se abandona, con
+    gc_document_blobs.
+    """
+    class EstadoSubida(models.TextChoices):
+        ABIERTA = 'ABI', _('Abierta')
+        FINALIZANDO = 'FIN', _('Finalizando')
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Usuario')
+    )
+    # Documento a crear: de un análisis o de un cliente
+    analisis = models.ForeignKey(
+        AnalisisCredito,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+        verbose_name=_('Análisis de Crédito')
+    )
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+        verbose_name=_('Cliente')
+    )
+    tipo_documento = models.CharField(_('Tipo de Documento'), max_length=20)
+    notas = models.TextField(_('Notas'), blank=True)
+    nombre_archivo = models.CharField(_('Nombre del Archivo'), max_length=255)
+    tamano = models.PositiveBigIntegerField(_('Tamaño (bytes)'))
+    tamano_fragmento = models.PositiveIntegerField(_('Tamaño del Fragmento (bytes)'))
+    fragmentos_recibidos = models.PositiveIntegerField(_('Fragmentos Recibidos'), default=0)
+    # Una sola petición de finalizar puede pasarla a FINALIZANDO (ver subidas.finalizar)
+    estado = models.CharField(_('Estado'), max_length=3, choices=EstadoSubida.choices, default=EstadoSubida.ABIERTA)
+    creado = models.DateTimeField(_('Creado'), auto_now_add=True)
+    actualizado = models.DateTimeField(_('Última Actualización'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Subida Fragmentada')
+        verbose_name_plural = _('Subidas Fragmentadas')
+    
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.fragmentos_recibidos}/{self.total_fragmentos})"
+    
+    @property
+    def total_fragmentos(self):
+        return math.ceil(self.tamano / self.tamano_fragmento)
+    
+    def longitud_fragmento(self, numero):
+        """Bytes que debe tener el fragmento `numero` (empezando en 0)"""
+        return min(self.tamano_fragmento, self.tamano - numero * self.tamano_fragmento)
+
+
+class ResumenCreditoCliente(models.Model):
+    """
+    Resumen materializado de los análisis de crédito de un cliente. Se
+    actualiza con las señales de AnalisisCredito y con las operaciones
+    masivas de su QuerySet (ver creditos/resumen.py); los clientes sin
+    análisis no tienen resumen.
+    """
+    cliente = models.OneToOneField(
+        Cliente,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen_credito',
+        verbose_name=_('Cliente')
+    )
+    total_analisis = models.PositiveIntegerField(_('Análisis'), default=0)
+    pendientes = models.PositiveIntegerField(_('Pendientes'), default=0)
+    aprobados = models.PositiveIntegerField(_('Aprobados'), default=0)
+    rechazados = models.PositiveIntegerField(_('Rechazados'), default=0)
+    en_espera = models.PositiveIntegerField(_('En espera'), default=0)
+    cancelados = models.PositiveIntegerField(_('Cancelados'), default=0)
+    monto_aprobado = models.DecimalField(_('Monto Aprobado'), max_digits=15, decimal_places=2, default=0)
+    deuda_actual = models.DecimalField(
+        _('Deuda Actual'), max_digits=15, decimal_places=2, default=0,
+        help_text=_('Deuda actual declarada en el último análisis')
+    )
+    
+    # Último análisis (por fecha), copiado para no tener que leerlo
+    ultimo_analisis = models.ForeignKey(
+        AnalisisCredito,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name=_('Último Análisis')
+    )
+    ultimo_fecha = models.DateTimeField(_('Fecha del Último Análisis'), null=True)
+    ultimo_puntaje = models.PositiveIntegerField(_('Último Puntaje'), null=True)
+    ultimo_estado = models.CharField(
+        _('Estado del Último Análisis'), max_length=3, choices=AnalisisCredito.EstadoAnalisis.choices, blank=True
+    )
+    ultimo_tipo_credito = models.CharField(
+        _('Tipo de Crédito del Último Análisis'), max_length=3, choices=AnalisisCredito.TipoCredito.choices, blank=True
+    )
+    ultimo_monto = models.DecimalField(_('Monto del Último Análisis'), max_digits=15, decimal_places=2, null=True)
+    ultimo_plazo = models.PositiveIntegerField(_('Plazo del Último Análisis'), null=True)
+    ultimo_tasa = models.DecimalField(_('Tasa del Último Análisis'), max_digits=5, decimal_places=2, null=True)
+    
+    actualizado = models.DateTimeField(_('Última Actualización'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Resumen de Crédito del Cliente')
+        verbose_name_plural = _('Resúmenes de Crédito de Clientes')
+    
+    def __str__(self):
+        return f"Resumen de crédito - {self.cliente_id}"
+    
+    @classmethod
+    def de_cliente(cls, cliente):
+        """Resumen del cliente (usando select_related si se cargó), o None si no tiene análisis"""
+        try:
+            return cliente.resumen_credito
+        except cls.DoesNotExist:
+            return None
+
+class ResumenCartera(models.Model):
+    """
+    Resumen agregado de la cartera: número de análisis y monto solicitado por
+    mes, estado, tipo de crédito y nivel de riesgo. Se actualiza con las
+    señales de AnalisisCredito y con las operaciones masivas de su QuerySet
+    (ver creditos/cartera.py).
+    """
+    mes = models.DateField(_('Mes'))
+    estado = models.CharField(_('Estado'), max_length=3, choices=AnalisisCredito.EstadoAnalisis.choices)
+    tipo_credito = models.CharField(_('Tipo de Crédito'), max_length=3, choices=AnalisisCredito.TipoCredito.choices)
+    banda_riesgo = models.CharField(_('Nivel de Riesgo'), max_length=3, choices=AnalisisCredito.NivelRiesgo.choices)
+    cantidad = models.IntegerField(_('Análisis'), default=0)
+    monto_total = models.DecimalField(_('Monto Solicitado'), max_digits=18, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = _('Resumen de Cartera')
+        verbose_name_plural = _('Resúmenes de Cartera')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['mes', 'estado', 'tipo_credito', 'banda_riesgo'],
+                name='creditos_resumen_cartera_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.mes:%Y-%m} {self.estado}/{self.tipo_credito}/{self.banda_riesgo}: {self.cantidad}"
+
+
+class SimulacionPerdidas(models.Model):
+    """Resultado de una simulación Monte Carlo de pérdidas de la cartera aprobada (ver creditos/simulacion.py)"""
+    fecha = models.DateTimeField(_('Fecha'), auto_now_add=True, db_index=True)
+    escenarios = models.PositiveIntegerField(_('Escenarios'))
+    prestamos = models.PositiveIntegerField(_('Préstamos'))
+    semilla = models.CharField(_('Semilla'), max_length=64)
+    correlacion = models.FloatField(_('Correlación'))
+    exposicion_total = models.FloatField(_('Exposición Total'))
+    perdida_esperada = models.FloatField(_('Pérdida Esperada'))
+    perdida_inesperada = models.FloatField(_('Pérdida Inesperada'))
+    desviacion = models.FloatField(_('Desviación Típica'))
+    # VaR, ES e histograma de pérdidas, y PD/LGD usadas
+    resultados = models.JSONField(_('Resultados'), default=dict)
+    parametros = models.JSONField(_('Parámetros'), default=dict)
+    segundos = models.FloatField(_('Duración (s)'))
+    
+    class Meta:
+        verbose_name = _('Simulación de Pérdidas')
+        verbose_name_plural = _('Simulaciones de Pérdidas')
+        ordering = ['-fecha']
+    
+    def __str__(self):
+        return f"Simulación {self.fecha:%Y-%m-%d %H:%M} ({self.escenarios} escenarios)"
+    
+    @classmethod
+    def desde_resumen(cls, resumen):
+        return cls.objects.create(
+            **{campo: resumen[campo] for campo in (
+                'escenarios', 'prestamos', 'semilla', 'correlacion', 'exposicion_total',
+                'perdida_esperada', 'perdida_inesperada', 'desviacion', 'parametros', 'segundos',
+            )},
+            resultados={campo: resumen[campo] for campo in ('var', 'es', 'histograma', 'perdida_esperada_teorica')},
+        )
 
 
 class ConsentLog(models.Model):
@@ -254,8 +642,8 @@ class ConsentLog(models.Model):
     ]
     VERSION = "v1"
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
     action = models.CharField(max_length=10, choices=ACTION_CHOICES)
     analytics = models.BooleanField(default=False)
     consent_version = models.CharField(max_length=10, default=VERSION)
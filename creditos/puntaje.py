@@ -0,0 +1,211 @@
+"""
+Cálculo vectorizado del puntaje de crédito.
+
+Todas las operaciones trabajan sobre arreglos de NumPy, de modo que una sola
+solicitud se evalúa como un lote de tamaño 1. Tanto la API individual como la
+de lotes usan este mismo núcleo para que los resultados no puedan divergir.
+"""
+import numpy as np
+from django.utils.translation import gettext_lazy as _
+
+
+PUNTAJE_BASE = 650
+PUNTAJE_MINIMO = 300
+PUNTAJE_MAXIMO = 850
+PUNTAJE_APROBACION = 650
+PORCENTAJE_CAPACIDAD = 0.3  # 30% del ingreso disponible
+PORCENTAJE_ENDEUDAMIENTO = 0.4  # 40% del ingreso anual
+
+# Campos numéricos de una solicitud y su valor por defecto
+CAMPOS_SOLICITUD = {
+    'ingresos_mensuales': 0.0,
+    'gastos_mensuales': 0.0,
+    'deuda_actual': 0.0,
+    'monto_solicitado': 0.0,
+    'plazo_meses': 12,
+    'tasa_interes': 0.0,
+}
+
+# Rangos admitidos, los mismos que los validadores de AnalisisCredito
+PLAZO_MINIMO = 1
+PLAZO_MAXIMO = 360
+TASA_MAXIMA = 100
+
+NIVELES_RIESGO = (
+    # (puntaje mínimo, nivel, clase CSS)
+    (800, 'Excelente', 'success'),
+    (700, 'Bueno', 'success'),
+    (600, 'Aceptable', 'warning'),
+)
+NIVEL_RIESGOSO = ('Riesgoso', 'danger')
+
+
+def validar_solicitud(data):
+    """
+    Convierte los campos de una solicitud a números.
+    Devuelve una tupla (valores, errores); si hay errores, valores es None.
+    """
+    if not isinstance(data, dict):
+        return None, {'__all__': str(_('La solicitud debe ser un objeto JSON'))}
+
+    valores = {}
+    errores = {}
+    for campo, defecto in CAMPOS_SOLICITUD.items():
+        valor = data.get(campo, defecto)
+        try:
+            if campo == 'plazo_meses':
+                valores[campo] = int(valor)
+            else:
+                valores[campo] = float(valor)
+                if not np.isfinite(valores[campo]):
+                    raise ValueError(valor)
+        except (TypeError, ValueError, OverflowError):
+            errores[campo] = str(_('Valor numérico inválido'))
+            continue
+
+        if campo == 'plazo_meses':
+            if not PLAZO_MINIMO <= valores[campo] <= PLAZO_MAXIMO:
+                errores[campo] = str(_('El plazo debe estar entre %(minimo)d y %(maximo)d meses') % {
+                    'minimo': PLAZO_MINIMO, 'maximo': PLAZO_MAXIMO
+                })
+        elif valores[campo] < 0:
+            errores[campo] = str(_('El valor no puede ser negativo'))
+        elif campo == 'tasa_interes' and valores[campo] > TASA_MAXIMA:
+            errores[campo] = str(_('La tasa de interés no puede superar el %(maximo)d%%') % {'maximo': TASA_MAXIMA})
+
+    if errores:
+        return None, errores
+    return valores, {}
+
+
+def calcular_cuotas(monto_solicitado, plazo_meses, tasa_interes):
+    """Cuota mensual de un préstamo francés: P * (r(1+r)^n) / ((1+r)^n - 1)"""
+    monto = np.asarray(monto_solicitado, dtype=float)
+    plazo = np.asarray(plazo_meses, dtype=float)
+    tasa_mensual = np.asarray(tasa_interes, dtype=float) / 100 / 12
+
+    validos = (plazo > 0) & (tasa_mensual > 0) & (monto > 0)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        factor = np.power(1 + tasa_mensual, plazo)
+        cuota = monto * tasa_mensual * factor / (factor - 1)
+    return np.where(validos, cuota, 0.0)
+
+
+def calcular_puntajes(ingresos_mensuales, gastos_mensuales, deuda_actual,
+                      monto_solicitado, plazo_meses, tasa_interes):
+    """
+    Calcula puntaje, nivel de riesgo, cuota, capacidad de pago y recomendación
+    para un lote de solicitudes. Cada argumento es un arreglo (o escalar) y el
+    resultado es un diccionario de arreglos del mismo largo.
+    """
+    ingresos = np.asarray(ingresos_mensuales, dtype=float)
+    gastos = np.asarray(gastos_mensuales, dtype=float)
+    deuda = np.asarray(deuda_actual, dtype=float)
+    monto = np.asarray(monto_solicitado, dtype=float)
+
+    puntaje = np.full(ingresos.shape, PUNTAJE_BASE, dtype=np.int64)
+    con_ingresos = ingresos > 0
+    ingreso_anual = ingresos * 12
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Relación deuda total vs ingreso anual
+        ratio_deuda_ingresos = (deuda + monto) / ingreso_anual
+        # Capacidad de ahorro
+        capacidad_ahorro = (ingresos - gastos) / ingresos
+
+    puntaje += np.where(con_ingresos & (ratio_deuda_ingresos < 0.3), 50, 0)
+    puntaje -= np.where(con_ingresos & (ratio_deuda_ingresos > 0.8), 100, 0)
+    puntaje += np.where(con_ingresos & (capacidad_ahorro > 0.3), 50, 0)
+    puntaje -= np.where(con_ingresos & (capacidad_ahorro < 0.1), 50, 0)
+
+    # Penalización si el monto es mayor al ingreso anual
+    puntaje -= np.where((monto > 0) & (monto > ingreso_anual), 100, 0)
+
+    puntaje = np.clip(puntaje, PUNTAJE_MINIMO, PUNTAJE_MAXIMO)
+
+    condiciones = [puntaje >= minimo for minimo, _nivel, _clase in NIVELES_RIESGO]
+    nivel_riesgo = np.select(
+        condiciones, [nivel for _minimo, nivel, _clase in NIVELES_RIESGO], NIVEL_RIESGOSO[0]
+    )
+    clase_riesgo = np.select(
+        condiciones, [clase for _minimo, _nivel, clase in NIVELES_RIESGO], NIVEL_RIESGOSO[1]
+    )
+
+    cuota_mensual = calcular_cuotas(monto, plazo_meses, tasa_interes)
+    capacidad_pago = np.where(
+        ingresos > gastos, (ingresos - gastos) * PORCENTAJE_CAPACIDAD, 0.0
+    )
+
+    return {
+        'puntaje': puntaje,
+        'nivel_riesgo': nivel_riesgo,
+        'clase_riesgo': clase_riesgo,
+        'cuota_mensual': cuota_mensual,
+        'capacidad_pago': capacidad_pago,
+        'recomendacion_aprobacion': (puntaje >= PUNTAJE_APROBACION) & (cuota_mensual <= capacidad_pago),
+    }
+
+
+def evaluar_aprobacion(puntaje_credito, ingresos_mensuales, gastos_mensuales,
+                       deuda_actual, monto_solicitado, plazo_meses, tasa_interes):
+    """
+    Versión vectorizada de AnalisisCredito.puede_aprobar: puntaje mínimo,
+    cuota dentro de la capacidad de pago y deuda total dentro del 40% del
+    ingreso anual. Los puntajes nulos deben llegar como 0.
+    """
+    puntaje = np.asarray(puntaje_credito, dtype=float)
+    ingresos = np.asarray(ingresos_mensuales, dtype=float)
+    gastos = np.asarray(gastos_mensuales, dtype=float)
+    deuda = np.asarray(deuda_actual, dtype=float)
+    monto = np.asarray(monto_solicitado, dtype=float)
+
+    capacidad_pago = np.where(ingresos > 0, (ingresos - gastos) * PORCENTAJE_CAPACIDAD, 0.0)
+    cuota_mensual = np.round(calcular_cuotas(monto, plazo_meses, tasa_interes), 2)
+
+    return (
+        (puntaje >= PUNTAJE_APROBACION)
+        & (cuota_mensual <= capacidad_pago)
+        & (deuda + monto <= ingresos * 12 * PORCENTAJE_ENDEUDAMIENTO)
+    )
+
+
+def evaluar_solicitudes(solicitudes):
+    """
+    Valida y puntúa una lista de solicitudes en una sola pasada vectorizada.
+    Devuelve una lista con un resultado por solicitud, en el mismo orden;
+    las solicitudes inválidas llevan sus errores de validación.
+    """
+    resultados = [None] * len(solicitudes)
+    indices_validos = []
+    columnas = {campo: [] for campo in CAMPOS_SOLICITUD}
+
+    for indice, data in enumerate(solicitudes):
+        valores, errores = validar_solicitud(data)
+        if errores:
+            resultados[indice] = {'success': False, 'errores': errores}
+            continue
+        indices_validos.append(indice)
+        for campo, valor in valores.items():
+            columnas[campo].append(valor)
+
+    if indices_validos:
+        calculo = calcular_puntajes(**columnas)
+        puntajes = calculo['puntaje'].tolist()
+        niveles = calculo['nivel_riesgo'].tolist()
+        clases = calculo['clase_riesgo'].tolist()
+        cuotas = np.round(calculo['cuota_mensual'], 2).tolist()
+        capacidades = np.round(calculo['capacidad_pago'], 2).tolist()
+        recomendaciones = calculo['recomendacion_aprobacion'].tolist()
+
+        for posicion, indice in enumerate(indices_validos):
+            resultados[indice] = {
+                'success': True,
+                'puntaje': puntajes[posicion],
+                'nivel_riesgo': niveles[posicion],
+                'clase_riesgo': clases[posicion],
+                'cuota_mensual': cuotas[posicion],
+                'capacidad_pago': capacidades[posicion],
+                'recomendacion_aprobacion': recomendaciones[posicion],
+            }
+
+    return resultados
@@ -0,0 +1,126 @@
+"""
+Mantenimiento del resumen de crédito por cliente (ResumenCreditoCliente).
+
+Cada vez que cambian análisis se recalcula el resumen solo de los clientes
+afectados, con una consulta agregada agrupada por cliente y otra para sus
+últimos análisis, y se guarda con un único bulk_create con upsert. Lo llaman
+las señales de AnalisisCredito, las operaciones masivas de su QuerySet y el
+comando rebuild_credit_summaries. La migración 0006_resumen_credito_cliente
+tiene su propia copia del cálculo: si cambia aquí, hay que ejecutar el comando.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+
+
+TAMANO_BLOQUE = 500
+
+# Contadores del resumen por código de estado del análisis
+CONTADORES_ESTADO = {
+    'pendientes': 'PEN',
+    'aprobados': 'APR',
+    'rechazados': 'REC',
+    'en_espera': 'ESP',
+    'cancelados': 'CAN',
+}
+ESTADO_APROBADO = 'APR'
+
+# Campos de AnalisisCredito de los que depende el resumen
+CAMPOS_ORIGEN = (
+    'cliente', 'cliente_id', 'estado', 'monto_solicitado', 'deuda_actual', 'fecha_analisis',
+    'puntaje_credito', 'tipo_credito', 'plazo_meses', 'tasa_interes',
+)
+
+# Campos del resumen copiados del último análisis
+CAMPOS_ULTIMO = {
+    'ultimo_fecha': 'fecha_analisis',
+    'ultimo_puntaje': 'puntaje_credito',
+    'ultimo_estado': 'estado',
+    'ultimo_tipo_credito': 'tipo_credito',
+    'ultimo_monto': 'monto_solicitado',
+    'ultimo_plazo': 'plazo_meses',
+    'ultimo_tasa': 'tasa_interes',
+    # Cada análisis declara la deuda total del cliente en ese momento: sumarlas la contaría varias veces
+    'deuda_actual': 'deuda_actual',
+}
+CAMPOS_RESUMEN = (
+    'total_analisis', *CONTADORES_ESTADO, 'monto_aprobado',
+    'ultimo_analisis', *CAMPOS_ULTIMO, 'actualizado',
+)
+
+
+def _modelos(modelo_analisis, modelo_resumen):
+    if modelo_analisis is None or modelo_resumen is None:
+        from .models import AnalisisCredito, ResumenCreditoCliente
+        return AnalisisCredito, ResumenCreditoCliente
+    return modelo_analisis, modelo_resumen
+
+
+def actualizar_resumenes(cliente_ids, modelo_analisis=None, modelo_resumen=None):
+    """
+    Recalcula el resumen de los clientes indicados; elimina el de los que ya
+    no tienen análisis.
+    Devuelve el número de resúmenes guardados.
+    """
+    modelo_analisis, modelo_resumen = _modelos(modelo_analisis, modelo_resumen)
+    ids = set(cliente_ids)
+    if not ids:
+        return 0
+
+    ultimo = (
+        modelo_analisis.objects.filter(cliente=OuterRef('cliente'))
+        .order_by('-fecha_analisis', '-pk').values('pk')[:1]
+    )
+    agregados = list(
+        modelo_analisis.objects.filter(cliente_id__in=ids)
+        .order_by().values('cliente')
+        .annotate(
+            total_analisis=Count('pk'),
+            **{campo: Count('pk', filter=Q(estado=estado)) for campo, estado in CONTADORES_ESTADO.items()},
+            monto_aprobado=Sum('monto_solicitado', filter=Q(estado=ESTADO_APROBADO)),
+            ultimo_id=Subquery(ultimo),
+        )
+    )
+    ultimos = modelo_analisis.objects.only(*CAMPOS_ULTIMO.values()).in_bulk(
+        [fila['ultimo_id'] for fila in agregados]
+    )
+
+    resumenes = []
+    for fila in agregados:
+        analisis = ultimos[fila['ultimo_id']]
+        resumenes.append(modelo_resumen(
+            cliente_id=fila['cliente'],
+            total_analisis=fila['total_analisis'],
+            **{campo: fila[campo] for campo in CONTADORES_ESTADO},
+            monto_aprobado=fila['monto_aprobado'] or Decimal('0'),
+            ultimo_analisis_id=analisis.pk,
+            **{campo: getattr(analisis, origen) for campo, origen in CAMPOS_ULTIMO.items()},
+        ))
+
+    if resumenes:
+        modelo_resumen.objects.bulk_create(
+            resumenes, update_conflicts=True, unique_fields=['cliente'], update_fields=list(CAMPOS_RESUMEN)
+        )
+    sin_analisis = ids - {fila['cliente'] for fila in agregados}
+    if sin_analisis:
+        modelo_resumen.objects.filter(cliente_id__in=sin_analisis).delete()
+    return len(resumenes)
+
+
+def reconstruir_resumenes(tamano_bloque=TAMANO_BLOQUE, modelo_cliente=None, modelo_analisis=None,
+                          modelo_resumen=None):
+    """Recalcula el resumen de todos los clientes, recorriéndolos por bloques. Devuelve el total guardado."""
+    if modelo_cliente is None:
+        from clientes.models import Cliente as modelo_cliente
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            modelo_cliente.objects.filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', flat=True)[:tamano_bloque]
+        )
+        if not ids:
+            return total
+        total += actualizar_resumenes(ids, modelo_analisis, modelo_resumen)
+        ultimo_id = ids[-1]
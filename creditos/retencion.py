@@ -0,0 +1,102 @@
+"""
+Retención de los registros de consentimiento (ConsentLog).
+
+Los registros caducados se archivan en archivos JSONL comprimidos con gzip y
+se eliminan de la tabla, de modo que esta (y su admin) solo contiene los
+consentimientos vigentes. Se recorre por bloques de ids y cada bloque se
+borra en una transacción corta, para no retener el bloqueo de escritura de
+SQLite mientras se archiva.
+
+Cada bloque se añade al archivo como un miembro gzip independiente y se
+sincroniza a disco antes de borrar sus filas: si el proceso se interrumpe,
+el archivo sigue siendo legible y como mucho contiene filas de un bloque que
+todavía no se borró (y se volverán a archivar en la siguiente ejecución).
+"""
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime, time as hora
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+
+TAMANO_BLOQUE = 1000
+CAMPOS_ARCHIVO = (
+    'id', 'created_at', 'expires_at', 'action', 'analytics', 'consent_version',
+    'ip', 'user_agent', 'user_id',
+)
+
+
+def fecha_limite(valor):
+    """Convierte AAAA-MM-DD en el inicio de ese día en la zona horaria actual"""
+    return timezone.make_aware(datetime.combine(date.fromisoformat(valor), hora.min))
+
+
+def consentimientos_caducados(antes=None):
+    """Consentimientos caducados (antes de `antes`, si se indica); nunca los aún vigentes"""
+    from .models import ConsentLog
+
+    ahora = timezone.now()
+    return ConsentLog.objects.filter(expires_at__lte=ahora if antes is None else min(antes, ahora))
+
+
+def _bloques(queryset, tamano_bloque, pausa=0):
+    """Genera bloques de filas (diccionarios con CAMPOS_ARCHIVO) en orden de id"""
+    ultimo_id = 0
+    while True:
+        filas = list(
+            queryset.filter(pk__gt=ultimo_id).order_by('pk').values(*CAMPOS_ARCHIVO)[:tamano_bloque]
+        )
+        if not filas:
+            return
+        yield filas
+        ultimo_id = filas[-1]['id']
+        if pausa:
+            # Deja libre la base de datos entre bloques para las transacciones de negocio
+            time.sleep(pausa)
+
+
+def _eliminar(ids):
+    from .models import ConsentLog
+
+    with transaction.atomic():
+        ConsentLog.objects.filter(pk__in=ids).delete()
+
+
+def archivar_consentimientos(archivo, antes=None, tamano_bloque=TAMANO_BLOQUE, pausa=0, dry_run=False):
+    """
+    Añade los consentimientos caducados antes de `antes` (por defecto, ahora)
+    al archivo JSONL comprimido y los elimina de la tabla. Devuelve el número
+    de filas archivadas.
+    """
+    total = 0
+    for filas in _bloques(consentimientos_caducados(antes), tamano_bloque, pausa):
+        if not dry_run:
+            datos = ''.join(json.dumps(fila, cls=DjangoJSONEncoder) + '\n' for fila in filas)
+            with open(archivo, 'ab') as destino:
+                destino.write(gzip.compress(datos.encode('utf-8')))
+                destino.flush()
+                os.fsync(destino.fileno())
+            _eliminar([fila['id'] for fila in filas])
+        total += len(filas)
+    return total
+
+
+def purgar_consentimientos(antes=None, tamano_bloque=TAMANO_BLOQUE, pausa=0, dry_run=False):
+    """Elimina sin archivar los consentimientos caducados. Devuelve el número de filas."""
+    total = 0
+    for filas in _bloques(consentimientos_caducados(antes), tamano_bloque, pausa):
+        if not dry_run:
+            _eliminar([fila['id'] for fila in filas])
+        total += len(filas)
+    return total
+
+
+def leer_archivo(archivo):
+    """Lee las filas de un archivo de consentimientos archivados"""
+    with gzip.open(archivo, 'rt', encoding='utf-8') as origen:
+        for linea in origen:
+            yield json.loads(linea)
@@ -0,0 +1,77 @@
+"""
+Métricas de riesgo derivadas de un análisis de crédito.
+
+Se calculan con Decimal a partir de los campos de entrada del análisis y se
+guardan como columnas en AnalisisCredito para poder filtrar y ordenar en la
+base de datos. La migración 0003_metricas_riesgo tiene su propia copia de
+este cálculo: si cambia aquí, hay que recalcular con rescore_portfolio.
+"""
+from decimal import Decimal
+
+from .amortizacion import cuota_mensual
+from .puntaje import PORCENTAJE_CAPACIDAD, PORCENTAJE_ENDEUDAMIENTO, PUNTAJE_APROBACION
+
+
+# Campos de AnalisisCredito de los que dependen las métricas
+CAMPOS_ENTRADA = (
+    'puntaje_credito', 'ingresos_mensuales', 'gastos_mensuales', 'deuda_actual',
+    'monto_solicitado', 'plazo_meses', 'tasa_interes',
+)
+
+# Columnas donde se guardan las métricas
+CAMPOS_METRICAS = ('capacidad_pago', 'cuota_mensual_estimada', 'banda_riesgo', 'es_aprobable')
+
+BANDA_NO_EVALUADO = 'NOE'
+BANDAS_RIESGO = (
+    # (puntaje mínimo, banda)
+    (800, 'EXC'),
+    (700, 'BUE'),
+    (600, 'ACE'),
+)
+BANDA_RIESGOSO = 'RIE'
+
+CENTAVOS = Decimal('0.01')
+
+
+def calcular_banda_riesgo(puntaje_credito):
+    """Código de la banda de riesgo correspondiente a un puntaje"""
+    if puntaje_credito is None:
+        return BANDA_NO_EVALUADO
+    for minimo, banda in BANDAS_RIESGO:
+        if puntaje_credito >= minimo:
+            return banda
+    return BANDA_RIESGOSO
+
+
+def calcular_capacidad_pago(ingresos_mensuales, gastos_mensuales):
+    """Capacidad de pago mensual: 30% del ingreso disponible"""
+    if ingresos_mensuales <= 0:
+        return Decimal(0)
+    return (Decimal(ingresos_mensuales) - Decimal(gastos_mensuales)) * Decimal(str(PORCENTAJE_CAPACIDAD))
+
+
+def calcular_metricas(puntaje_credito, ingresos_mensuales, gastos_mensuales, deuda_actual,
+                      monto_solicitado, plazo_meses, tasa_interes):
+    """
+    Devuelve un diccionario con las métricas persistidas de un análisis:
+    capacidad de pago, cuota mensual, banda de riesgo y si cumple las reglas
+    de aprobación (puntaje mínimo, cuota dentro de la capacidad de pago y
+    deuda total dentro del 40% del ingreso anual).
+    """
+    capacidad = calcular_capacidad_pago(ingresos_mensuales, gastos_mensuales)
+    cuota = Decimal(cuota_mensual(monto_solicitado, tasa_interes, plazo_meses))
+    deuda_total = Decimal(deuda_actual) + Decimal(monto_solicitado)
+    limite_deuda = Decimal(ingresos_mensuales) * 12 * Decimal(str(PORCENTAJE_ENDEUDAMIENTO))
+
+    es_aprobable = (
+        bool(puntaje_credito) and puntaje_credito >= PUNTAJE_APROBACION
+        and cuota <= capacidad
+        and deuda_total <= limite_deuda
+    )
+
+    return {
+        'capacidad_pago': capacidad.quantize(CENTAVOS),
+        'cuota_mensual_estimada': cuota.quantize(CENTAVOS),
+        'banda_riesgo': calcular_banda_riesgo(puntaje_credito),
+        'es_aprobable': es_aprobable,
+    }
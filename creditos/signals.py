@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from gestion_riesgo import almacenamiento
+from . import cartera
+from .models import AnalisisCredito, DocumentoAnalisis
+from .resumen import actualizar_resumenes
+
+
+@receiver(post_save, sender=AnalisisCredito)
+def actualizar_resumen_al_guardar(sender, instance, raw=False, **kwargs):
+    """Recalcula el resumen del cliente (y del anterior, si el análisis cambió de cliente)"""
+    if raw:
+        return
+    clientes = {instance.cliente_id}
+    original = getattr(instance, '_cliente_id_original', None)
+    if original is not None:
+        clientes.add(original)
+    instance._cliente_id_original = instance.cliente_id
+    actualizar_resumenes(clientes)
+
+
+@receiver(post_delete, sender=AnalisisCredito)
+def actualizar_resumen_al_eliminar(sender, instance, **kwargs):
+    """Recalcula el resumen del cliente al eliminar uno de sus análisis"""
+    actualizar_resumenes({instance.cliente_id})
+
+
+@receiver(post_save, sender=AnalisisCredito)
+def actualizar_cartera_al_guardar(sender, instance, created=False, raw=False, **kwargs):
+    """Aplica al resumen de cartera la diferencia entre la aportación anterior del análisis y la actual"""
+    if raw:
+        return
+    nueva = cartera.contribucion(instance)
+    original = getattr(instance, '_cartera_original', None)
+    if nueva is not None and (created or original is not None):
+        deltas = cartera.acumular({}, nueva)
+        if not created:
+            cartera.acumular(deltas, original, signo=-1)
+        cartera.aplicar_deltas(deltas)
+    else:
+        # Instancia cargada con campos diferidos: no se conoce su aportación anterior
+        meses = {cartera.mes_de(instance.fecha_analisis)}
+        if original is not None:
+            meses.add(original[0][0])
+        cartera.recalcular_meses(meses)
+        nueva = cartera.contribucion(instance)
+    instance._cartera_original = nueva
+
+
+@receiver(post_delete, sender=AnalisisCredito)
+def actualizar_cartera_al_eliminar(sender, instance, **kwargs):
+    """Resta del resumen de cartera la aportación del análisis eliminado"""
+    aporte = getattr(instance, '_cartera_original', None) or cartera.contribucion(instance)
+    if aporte is not None:
+        cartera.aplicar_deltas(cartera.acumular({}, aporte, signo=-1))
+    elif instance.__dict__.get('fecha_analisis') is not None:
+        cartera.recalcular_meses({cartera.mes_de(instance.fecha_analisis)})
+
+
+# Recuento de referencias de los blobs de documentos (ver gestion_riesgo/almacenamiento.py)
+post_save.connect(almacenamiento.contar_referencia_blob, sender=DocumentoAnalisis)
+post_delete.connect(almacenamiento.descontar_referencia_blob, sender=DocumentoAnalisis)
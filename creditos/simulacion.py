@@ -0,0 +1,229 @@
+"""
+Simulación Monte Carlo de las pérdidas de la cartera aprobada.
+
+Modelo de un factor (cópula gaussiana, Vasicek): en cada escenario se sortea
+un factor sistémico Z y cada préstamo incumple con la probabilidad
+condicional PD(Z) = Φ((Φ⁻¹(PD) - √ρ·Z) / √(1 - ρ)), donde la PD depende de la
+banda de riesgo del puntaje. La pérdida de un préstamo que incumple es su
+exposición (monto solicitado) por la LGD de su tipo de crédito.
+
+La cartera se carga una sola vez en arreglos de NumPy, ordenada por banda, de
+modo que en cada bloque de escenarios los sorteos de una banda se comparan
+con un único umbral por escenario y la pérdida se obtiene con un producto
+matricial. Los escenarios se reparten en fragmentos de tamaño fijo entre los
+procesos de un ProcessPoolExecutor; cada fragmento usa su propia semilla
+derivada con SeedSequence.spawn, así que el resultado depende solo de la
+semilla y no del número de procesos.
+
+Este módulo solo importa los modelos al cargar la cartera, para que los
+procesos hijos no necesiten inicializar Django.
+"""
+import math
+import multiprocessing
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from statistics import NormalDist
+
+import numpy as np
+
+
+BANDAS = ('EXC', 'BUE', 'ACE', 'RIE', 'NOE')
+TIPOS_CREDITO = ('PER', 'HIP', 'AUT', 'EDU', 'OTR')
+ESTADO_APROBADO = 'APR'
+
+# Probabilidad de incumplimiento anual por banda de riesgo y pérdida en caso
+# de incumplimiento por tipo de crédito, si no se configuran en settings
+PD_DEFECTO = {'EXC': 0.005, 'BUE': 0.015, 'ACE': 0.04, 'RIE': 0.12, 'NOE': 0.08}
+LGD_DEFECTO = {'PER': 0.65, 'HIP': 0.25, 'AUT': 0.45, 'EDU': 0.6, 'OTR': 0.6}
+CORRELACION_DEFECTO = 0.12
+
+ESCENARIOS_POR_FRAGMENTO = 1000
+# Sorteos (escenarios × préstamos) por bloque dentro de un fragmento: acota la
+# memoria de cada proceso a unas decenas de MB sea cual sea la cartera
+SORTEOS_POR_BLOQUE = 1 << 22
+NIVELES_CONFIANZA = (0.95, 0.99, 0.999)
+BARRAS_HISTOGRAMA = 40
+TAMANO_BLOQUE_LECTURA = 10000
+
+_normal = NormalDist()
+_erfc = np.vectorize(math.erfc, otypes=[np.float64])
+
+
+def configuracion():
+    """(PD por banda, LGD por tipo, correlación) de settings, con los valores por defecto"""
+    from django.conf import settings
+
+    return (
+        {**PD_DEFECTO, **getattr(settings, 'SIMULACION_PD', {})},
+        {**LGD_DEFECTO, **getattr(settings, 'SIMULACION_LGD', {})},
+        getattr(settings, 'SIMULACION_CORRELACION', CORRELACION_DEFECTO),
+    )
+
+
+class Cartera:
+    """
+    Cartera en arreglos de NumPy: pérdida en caso de incumplimiento de cada
+    préstamo (exposición × LGD) ordenada por banda, el tramo de cada banda y
+    el umbral Φ⁻¹(PD) de cada banda.
+    """
+    def __init__(self, bandas, tipos, exposiciones, pd, lgd):
+        bandas = np.asarray(bandas, dtype=np.int8)
+        tipos = np.asarray(tipos, dtype=np.int8)
+        exposiciones = np.asarray(exposiciones, dtype=np.float64)
+        orden = np.argsort(bandas, kind='stable')
+        lgd_tipos = np.array([lgd[tipo] for tipo in TIPOS_CREDITO])
+
+        self.prestamos = len(exposiciones)
+        self.exposicion_total = float(exposiciones.sum())
+        self.perdidas = (exposiciones * lgd_tipos[tipos])[orden]
+        # Los productos de cada bloque se hacen en float32 (la mitad de memoria y ancho de banda)
+        self.perdidas32 = self.perdidas.astype(np.float32)
+        conteos = np.bincount(bandas, minlength=len(BANDAS))
+        fines = np.cumsum(conteos)
+        self.tramos = [(int(fin - conteo), int(fin)) for conteo, fin in zip(conteos, fines)]
+        self.pd = [float(pd[banda]) for banda in BANDAS]
+        self.umbrales = np.array([_normal.inv_cdf(min(max(p, 1e-12), 1 - 1e-12)) for p in self.pd])
+        self.perdida_esperada_teorica = float(sum(
+            self.perdidas[inicio:fin].sum() * p for (inicio, fin), p in zip(self.tramos, self.pd)
+        ))
+
+
+def cargar_cartera(queryset=None, pd=None, lgd=None):
+    """Carga los análisis aprobados (o los del queryset) en una Cartera, sin crear un objeto por fila"""
+    from .models import AnalisisCredito
+
+    pd_config, lgd_config, _correlacion = configuracion()
+    if queryset is None:
+        queryset = AnalisisCredito.objects.filter(estado=ESTADO_APROBADO)
+    indice_banda = {banda: i for i, banda in enumerate(BANDAS)}
+    indice_tipo = {tipo: i for i, tipo in enumerate(TIPOS_CREDITO)}
+
+    bandas, tipos, exposiciones = array('b'), array('b'), array('d')
+    filas = queryset.order_by().values_list('banda_riesgo', 'tipo_credito', 'monto_solicitado')
+    for banda, tipo, monto in filas.iterator(chunk_size=TAMANO_BLOQUE_LECTURA):
+        bandas.append(indice_banda[banda])
+        tipos.append(indice_tipo[tipo])
+        exposiciones.append(float(monto))
+    return Cartera(
+        np.frombuffer(bandas, dtype=np.int8), np.frombuffer(tipos, dtype=np.int8),
+        np.frombuffer(exposiciones, dtype=np.float64), pd or pd_config, lgd or lgd_config,
+    )
+
+
+def simular_fragmento(cartera, semilla, escenarios, correlacion):
+    """Pérdida total de la cartera en cada uno de `escenarios` escenarios"""
+    rng = np.random.default_rng(semilla)
+    factor = rng.standard_normal(escenarios)
+    # PD condicional de cada banda en cada escenario: (escenarios, bandas)
+    x = (cartera.umbrales[None, :] - math.sqrt(correlacion) * factor[:, None]) / math.sqrt(1 - correlacion)
+    pd_condicional = (0.5 * _erfc(-x / math.sqrt(2))).astype(np.float32)
+
+    perdidas = np.zeros(escenarios)
+    filas = max(1, SORTEOS_POR_BLOQUE // max(cartera.prestamos, 1))
+    for inicio in range(0, escenarios, filas):
+        fin = min(inicio + filas, escenarios)
+        for banda, (desde, hasta) in enumerate(cartera.tramos):
+            if desde == hasta:
+                continue
+            sorteos = rng.random((fin - inicio, hasta - desde), dtype=np.float32)
+            incumplen = sorteos < pd_condicional[inicio:fin, banda, None]
+            perdidas[inicio:fin] += incumplen.astype(np.float32) @ cartera.perdidas32[desde:hasta]
+    return perdidas
+
+
+_cartera_proceso = None
+
+
+def _iniciar_proceso(cartera):
+    global _cartera_proceso
+    _cartera_proceso = cartera
+
+
+def _simular_fragmento_proceso(semilla, escenarios, correlacion):
+    return simular_fragmento(_cartera_proceso, semilla, escenarios, correlacion)
+
+
+def resumir(perdidas, cartera, niveles=NIVELES_CONFIANZA, barras=BARRAS_HISTOGRAMA):
+    """Pérdida esperada e inesperada, VaR y ES por nivel de confianza e histograma de las pérdidas"""
+    perdidas = np.sort(perdidas)
+    perdida_esperada = float(perdidas.mean())
+    var, es = {}, {}
+    for nivel in niveles:
+        valor = float(np.quantile(perdidas, nivel))
+        var[str(nivel)] = valor
+        es[str(nivel)] = float(perdidas[perdidas >= valor].mean())
+    conteos, bordes = np.histogram(perdidas, bins=barras)
+    return {
+        'prestamos': cartera.prestamos,
+        'escenarios': len(perdidas),
+        'exposicion_total': cartera.exposicion_total,
+        'perdida_esperada': perdida_esperada,
+        'perdida_esperada_teorica': cartera.perdida_esperada_teorica,
+        'desviacion': float(perdidas.std()),
+        # Pérdida inesperada: capital económico al mayor nivel de confianza
+        'perdida_inesperada': var[str(niveles[-1])] - perdida_esperada,
+        'var': var,
+        'es': es,
+        'histograma': {'conteos': conteos.tolist(), 'bordes': bordes.tolist()},
+    }
+
+
+def simular_perdidas(cartera, escenarios, semilla=None, correlacion=None, procesos=None, progreso=None):
+    """
+    Simula `escenarios` escenarios repartidos entre `procesos` procesos (por
+    defecto SIMULACION_PROCESOS, o uno por CPU). `progreso`, si se indica, se llama con el número de
+    escenarios completados. Devuelve (arreglo de pérdidas, semilla usada).
+    """
+    if correlacion is None:
+        correlacion = configuracion()[2]
+    secuencia = np.random.SeedSequence(semilla)
+    tamanos = [ESCENARIOS_POR_FRAGMENTO] * (escenarios // ESCENARIOS_POR_FRAGMENTO)
+    if escenarios % ESCENARIOS_POR_FRAGMENTO:
+        tamanos.append(escenarios % ESCENARIOS_POR_FRAGMENTO)
+    semillas = secuencia.spawn(len(tamanos))
+    if not procesos:
+        from django.conf import settings
+        procesos = getattr(settings, 'SIMULACION_PROCESOS', 0) or os.cpu_count() or 1
+    procesos = min(procesos, len(tamanos))
+
+    resultados = []
+    if procesos <= 1:
+        for semilla_fragmento, tamano in zip(semillas, tamanos):
+            resultados.append(simular_fragmento(cartera, semilla_fragmento, tamano, correlacion))
+            if progreso:
+                progreso(sum(map(len, resultados)))
+    else:
+        # spawn: el proceso puede tener hilos (buffer de consentimientos) y conexiones abiertas
+        with ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_iniciar_proceso, initargs=(cartera,)) as ejecutor:
+            for perdidas in ejecutor.map(_simular_fragmento_proceso, semillas, tamanos, repeat(correlacion)):
+                resultados.append(perdidas)
+                if progreso:
+                    progreso(sum(map(len, resultados)))
+    perdidas = np.concatenate(resultados) if resultados else np.zeros(0)
+    return perdidas, secuencia.entropy
+
+
+def ejecutar_simulacion(escenarios, semilla=None, correlacion=None, procesos=None, guardar=True, progreso=None):
+    """Carga la cartera aprobada, la simula y (opcionalmente) guarda el resultado. Devuelve el resumen."""
+    from .models import SimulacionPerdidas
+
+    pd, lgd, correlacion_config = configuracion()
+    if correlacion is None:
+        correlacion = correlacion_config
+    inicio = time.monotonic()
+    cartera = cargar_cartera(pd=pd, lgd=lgd)
+    perdidas, semilla = simular_perdidas(cartera, escenarios, semilla, correlacion, procesos, progreso)
+    resumen = resumir(perdidas, cartera)
+    resumen.update({
+        'semilla': str(semilla),
+        'correlacion': correlacion,
+        'segundos': time.monotonic() - inicio,
+        'parametros': {'pd': pd, 'lgd': lgd},
+    })
+    if guardar:
+        resumen['id'] = SimulacionPerdidas.desde_resumen(resumen).pk
+    return resumen
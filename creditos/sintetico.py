@@ -0,0 +1,321 @@
+"""
+Generación de datos sintéticos a gran escala para pruebas de rendimiento.
+
+Crea clientes con referencias personales y metadatos de documentos (sin
+archivo en disco) y análisis de crédito con distribuciones verosímiles de
+ingresos, gastos, deuda, montos, plazos y tasas según el tipo de crédito. El
+puntaje parte del mismo núcleo vectorizado que la API (puntaje.calcular_puntajes)
+con algo de ruido, y el estado depende del puntaje. Con la misma semilla y los
+mismos parámetros (incluido el tamaño de bloque) se generan exactamente los
+mismos datos, salvo las fechas, que son relativas al momento de la ejecución.
+
+Los clientes se procesan por bloques: los valores de cada bloque se sortean
+con NumPy, se insertan con bulk_create en una transacción y se mantienen al
+día en la misma transacción el índice de búsqueda, los resúmenes por cliente
+y el resumen de cartera (los dos últimos con el bulk_create de
+AnalisisCreditoQuerySet), sin pasar por los formularios ni las señales.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from clientes import busqueda
+from clientes.models import Cliente, DocumentoCliente, ReferenciaPersonal
+
+from .models import AnalisisCredito
+from .puntaje import PUNTAJE_APROBACION, PUNTAJE_MAXIMO, PUNTAJE_MINIMO, calcular_puntajes
+
+
+TAMANO_BLOQUE = 5000
+SEMILLA = 42
+PREFIJO_IDENTIFICACION = 'SIN'
+MESES_HISTORIA = 36
+
+NOMBRES = (
+    'Ana', 'Carlos', 'María', 'José', 'Lucía', 'Miguel', 'Carmen', 'Javier', 'Laura', 'David',
+    'Sofía', 'Daniel', 'Elena', 'Pablo', 'Isabel', 'Jorge', 'Paula', 'Luis', 'Marta', 'Andrés',
+    'Valentina', 'Diego', 'Camila', 'Fernando', 'Gabriela', 'Ricardo', 'Rosa', 'Alejandro', 'Teresa', 'Raúl',
+)
+APELLIDOS = (
+    'García', 'Rodríguez', 'González', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Pérez', 'Gómez', 'Martín',
+    'Jiménez', 'Ruiz', 'Hernández', 'Díaz', 'Moreno', 'Álvarez', 'Romero', 'Torres', 'Ramírez', 'Flores',
+    'Vargas', 'Castillo', 'Rojas', 'Mendoza', 'Quispe', 'Chávez', 'Silva', 'Castro', 'Ortiz', 'Núñez',
+)
+CIUDADES = (
+    'Lima', 'Arequipa', 'Trujillo', 'Chiclayo', 'Piura', 'Cusco', 'Iquitos', 'Huancayo', 'Tacna', 'Puno',
+    'Ica', 'Cajamarca', 'Ayacucho', 'Chimbote', 'Pucallpa',
+)
+CALLES = ('Av. Arequipa', 'Jr. de la Unión', 'Av. Grau', 'Calle Lima', 'Av. Brasil', 'Jr. Junín', 'Av. Bolognesi')
+OCUPACIONES = (
+    'Contador', 'Docente', 'Ingeniero', 'Enfermero', 'Comerciante', 'Abogado', 'Administrador', 'Técnico',
+    'Vendedor', 'Chofer', 'Médico', 'Analista', 'Independiente', 'Operario',
+)
+EMPRESAS = (
+    'Comercial Andina S.A.', 'Servicios Generales del Sur', 'Minera del Norte', 'Colegio San Martín',
+    'Hospital Regional', 'Transportes Unidos', 'Banco Metropolitano', 'Independiente',
+)
+PARENTESCOS = ('Padre', 'Madre', 'Hermano/a', 'Amigo/a', 'Cónyuge', 'Compañero/a de trabajo')
+TIPOS_IDENTIFICACION = (('dni', 0.85), ('ce', 0.07), ('pasaporte', 0.05), ('ruc', 0.03))
+ESTADOS_CIVILES = (('soltero', 0.4), ('casado', 0.35), ('union_libre', 0.12), ('divorciado', 0.09), ('viudo', 0.04))
+
+# Por tipo de crédito: (probabilidad, monto mediano, dispersión logarítmica, plazos, tasa media)
+TIPOS_CREDITO = {
+    'PER': (0.45, 8000, 0.7, (12, 24, 36, 48, 60), 18.0),
+    'HIP': (0.12, 120000, 0.5, (120, 180, 240, 300, 360), 8.5),
+    'AUT': (0.2, 25000, 0.5, (24, 36, 48, 60, 72), 11.0),
+    'EDU': (0.1, 10000, 0.6, (12, 24, 36, 48, 60, 84), 9.5),
+    'OTR': (0.13, 5000, 0.8, (6, 12, 24, 36), 22.0),
+}
+# Proporción de análisis todavía sin decidir, por estado
+PROPORCION_SIN_DECIDIR = {'PEN': 0.12, 'ESP': 0.05, 'CAN': 0.04}
+PROPORCION_SIN_PUNTAJE = 0.03
+
+CENTAVOS = Decimal('0.01')
+
+
+@contextmanager
+def fechas_explicitas(*modelos):
+    """Desactiva auto_now y auto_now_add en los modelos para poder asignar fechas históricas"""
+    campos = [
+        (campo, campo.auto_now, campo.auto_now_add)
+        for modelo in modelos for campo in modelo._meta.concrete_fields
+        if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+    ]
+    for campo, _auto_now, _auto_now_add in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in campos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def _elegir(rng, opciones, cantidad):
+    """Elige `cantidad` valores de una tupla de (valor, probabilidad)"""
+    valores = [valor for valor, _probabilidad in opciones]
+    return np.array(valores, dtype=object)[
+        rng.choice(len(valores), size=cantidad, p=[probabilidad for _valor, probabilidad in opciones])
+    ]
+
+
+def _dinero(valores):
+    return [Decimal(valor).quantize(CENTAVOS) for valor in np.round(valores, 2).tolist()]
+
+
+def _fechas(ahora, segundos_atras):
+    return [ahora - timedelta(seconds=segundos) for segundos in segundos_atras.tolist()]
+
+
+def siguiente_identificacion(prefijo=PREFIJO_IDENTIFICACION):
+    """Primer número libre para los clientes sintéticos con este prefijo"""
+    ultimo = (
+        Cliente.objects.filter(numero_identificacion__startswith=prefijo)
+        .order_by('-numero_identificacion').values_list('numero_identificacion', flat=True).first()
+    )
+    sufijo = ultimo[len(prefijo):] if ultimo else ''
+    return int(sufijo) + 1 if sufijo.isdigit() else 1
+
+
+def generar_clientes(rng, inicio, cantidad, ahora, prefijo=PREFIJO_IDENTIFICACION):
+    """Clientes sin guardar con números de identificación consecutivos desde `inicio`"""
+    nombres = rng.integers(0, len(NOMBRES), cantidad).tolist()
+    apellidos = rng.integers(0, len(APELLIDOS), (cantidad, 2)).tolist()
+    ciudades = rng.integers(0, len(CIUDADES), (cantidad, 2)).tolist()
+    calles = rng.integers(0, len(CALLES), cantidad).tolist()
+    numeros_calle = rng.integers(100, 3000, cantidad).tolist()
+    ocupaciones = rng.integers(0, len(OCUPACIONES), cantidad).tolist()
+    empresas = rng.integers(0, len(EMPRESAS), cantidad).tolist()
+    tipos = _elegir(rng, TIPOS_IDENTIFICACION, cantidad)
+    estados_civiles = _elegir(rng, ESTADOS_CIVILES, cantidad)
+    edades_dias = rng.integers(18 * 365, 75 * 365, cantidad).tolist()
+    ingresos = _dinero(np.clip(rng.lognormal(np.log(2500), 0.6, cantidad), 300, 60000))
+    con_email = (rng.random(cantidad) < 0.8).tolist()
+    telefonos = rng.integers(1000000, 9999999, cantidad).tolist()
+    celulares = rng.integers(900000000, 999999999, cantidad).tolist()
+    registro = _fechas(ahora, rng.integers(0, 5 * 365 * 86400, cantidad))
+    hoy = ahora.date()
+
+    clientes = []
+    for i in range(cantidad):
+        numero = f'{prefijo}{inicio + i:09d}'
+        clientes.append(Cliente(
+            tipo_identificacion=tipos[i],
+            numero_identificacion=numero,
+            nombres=NOMBRES[nombres[i]],
+            apellidos=f'{APELLIDOS[apellidos[i][0]]} {APELLIDOS[apellidos[i][1]]}',
+            fecha_nacimiento=hoy - timedelta(days=edades_dias[i]),
+            lugar_nacimiento=CIUDADES[ciudades[i][0]],
+            estado_civil=estados_civiles[i],
+            direccion=f'{CALLES[calles[i]]} {numeros_calle[i]}, {CIUDADES[ciudades[i][1]]}',
+            telefono=f'01{telefonos[i]}',
+            celular=str(celulares[i]),
+            email=f'{numero.lower()}@ejemplo.com' if con_email[i] else None,
+            ocupacion=OCUPACIONES[ocupaciones[i]],
+            lugar_trabajo=EMPRESAS[empresas[i]],
+            ingreso_mensual=ingresos[i],
+            fecha_registro=registro[i],
+            actualizado=registro[i],
+        ))
+    return clientes
+
+
+def generar_referencias(rng, clientes, maximo):
+    """Entre 0 y `maximo` referencias personales sin guardar por cliente"""
+    indice_cliente = np.repeat(np.arange(len(clientes)), rng.integers(0, maximo + 1, len(clientes))).tolist()
+    total = len(indice_cliente)
+    nombres = rng.integers(0, len(NOMBRES), total).tolist()
+    apellidos = rng.integers(0, len(APELLIDOS), total).tolist()
+    parentescos = rng.integers(0, len(PARENTESCOS), total).tolist()
+    telefonos = rng.integers(900000000, 999999999, total).tolist()
+    return [
+        ReferenciaPersonal(
+            cliente_id=clientes[c].pk,
+            nombre_completo=f'{NOMBRES[nombres[i]]} {APELLIDOS[apellidos[i]]}',
+            parentesco=PARENTESCOS[parentescos[i]],
+            telefono=str(telefonos[i]),
+            direccion=clientes[c].direccion,
+        )
+        for i, c in enumerate(indice_cliente)
+    ]
+
+
+def generar_documentos(rng, clientes, maximo):
+    """
+    Metadatos de entre 0 y `maximo` documentos de tipos distintos por cliente;
+    los archivos no existen en el almacenamiento.
+    """
+    tipos = [tipo for tipo, _etiqueta in DocumentoCliente.TIPO_DOCUMENTO]
+    maximo = min(maximo, len(tipos))
+    cantidades = rng.integers(0, maximo + 1, len(clientes)).tolist()
+    # Una permutación de los tipos por cliente, de la que se toman los primeros
+    permutaciones = np.argsort(rng.random((len(clientes), len(tipos))), axis=1)[:, :maximo].tolist()
+    return [
+        DocumentoCliente(
+            cliente_id=cliente.pk,
+            tipo_documento=tipos[tipo],
+            archivo=f'clientes/documentos/sinteticos/{cliente.numero_identificacion}_{tipos[tipo]}.pdf',
+            fecha_subida=cliente.fecha_registro,
+        )
+        for cliente, cantidad, permutacion in zip(clientes, cantidades, permutaciones)
+        for tipo in permutacion[:cantidad]
+    ]
+
+
+def generar_analisis(rng, clientes, cantidades, ahora, usuarios=(), meses=MESES_HISTORIA):
+    """`cantidades[i]` análisis sin guardar para cada cliente `clientes[i]`"""
+    cantidades = np.asarray(cantidades)
+    total = int(cantidades.sum())
+    if not total:
+        return []
+    indice_cliente = np.repeat(np.arange(len(clientes)), cantidades)
+    ingreso_cliente = np.array([float(c.ingreso_mensual) for c in clientes])[indice_cliente]
+
+    codigos = list(TIPOS_CREDITO)
+    tipo = rng.choice(len(codigos), size=total, p=[TIPOS_CREDITO[c][0] for c in codigos])
+    medianas = np.array([TIPOS_CREDITO[c][1] for c in codigos])[tipo]
+    dispersion = np.array([TIPOS_CREDITO[c][2] for c in codigos])[tipo]
+    tasa_media = np.array([TIPOS_CREDITO[c][4] for c in codigos])[tipo]
+
+    ingresos = ingreso_cliente * rng.lognormal(0, 0.1, total)
+    gastos = ingresos * np.clip(rng.beta(4, 4, total) * 1.1, 0.1, 1.2)
+    deuda = np.where(rng.random(total) < 0.35, 0.0, ingresos * rng.gamma(2.0, 3.0, total))
+    monto = np.clip(medianas * rng.lognormal(0, dispersion, total), 500, 2_000_000)
+    plazo = np.zeros(total, dtype=int)
+    for t, codigo in enumerate(codigos):
+        del_tipo = tipo == t
+        plazo[del_tipo] = rng.choice(TIPOS_CREDITO[codigo][3], size=int(del_tipo.sum()))
+    tasa = np.clip(tasa_media + rng.normal(0, 3, total), 1, 60)
+
+    # Puntaje del modelo de la API con ruido, y algunos análisis todavía sin puntuar
+    puntaje = calcular_puntajes(ingresos, gastos, deuda, monto, plazo, tasa)['puntaje']
+    puntaje = np.clip(puntaje + rng.normal(0, 45, total), PUNTAJE_MINIMO, PUNTAJE_MAXIMO).astype(int)
+    sin_puntaje = rng.random(total) < PROPORCION_SIN_PUNTAJE
+
+    # Estado: una parte sin decidir; el resto aprobado con más probabilidad cuanto mejor el puntaje
+    sorteo = rng.random(total)
+    estado = np.where(
+        rng.random(total) < np.where(puntaje >= PUNTAJE_APROBACION, 0.85, 0.15), 'APR', 'REC'
+    ).astype(object)
+    limite = 0.0
+    for codigo, proporcion in PROPORCION_SIN_DECIDIR.items():
+        estado[(sorteo >= limite) & (sorteo < limite + proporcion)] = codigo
+        limite += proporcion
+    estado[sin_puntaje] = 'PEN'
+
+    fecha = _fechas(ahora, rng.integers(0, meses * 30 * 86400, total))
+    actualizacion = rng.integers(0, 7 * 86400, total).tolist()
+    usuario = rng.integers(0, len(usuarios), total).tolist() if usuarios else None
+
+    ingresos, gastos, deuda, monto, tasa = map(_dinero, (ingresos, gastos, deuda, monto, tasa))
+    tipo, plazo, puntaje = tipo.tolist(), plazo.tolist(), puntaje.tolist()
+    sin_puntaje, estado = sin_puntaje.tolist(), estado.tolist()
+    analisis = []
+    for i, cliente_i in enumerate(indice_cliente.tolist()):
+        analisis.append(AnalisisCredito(
+            cliente_id=clientes[cliente_i].pk,
+            usuario_id=usuarios[usuario[i]] if usuario is not None else None,
+            tipo_credito=codigos[tipo[i]],
+            monto_solicitado=monto[i],
+            plazo_meses=plazo[i],
+            tasa_interes=tasa[i],
+            puntaje_credito=None if sin_puntaje[i] else puntaje[i],
+            estado=estado[i],
+            ingresos_mensuales=ingresos[i],
+            gastos_mensuales=gastos[i],
+            deuda_actual=deuda[i],
+            fecha_analisis=fecha[i],
+            fecha_actualizacion=min(fecha[i] + timedelta(seconds=actualizacion[i]), ahora),
+        ))
+    return analisis
+
+
+def generar(clientes, analisis, referencias=2, documentos=2, semilla=SEMILLA, tamano_bloque=TAMANO_BLOQUE,
+            prefijo=PREFIJO_IDENTIFICACION, progreso=None):
+    """
+    Crea `clientes` clientes y `analisis` análisis repartidos entre ellos al
+    azar, con hasta `referencias` referencias y `documentos` documentos por
+    cliente. `progreso`, si se indica, recibe los totales tras cada bloque.
+    Devuelve un diccionario con el número de filas creadas de cada tipo.
+    """
+    rng = np.random.default_rng(semilla)
+    ahora = timezone.now()
+    usuarios = list(get_user_model().objects.filter(is_staff=True).order_by('pk').values_list('pk', flat=True))
+    # Cada análisis se asigna a un cliente al azar; el total es exacto
+    por_cliente = np.bincount(rng.integers(0, clientes, analisis), minlength=clientes) if clientes else []
+    inicio = siguiente_identificacion(prefijo)
+    totales = {'clientes': 0, 'referencias': 0, 'documentos': 0, 'analisis': 0}
+
+    with fechas_explicitas(Cliente, DocumentoCliente, AnalisisCredito):
+        for desde in range(0, clientes, tamano_bloque):
+            hasta = min(desde + tamano_bloque, clientes)
+            with transaction.atomic():
+                bloque = Cliente.objects.bulk_create(generar_clientes(rng, inicio + desde, hasta - desde, ahora, prefijo))
+                if bloque and bloque[0].pk is None:
+                    # Bases de datos sin RETURNING en inserciones masivas
+                    ids = dict(Cliente.objects.filter(
+                        numero_identificacion__in=[c.numero_identificacion for c in bloque]
+                    ).values_list('numero_identificacion', 'pk'))
+                    for cliente in bloque:
+                        cliente.pk = ids[cliente.numero_identificacion]
+                busqueda.indexar_clientes(
+                    (c.pk, *(getattr(c, campo) for campo in busqueda.CAMPOS_INDEXADOS)) for c in bloque
+                )
+                totales['referencias'] += len(ReferenciaPersonal.objects.bulk_create(
+                    generar_referencias(rng, bloque, referencias)
+                ))
+                totales['documentos'] += len(DocumentoCliente.objects.bulk_create(
+                    generar_documentos(rng, bloque, documentos)
+                ))
+                # El bulk_create del QuerySet calcula las métricas y actualiza los resúmenes
+                totales['analisis'] += len(AnalisisCredito.objects.bulk_create(
+                    generar_analisis(rng, bloque, por_cliente[desde:hasta], ahora, usuarios)
+                ))
+            totales['clientes'] += len(bloque)
+            if progreso:
+                progreso(totales)
+    return totales
@@ -0,0 +1,220 @@
+"""
+Subidas de documentos por fragmentos, reanudables.
+
+Para archivos grandes (extractos bancarios escaneados de cientos de MB) los
+formularios de documentos usan este protocolo en lugar del envío multipart
+(vistas en api_views.py, JavaScript en static/js/subida_fragmentada.js):
+
+1. POST api/v2/subidas/ con el análisis o el cliente, el tipo de documento,
+   las notas, el nombre y el tamaño del archivo. Devuelve el id de la subida
+   y el tamaño de fragmento, que fija el servidor.
+2. PUT api/v2/subidas/<id>/fragmentos/<n>/ con los bytes del fragmento n
+   (desde 0) como cuerpo. Se leen de la petición por bloques y se escriben
+   en su posición del archivo temporal, sin cargarlos en memoria. Los
+   fragmentos se aceptan en orden; uno ya recibido no se vuelve a escribir,
+   de modo que reintentarlo es inocuo. Con la cabecera X-Checksum-SHA256 se
+   comprueba el fragmento antes de darlo por recibido.
+3. GET api/v2/subidas/<id>/ devuelve los fragmentos recibidos: tras un
+   corte, el cliente sigue desde ahí.
+4. POST api/v2/subidas/<id>/finalizar/ con `sha256`, el SHA-256 de la
+   concatenación de los SHA-256 (binarios) de cada fragmento, que el
+   navegador puede calcular fragmento a fragmento. Si coincide con el del
+   archivo recibido se crea el documento y se elimina la subida. La primera
+   petición de finalizar reclama la subida con un UPDATE condicional sobre
+   su estado; las demás (reintentos, dobles clics) reciben 409.
+
+DELETE api/v2/subidas/<id>/ cancela la subida si no se está finalizando
+(409 en ese caso). Las abandonadas durante más
+de SUBIDAS_CADUCIDAD_HORAS las elimina gc_document_blobs.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from clientes.models import DocumentoCliente
+from .models import DocumentoAnalisis, SubidaFragmentada
+
+
+BLOQUE_LECTURA = 64 * 1024
+TAMANO_LOTE = 500
+
+
+class ErrorSubida(ValueError):
+    """Petición de subida no válida; `estado` es el código HTTP de la respuesta"""
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def ruta_temporal(subida):
+    return os.path.join(settings.SUBIDAS_DIR, f'{subida.pk}.part')
+
+
+def iniciar(usuario, datos):
+    """Crea la subida y su archivo temporal a partir de los datos validados de SubidaFragmentadaForm"""
+    subida = SubidaFragmentada.objects.create(
+        usuario=usuario,
+        analisis=datos['analisis'],
+        cliente=datos['cliente'],
+        tipo_documento=datos['tipo_documento'],
+        notas=datos['notas'],
+        nombre_archivo=os.path.basename(datos['nombre_archivo']),
+        tamano=datos['tamano'],
+        tamano_fragmento=settings.SUBIDAS_TAMANO_FRAGMENTO,
+    )
+    os.makedirs(settings.SUBIDAS_DIR, exist_ok=True)
+    open(ruta_temporal(subida), 'wb').close()
+    return subida
+
+
+def escribir_fragmento(subida, numero, flujo, longitud, checksum=None):
+    """
+    Escribe el fragmento `numero` leyendo `longitud` bytes de `flujo` (el
+    cuerpo de la petición). Devuelve True si se escribió y False si ya se
+    había recibido. Lanza ErrorSubida si no es el siguiente fragmento, si
+    no tiene el tamaño esperado o si no coincide con `checksum`.
+    """
+    if not 0 <= numero < subida.total_fragmentos:
+        raise ErrorSubida('El fragmento %d no existe' % numero, 404)
+    if numero < subida.fragmentos_recibidos:
+        return False
+    if numero > subida.fragmentos_recibidos:
+        raise ErrorSubida('Se esperaba el fragmento %d' % subida.fragmentos_recibidos, 409)
+    if longitud != subida.longitud_fragmento(numero):
+        raise ErrorSubida('El fragmento %d debe tener %d bytes' % (numero, subida.longitud_fragmento(numero)))
+
+    resumen = hashlib.sha256()
+    with open(ruta_temporal(subida), 'r+b') as archivo:
+        archivo.seek(numero * subida.tamano_fragmento)
+        restante = longitud
+        while restante:
+            bloque = flujo.read(min(BLOQUE_LECTURA, restante))
+            if not bloque:
+                raise ErrorSubida('El fragmento %d llegó incompleto' % numero)
+            resumen.update(bloque)
+            archivo.write(bloque)
+            restante -= len(bloque)
+    if checksum and resumen.hexdigest() != checksum.lower():
+        raise ErrorSubida('La suma de comprobación del fragmento %d no coincide' % numero)
+
+    # Solo cuenta si nadie lo ha contado antes (reintentos simultáneos)
+    SubidaFragmentada.objects.filter(pk=subida.pk, fragmentos_recibidos=numero).update(
+        fragmentos_recibidos=numero + 1, actualizado=timezone.now()
+    )
+    subida.fragmentos_recibidos = numero + 1
+    return True
+
+
+def suma_fragmentos(archivo, tamano_fragmento):
+    """SHA-256 de la concatenación de los SHA-256 de cada fragmento de un archivo abierto"""
+    total = hashlib.sha256()
+    while True:
+        resumen = hashlib.sha256()
+        restante = tamano_fragmento
+        while restante:
+            bloque = archivo.read(min(BLOQUE_LECTURA, restante))
+            if not bloque:
+                break
+            resumen.update(bloque)
+            restante -= len(bloque)
+        if restante == tamano_fragmento:
+            return total.hexdigest()
+        total.update(resumen.digest())
+
+
+def finalizar(subida, sha256):
+    """
+    Comprueba el archivo recibido y crea el documento. Si la suma de
+    comprobación no coincide, la subida se elimina y hay que repetirla.
+    """
+    if subida.fragmentos_recibidos < subida.total_fragmentos:
+        raise ErrorSubida(
+            'Faltan fragmentos: recibidos %d de %d' % (subida.fragmentos_recibidos, subida.total_fragmentos), 409
+        )
+    # UPDATE ... WHERE estado = 'ABI': solo una petición lo consigue, también en
+    # SQLite, donde select_for_update no bloquea
+    reclamada = SubidaFragmentada.objects.filter(pk=subida.pk, estado=SubidaFragmentada.EstadoSubida.ABIERTA).update(
+        estado=SubidaFragmentada.EstadoSubida.FINALIZANDO, actualizado=timezone.now()
+    )
+    if not reclamada:
+        raise ErrorSubida('La subida ya se está finalizando o no existe', 409)
+    subida.estado = SubidaFragmentada.EstadoSubida.FINALIZANDO
+
+    try:
+        # El mismo descriptor sirve para comprobar y para copiar el archivo
+        archivo = open(ruta_temporal(subida), 'rb')
+    except FileNotFoundError:
+        _descartar(subida)
+        raise ErrorSubida('El archivo de la subida no existe; vuelva a subirlo', 404)
+    with archivo:
+        if (os.fstat(archivo.fileno()).st_size != subida.tamano
+                or suma_fragmentos(archivo, subida.tamano_fragmento) != sha256.lower()):
+            _descartar(subida)
+            raise ErrorSubida('La suma de comprobación del archivo no coincide; vuelva a subirlo')
+
+        if subida.analisis_id:
+            documento = DocumentoAnalisis(analisis_id=subida.analisis_id, tipo_documento=subida.tipo_documento,
+                                          notas=subida.notas)
+        else:
+            documento = DocumentoCliente(cliente_id=subida.cliente_id, tipo_documento=subida.tipo_documento,
+                                         notas=subida.notas)
+        # La copia al almacenamiento (cientos de MB) se hace fuera de la transacción; si
+        # falla, la subida vuelve a estar abierta para reintentar. Hasta que se guarda el
+        # documento el blob no tiene referencias y lo protege el margen del recolector.
+        archivo.seek(0)
+        try:
+            documento.archivo.save(subida.nombre_archivo, File(archivo), save=False)
+        except Exception:
+            SubidaFragmentada.objects.filter(pk=subida.pk).update(estado=SubidaFragmentada.EstadoSubida.ABIERTA)
+            raise
+
+    with transaction.atomic():
+        # Si gc_document_blobs la purgó mientras tanto no se crea el documento
+        if not SubidaFragmentada.objects.filter(pk=subida.pk).delete()[0]:
+            raise ErrorSubida('La subida ya no existe', 409)
+        documento.save()
+    _borrar_temporal(subida)
+    return documento
+
+
+def _borrar_temporal(subida):
+    try:
+        os.unlink(ruta_temporal(subida))
+    except FileNotFoundError:
+        pass
+
+
+def _descartar(subida):
+    subida.delete()
+    _borrar_temporal(subida)
+
+
+def cancelar(subida):
+    """Elimina la subida y su temporal; ErrorSubida (409) si se está finalizando"""
+    if not SubidaFragmentada.objects.filter(pk=subida.pk, estado=SubidaFragmentada.EstadoSubida.ABIERTA).delete()[0]:
+        raise ErrorSubida('La subida se está finalizando o ya no existe', 409)
+    _borrar_temporal(subida)
+
+
+def purgar_caducadas(caducidad=None, tamano_lote=TAMANO_LOTE):
+    """
+    Elimina las subidas sin actividad desde hace más de `caducidad` (por
+    defecto SUBIDAS_CADUCIDAD_HORAS) y sus temporales. Devuelve cuántas.
+    """
+    if caducidad is None:
+        caducidad = timedelta(hours=settings.SUBIDAS_CADUCIDAD_HORAS)
+    caducadas = SubidaFragmentada.objects.filter(actualizado__lt=timezone.now() - caducidad)
+    total = 0
+    while True:
+        bloque = list(caducadas.only('pk')[:tamano_lote])
+        if not bloque:
+            return total
+        for subida in bloque:
+            _borrar_temporal(subida)
+        SubidaFragmentada.objects.filter(pk__in=[subida.pk for subida in bloque]).delete()
+        total += len(bloque)
@@ -1,3 +1,703 @@
-from django.test import TestCase
+import hashlib
+import json
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.models import Cliente, DocumentoCliente
+from gestion_riesgo.paginacion import KeysetPaginator
+from gestion_riesgo.testing import SOLICITUD, crear_analisis, crear_cliente
+from . import benchmarks, subidas
+from .amortizacion import factor_anualidad, tabla_amortizacion_filas
+from .consent_buffer import BufferConsentimientos
+from .retencion import leer_archivo, purgar_consentimientos
+from .cartera import reconstruir_cartera
+from .models import (
+    AnalisisCredito, BlobDocumento, ConsentLog, DocumentoAnalisis, ResumenCartera, ResumenCreditoCliente,
+    SimulacionPerdidas, SubidaFragmentada,
+)
+from .puntaje import evaluar_solicitudes
+from .estres import estresar_cartera, parsear_escenario
+from .simulacion import Cartera, simular_perdidas
+from .sintetico import generar
+from .views import filtrar_analisis
+
+
+class PuntajeTests(TestCase):
+    def test_evaluar_solicitud(self):
+        resultado = evaluar_solicitudes([SOLICITUD])[0]
+        # Capacidad de ahorro de 0.5 (+50); ratio deuda/ingreso anual de 0.33 sin ajuste
+        self.assertEqual(resultado['puntaje'], 700)
+        self.assertEqual(resultado['nivel_riesgo'], 'Bueno')
+        self.assertEqual(resultado['cuota_mensual'], 470.73)
+        self.assertEqual(resultado['capacidad_pago'], 450.0)
+        self.assertFalse(resultado['recomendacion_aprobacion'])
+
+    def test_errores_por_solicitud(self):
+        resultados = evaluar_solicitudes([{'ingresos_mensuales': 'abc'}, SOLICITUD, []])
+        self.assertFalse(resultados[0]['success'])
+        self.assertIn('ingresos_mensuales', resultados[0]['errores'])
+        self.assertTrue(resultados[1]['success'])
+        self.assertFalse(resultados[2]['success'])
+
+
+class CalcularPuntajeApiTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+
+    def post(self, url_name, data):
+        return self.client.post(
+            reverse(url_name), json.dumps(data), content_type='application/json'
+        )
+
+    def test_lote_coincide_con_individual(self):
+        individual = self.post('creditos:api_v2_calcular_puntaje', SOLICITUD).json()
+        lote = self.post('creditos:api_v2_calcular_puntaje_lote', [SOLICITUD, {'plazo_meses': 'x'}]).json()
+
+        self.assertEqual(lote['count'], 2)
+        self.assertEqual(lote['errores'], 1)
+        primero = dict(lote['results'][0])
+        self.assertEqual(primero.pop('indice'), 0)
+        self.assertEqual(primero, individual)
+        self.assertIn('plazo_meses', lote['results'][1]['errores'])
+
+    def test_individual_invalido(self):
+        response = self.post('creditos:api_v2_calcular_puntaje', {'monto_solicitado': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_valores_fuera_de_rango(self):
+        response = self.post('creditos:api_v2_calcular_puntaje', dict(SOLICITUD, plazo_meses=0))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('plazo_meses', response.json()['errores'])
+
+        # Infinity, 1e400 y enteros enormes desbordan: error de la fila, no del lote
+        cuerpo = '[{"plazo_meses": Infinity}, {"plazo_meses": %s}, {"monto_solicitado": 1e400}, ' \
+                 '{"deuda_actual": -1}, {"plazo_meses": 361}, {"tasa_interes": 101}, %s]' % ('9' * 400, json.dumps(SOLICITUD))
+        response = self.client.post(
+            reverse('creditos:api_v2_calcular_puntaje_lote'), cuerpo, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        resultados = response.json()['results']
+        campos = ['plazo_meses', 'plazo_meses', 'monto_solicitado', 'deuda_actual', 'plazo_meses', 'tasa_interes']
+        for resultado, campo in zip(resultados, campos):
+            self.assertFalse(resultado['success'])
+            self.assertIn(campo, resultado['errores'])
+        self.assertTrue(resultados[-1]['success'])
+
+
+class RescorePortfolioTests(TestCase):
+    def test_recalcula_por_bloques(self):
+        cliente = crear_cliente()
+        analisis = [crear_analisis(cliente) for _ in range(5)]
+        crear_analisis(cliente, estado=AnalisisCredito.EstadoAnalisis.APROBADO)
+
+        salida = StringIO()
+        call_command('rescore_portfolio', '--estado', 'PEN', '--tamano-bloque', '2', stdout=salida)
+
+        self.assertIn('Procesadas 5 filas', salida.getvalue())
+        for item in analisis:
+            item.refresh_from_db()
+            self.assertEqual(item.puntaje_credito, 700)
+        self.assertFalse(AnalisisCredito.objects.filter(estado='APR', puntaje_credito__isnull=False).exists())
+
+
+class AmortizacionTests(TestCase):
+    def test_tabla_cuadra_con_cuota(self):
+        tabla = tabla_amortizacion_filas(Decimal('10000'), Decimal('12'), 24)
+        self.assertEqual(len(tabla), 24)
+        self.assertEqual(tabla[0]['interes'], 100.0)
+        self.assertEqual(tabla[0]['cuota'], 470.73)
+        self.assertEqual(tabla[-1]['saldo'], 0.0)
+        self.assertAlmostEqual(sum(fila['capital'] for fila in tabla), 10000, places=1)
+
+    def test_cuota_modelo_usa_factor_en_cache(self):
+        factor_anualidad.cache_clear()
+        analisis = AnalisisCredito(**SOLICITUD)
+        self.assertEqual(analisis.calcular_metricas()['cuota_mensual_estimada'], Decimal('470.73'))
+        analisis.puede_aprobar()
+        self.assertEqual(factor_anualidad.cache_info().hits, 1)
+
+    def test_api(self):
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+        url = reverse('creditos:api_tabla_amortizacion')
+        datos = self.client.get(url, {'monto': '10000', 'tasa': '0', 'plazo': '10'}).json()
+        self.assertEqual(datos['cuota_mensual'], 1000.0)
+        self.assertEqual(len(datos['periodos']), 10)
+        self.assertEqual(self.client.get(url, {'monto': '10000'}).status_code, 400)
+
+
+class MetricasPersistidasTests(TestCase):
+    def setUp(self):
+        self.cliente = crear_cliente()
+
+    def test_save_calcula_metricas(self):
+        analisis = crear_analisis(self.cliente, puntaje_credito=700, monto_solicitado=5000)
+        analisis.refresh_from_db()
+        self.assertEqual(analisis.cuota_mensual_estimada, Decimal('235.37'))
+        self.assertEqual(analisis.capacidad_pago, Decimal('450.00'))
+        self.assertEqual(analisis.banda_riesgo, AnalisisCredito.NivelRiesgo.BUENO)
+        self.assertTrue(analisis.es_aprobable)
+        self.assertEqual(analisis.puede_aprobar(), analisis.es_aprobable)
+
+    def test_operaciones_masivas(self):
+        analisis = crear_analisis(self.cliente, puntaje_credito=700, monto_solicitado=5000)
+        AnalisisCredito.objects.filter(pk=analisis.pk).update(puntaje_credito=500)
+        analisis.refresh_from_db()
+        self.assertEqual(analisis.banda_riesgo, AnalisisCredito.NivelRiesgo.RIESGOSO)
+        self.assertFalse(analisis.es_aprobable)
+
+        analisis.plazo_meses = 12
+        AnalisisCredito.objects.bulk_update([analisis], ['plazo_meses'])
+        analisis.refresh_from_db()
+        self.assertEqual(analisis.cuota_mensual_estimada, Decimal('444.24'))
+
+        nuevos = AnalisisCredito.objects.bulk_create([
+            AnalisisCredito(cliente=self.cliente, puntaje_credito=820, **SOLICITUD)
+        ])
+        self.assertEqual(nuevos[0].banda_riesgo, AnalisisCredito.NivelRiesgo.EXCELENTE)
+
+    def test_filtrar_y_ordenar_en_base_de_datos(self):
+        barato = crear_analisis(self.cliente, puntaje_credito=500, monto_solicitado=1000)
+        caro = crear_analisis(self.cliente, puntaje_credito=550, monto_solicitado=9000)
+        crear_analisis(self.cliente, puntaje_credito=750)
+        crear_analisis(self.cliente, puntaje_credito=500, estado=AnalisisCredito.EstadoAnalisis.APROBADO)
+
+        queryset = filtrar_analisis(
+            AnalisisCredito.objects.all(), {'estado': 'PEN', 'nivel': 'RIE', 'orden': '-cuota'}
+        )
+        self.assertEqual(list(queryset), [caro, barato])
+
+
+class PaginacionKeysetTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+        self.cliente = crear_cliente()
+
+    def recorrer(self, url, params):
+        ids, paginas = [], []
+        respuesta = self.client.get(url, params).json()
+        while True:
+            paginas.append(respuesta)
+            ids.extend(resultado['id'] for resultado in respuesta['results'])
+            if not respuesta['siguiente']:
+                return ids, paginas
+            respuesta = self.client.get(url, dict(params, cursor=respuesta['siguiente'])).json()
+
+    def test_recorre_analisis_en_ambos_sentidos(self):
+        for monto in (1000, 3000, 2000, 3000, 5000):
+            crear_analisis(self.cliente, monto_solicitado=monto)
+        url = reverse('creditos:api_listar_analisis')
+        esperado = list(AnalisisCredito.objects.order_by('-monto_solicitado', '-pk').values_list('pk', flat=True))
+
+        ids, paginas = self.recorrer(url, {'orden': '-monto', 'limite': 2})
+        self.assertEqual(ids, esperado)
+        self.assertEqual([len(pagina['results']) for pagina in paginas], [2, 2, 1])
+        self.assertIsNone(paginas[0]['anterior'])
+
+        anterior = self.client.get(url, {'orden': '-monto', 'limite': 2, 'cursor': paginas[-1]['anterior']}).json()
+        self.assertEqual([resultado['id'] for resultado in anterior['results']], esperado[2:4])
+
+        self.assertEqual(self.client.get(url, {'cursor': 'manipulado'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'orden': 'puntaje'}).status_code, 400)
+
+    def test_clientes_con_desempate_y_busqueda(self):
+        for numero in ('11111111', '22222222', '33333333'):
+            crear_cliente(numero, apellidos='Gómez')
+        url = reverse('creditos:api_listar_clientes')
+        ids, _paginas = self.recorrer(url, {'q': 'gomez', 'limite': 1})
+        self.assertEqual(ids, list(Cliente.objects.filter(apellidos='Gómez').order_by('pk').values_list('pk', flat=True)))
+
+        pagina = KeysetPaginator(Cliente.objects.all(), ('apellidos', 'nombres', 'pk'), 4).page()
+        self.assertEqual(pagina.object_list[-1], self.cliente)
+        self.assertFalse(pagina.has_next)
+
+
+class ExportacionCarteraTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+        cliente = crear_cliente(nombres='José', apellidos='Núñez, hijo')
+        self.aprobado = crear_analisis(cliente, estado='APR', monto_solicitado=5000)
+        self.pendiente = crear_analisis(cliente)
+
+    def test_exporta_csv_con_filtros_y_columnas(self):
+        respuesta = self.client.get(reverse('creditos:analisis_exportar'), {
+            'estado': 'APR', 'columnas': 'id,cliente,cuota_mensual',
+        })
+        self.assertTrue(respuesta.streaming)
+        self.assertIn('attachment', respuesta['Content-Disposition'])
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8')
+        self.assertEqual(contenido.splitlines(), [
+            'id,cliente,cuota_mensual',
+            '%s,"José Núñez, hijo",%s' % (self.aprobado.pk, self.aprobado.cuota_mensual_estimada),
+        ])
+
+        self.assertEqual(self.client.get(reverse('creditos:analisis_exportar'), {'columnas': 'clave'}).status_code, 400)
+
+    def test_comando_jsonl(self):
+        salida = StringIO()
+        call_command('export_portfolio', formato='jsonl', columnas='id,estado,nivel_riesgo',
+                     orden='monto', stdout=salida, stderr=StringIO())
+        filas = [json.loads(linea) for linea in salida.getvalue().splitlines()]
+        self.assertEqual([fila['id'] for fila in filas], [self.aprobado.pk, self.pendiente.pk])
+        self.assertEqual(set(filas[0]), {'id', 'estado', 'nivel_riesgo'})
+
+
+class ConsentBufferTests(TestCase):
+    def consentimiento(self):
+        return ConsentLog(action='accept', analytics=True, expires_at=ConsentLog.default_expiry())
+
+    def test_lotes_y_desborde(self):
+        buffer = BufferConsentimientos(tamano_lote=2, capacidad=2)
+        for _i in range(3):
+            self.assertTrue(buffer.registrar(self.consentimiento(), iniciar_hilo=False))
+        # El tercero no cabe en la cola y se guarda de forma síncrona
+        self.assertEqual(ConsentLog.objects.count(), 1)
+        self.assertEqual(buffer.vaciar(), 2)
+        self.assertEqual(ConsentLog.objects.count(), 3)
+        self.assertEqual(buffer.estadisticas(), {
+            'pendientes': 0, 'encolados': 2, 'escritos': 3, 'desbordes': 1, 'fallidos': 0,
+        })
+
+    @override_settings(CONSENT_BUFFER_ENABLED=False)
+    def test_endpoint_sincrono(self):
+        respuesta = self.client.post(
+            reverse('api_consent'), json.dumps({'action': 'reject'}), content_type='application/json'
+        )
+        self.assertEqual(respuesta.json(), {'status': 'ok', 'logged': True})
+        self.assertGreater(ConsentLog.objects.get().expires_at, timezone.now())
+
+
+class RetencionConsentimientosTests(TestCase):
+    def setUp(self):
+        ahora = timezone.now()
+        self.caducados = [
+            ConsentLog.objects.create(action='accept', expires_at=ahora - timezone.timedelta(days=dias))
+            for dias in (1, 30)
+        ]
+        self.vigente = ConsentLog.objects.create(action='reject', expires_at=ConsentLog.default_expiry())
+
+    def test_archivar_por_bloques(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = StringIO()
+            call_command('archive_consent', directorio=Path(directorio), tamano_bloque=1, stdout=salida)
+            self.assertIn('Archivados 2 registros', salida.getvalue())
+            archivo, = Path(directorio).iterdir()
+            filas = list(leer_archivo(archivo))
+        self.assertEqual([fila['id'] for fila in filas], [consentimiento.pk for consentimiento in self.caducados])
+        self.assertEqual(filas[0]['action'], 'accept')
+        self.assertEqual(list(ConsentLog.objects.all()), [self.vigente])
+
+    def test_purgar(self):
+        call_command('purge_consent', dry_run=True, stdout=StringIO())
+        self.assertEqual(ConsentLog.objects.count(), 3)
+        call_command('purge_consent', stdout=StringIO())
+        self.assertEqual(list(ConsentLog.objects.all()), [self.vigente])
+
+    def test_fecha_futura_no_toca_los_vigentes(self):
+        for comando in ('purge_consent', 'archive_consent'):
+            with self.assertRaises(CommandError):
+                call_command(comando, '--antes', '2099-01-01', stdout=StringIO())
+        futuro = timezone.now() + timezone.timedelta(days=365 * 50)
+        self.assertEqual(purgar_consentimientos(antes=futuro), 2)
+        self.assertEqual(list(ConsentLog.objects.all()), [self.vigente])
+
+
+class ResumenCreditoClienteTests(TestCase):
+    def setUp(self):
+        self.cliente = crear_cliente()
+
+    def resumen(self):
+        return ResumenCreditoCliente.objects.get(cliente=self.cliente)
+
+    def test_senales_y_operaciones_masivas(self):
+        aprobado = crear_analisis(self.cliente, estado='APR', monto_solicitado=8000, deuda_actual=500)
+        ultimo = crear_analisis(self.cliente, puntaje_credito=710, deuda_actual=1000)
+        resumen = self.resumen()
+        self.assertEqual((resumen.total_analisis, resumen.aprobados, resumen.pendientes), (2, 1, 1))
+        self.assertEqual(resumen.monto_aprobado, Decimal('8000'))
+        # La deuda es la declarada en el último análisis, no la suma de todos
+        self.assertEqual(resumen.deuda_actual, Decimal('1000'))
+        self.assertEqual((resumen.ultimo_analisis_id, resumen.ultimo_puntaje), (ultimo.pk, 710))
+
+        AnalisisCredito.objects.filter(pk=ultimo.pk).update(estado='REC')
+        self.assertEqual((self.resumen().rechazados, self.resumen().ultimo_estado), (1, 'REC'))
+
+        AnalisisCredito.objects.bulk_create([AnalisisCredito(cliente=self.cliente, estado='APR', **SOLICITUD)])
+        self.assertEqual(self.resumen().monto_aprobado, Decimal('18000'))
+
+        otro = crear_cliente('87654321')
+        aprobado.cliente = otro
+        aprobado.save()
+        self.assertEqual(self.resumen().total_analisis, 2)
+        self.assertEqual(ResumenCreditoCliente.objects.get(cliente=otro).aprobados, 1)
+
+        AnalisisCredito.objects.filter(cliente=self.cliente).delete()
+        self.assertFalse(ResumenCreditoCliente.objects.filter(cliente=self.cliente).exists())
+
+    def test_api_y_reconstruccion(self):
+        analisis = crear_analisis(self.cliente, estado='APR')
+        ResumenCreditoCliente.objects.all().delete()
+        salida = StringIO()
+        call_command('rebuild_credit_summaries', stdout=salida)
+        self.assertIn('Recalculados 1 resúmenes', salida.getvalue())
+
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+        datos = self.client.get(reverse('creditos:api_obtener_cliente', args=[self.cliente.pk])).json()
+        self.assertEqual(datos['ultimo_analisis']['url'], analisis.get_absolute_url())
+        self.assertEqual(datos['ultimo_analisis']['estado'], 'Aprobado')
+        self.assertEqual(datos['resumen']['aprobados'], 1)
+
+
+class ResumenCarteraTests(TestCase):
+    def cubetas(self):
+        return sorted(ResumenCartera.objects.values_list(
+            'mes', 'estado', 'tipo_credito', 'banda_riesgo', 'cantidad', 'monto_total'
+        ))
+
+    def assertCoincideConReconstruccion(self):
+        incremental = self.cubetas()
+        reconstruir_cartera()
+        self.assertEqual(incremental, self.cubetas())
+
+    def test_diferencias_al_guardar_y_eliminar(self):
+        cliente = crear_cliente()
+        analisis = crear_analisis(cliente, monto_solicitado=1000)
+        otro = crear_analisis(cliente, monto_solicitado=2500)
+        fila = ResumenCartera.objects.get()
+        self.assertEqual((fila.cantidad, fila.monto_total), (2, Decimal('3500')))
+
+        analisis = AnalisisCredito.objects.get(pk=analisis.pk)
+        analisis.estado = 'APR'
+        analisis.save()
+        self.assertCoincideConReconstruccion()
+
+        AnalisisCredito.objects.filter(pk=otro.pk).update(tipo_credito='HIP')
+        AnalisisCredito.objects.bulk_create([
+            AnalisisCredito(cliente=cliente, **dict(SOLICITUD, monto_solicitado=400)) for _i in range(3)
+        ])
+        self.assertCoincideConReconstruccion()
+
+        AnalisisCredito.objects.get(pk=analisis.pk).delete()
+        self.assertFalse(ResumenCartera.objects.filter(estado='APR').exists())
+        self.assertCoincideConReconstruccion()
+
+    def test_panel_lee_solo_el_resumen(self):
+        cliente = crear_cliente()
+        for monto in (1000, 2000, 3000):
+            crear_analisis(cliente, monto_solicitado=monto)
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+        url = reverse('creditos:panel_cartera')
+        self.client.get(url)
+        with self.assertNumQueries(6):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.context['total_analisis'], 3)
+        self.assertEqual(respuesta.context['monto_total'], Decimal('6000'))
+        self.assertContains(respuesta, '$6000.00')
+
+
+class SimulacionPerdidasTests(TestCase):
+    def test_reproducible_e_independiente_del_numero_de_procesos(self):
+        generador = np.random.default_rng(0)
+        cartera = Cartera(
+            generador.integers(0, 5, 2000), generador.integers(0, 5, 2000), generador.uniform(1000, 50000, 2000),
+            pd={'EXC': 0.005, 'BUE': 0.015, 'ACE': 0.04, 'RIE': 0.12, 'NOE': 0.08},
+            lgd={'PER': 0.65, 'HIP': 0.25, 'AUT': 0.45, 'EDU': 0.6, 'OTR': 0.6},
+        )
+        perdidas, semilla = simular_perdidas(cartera, 2500, semilla=7, correlacion=0.12, procesos=1)
+        en_paralelo, _semilla = simular_perdidas(cartera, 2500, semilla=7, correlacion=0.12, procesos=2)
+        self.assertEqual(semilla, 7)
+        np.testing.assert_allclose(perdidas, en_paralelo)
+        # La media simulada converge a la pérdida esperada analítica (suma de PD × LGD × EAD)
+        self.assertAlmostEqual(perdidas.mean() / cartera.perdida_esperada_teorica, 1, delta=0.1)
+
+    def test_comando_guarda_y_vista_muestra_resultado(self):
+        cliente = crear_cliente()
+        for monto in (5000, 8000, 12000):
+            crear_analisis(cliente, monto_solicitado=monto, estado='APR')
+        call_command('simulate_losses', escenarios=500, semilla=1, procesos=1, stdout=StringIO())
+        simulacion = SimulacionPerdidas.objects.get()
+        self.assertEqual((simulacion.prestamos, simulacion.exposicion_total), (3, 25000))
+        self.assertLessEqual(simulacion.resultados['var']['0.95'], simulacion.resultados['es']['0.95'])
+
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+        respuesta = self.client.get(reverse('creditos:simulacion_perdidas'))
+        self.assertContains(respuesta, simulacion.semilla)
+
+
+class EstresCarteraTests(TestCase):
+    def test_coincide_con_puede_aprobar_fila_a_fila(self):
+        cliente = crear_cliente()
+        for ingresos, tipo in ((3200, 'PER'), (3300, 'HIP'), (3400, 'PER'), (9000, 'AUT'), (1000, 'EDU')):
+            crear_analisis(cliente, ingresos_mensuales=ingresos, tipo_credito=tipo, puntaje_credito=700)
+        escenario = parsear_escenario('tasa=300,ingresos=-10')
+        resultado, = estresar_cartera([escenario], tamano_bloque=2)
+
+        pierden = {}
+        for analisis in AnalisisCredito.objects.all():
+            base = analisis.puede_aprobar()
+            analisis.tasa_interes += 3
+            analisis.ingresos_mensuales = analisis.ingresos_mensuales * Decimal('0.9')
+            if base and not analisis.puede_aprobar():
+                pierden.setdefault(analisis.tipo_credito, []).append(analisis.monto_solicitado)
+
+        self.assertEqual(resultado['prestamos'], 5)
+        self.assertGreater(resultado['pierden'], 0)
+        self.assertEqual(resultado['pierden'], sum(map(len, pierden.values())))
+        self.assertEqual(
+            {tipo: datos['pierden'] for tipo, datos in resultado['por_tipo'].items() if datos['pierden']},
+            {tipo: len(montos) for tipo, montos in pierden.items()}
+        )
+
+    def test_escenario_invalido(self):
+        with self.assertRaises(ValueError):
+            parsear_escenario('tasa:300')
+
+
+class BenchmarksTests(TestCase):
+    def test_compara_con_la_linea_base(self):
+        actual = benchmarks.ejecutar(['cuota_mensual_estimada', 'nivel_riesgo'], muestras=5,
+                                     repeticiones=1, tiempo_minimo=0.001)
+        self.assertEqual(set(actual['resultados']), {'cuota_mensual_estimada', 'nivel_riesgo'})
+        self.assertGreater(actual['resultados']['nivel_riesgo']['ns_por_operacion'], 0)
+
+        base = json.loads(json.dumps(actual))
+        base['resultados']['nivel_riesgo']['ns_por_operacion'] /= 2
+        base['resultados']['retirado'] = {'ns_por_operacion': 1.0}
+        estados = {fila['nombre']: fila['estado'] for fila in benchmarks.comparar(base, actual, umbral=10)}
+        self.assertEqual(estados, {'cuota_mensual_estimada': 'igual', 'nivel_riesgo': 'regresion', 'retirado': 'ausente'})
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta_base, ruta_actual = Path(directorio) / 'base.json', Path(directorio) / 'actual.json'
+            benchmarks.guardar(base, ruta_base)
+            benchmarks.guardar(actual, ruta_actual)
+            with self.assertRaisesMessage(CommandError, 'nivel_riesgo'):
+                call_command('compare_benchmarks', ruta_base, ruta_actual, stdout=StringIO())
+            call_command('compare_benchmarks', ruta_base, ruta_actual, umbral=200, stdout=StringIO())
+
+
+class DatosSinteticosTests(TestCase):
+    def _datos(self):
+        return list(
+            AnalisisCredito.objects.order_by('cliente__numero_identificacion', 'monto_solicitado')
+            .values_list('cliente__numero_identificacion', 'tipo_credito', 'estado', 'monto_solicitado',
+                         'plazo_meses', 'tasa_interes', 'puntaje_credito')
+        )
+
+    def test_genera_datos_reproducibles_y_coherentes(self):
+        totales = generar(30, 120, semilla=7, tamano_bloque=8)
+        self.assertEqual((totales['clientes'], totales['analisis']), (30, 120))
+        self.assertEqual(Cliente.objects.count(), 30)
+        self.assertTrue(Cliente._meta.get_field('fecha_registro').auto_now_add)
+
+        # Métricas persistidas, resúmenes y resumen de cartera al día
+        for analisis in AnalisisCredito.objects.all()[:20]:
+            self.assertEqual(analisis.es_aprobable, analisis.puede_aprobar())
+        self.assertEqual(ResumenCartera.objects.aggregate(total=Sum('cantidad'))['total'], 120)
+        self.assertEqual(
+            ResumenCreditoCliente.objects.aggregate(total=Sum('total_analisis'))['total'], 120
+        )
+        self.assertGreater(len({a.fecha_analisis.date() for a in AnalisisCredito.objects.all()}), 1)
+
+        datos = self._datos()
+        Cliente.objects.all().delete()
+        generar(30, 120, semilla=7, tamano_bloque=8)
+        self.assertEqual(self._datos(), datos)
+
+
+class AlmacenamientoPorContenidoTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.media = Path(directorio.name)
+        self.cliente = crear_cliente()
+        self.analisis = crear_analisis(self.cliente)
+
+    def subir(self, modelo, contenido, nombre='dni.PDF', **kwargs):
+        return modelo.objects.create(archivo=SimpleUploadedFile(nombre, contenido), **kwargs)
+
+    def test_deduplicacion_referencias_y_recoleccion(self):
+        del_cliente = self.subir(DocumentoCliente, b'escaneo del DNI', cliente=self.cliente, tipo_documento='dni_frente')
+        del_analisis = self.subir(DocumentoAnalisis, b'escaneo del DNI', 'dni.pdf', analisis=self.analisis)
+        otro = self.subir(DocumentoAnalisis, b'recibo de sueldo', 'recibo.pdf', analisis=self.analisis)
+
+        self.assertEqual(del_cliente.archivo.name, del_analisis.archivo.name)
+        self.assertTrue(del_cliente.archivo.name.endswith('.pdf'))
+        blob = BlobDocumento.objects.get(nombre=del_cliente.archivo.name)
+        self.assertEqual((blob.referencias, blob.tamano), (2, len(b'escaneo del DNI')))
+        self.assertEqual(len(list((self.media / 'blobs').glob('*/*/*'))), 2)
+        self.assertEqual(del_analisis.archivo.read(), b'escaneo del DNI')
+
+        # Cambiar el archivo mueve la referencia al blob nuevo
+        otro = DocumentoAnalisis.objects.get(pk=otro.pk)
+        otro.archivo = SimpleUploadedFile('dni.pdf', b'escaneo del DNI')
+        otro.save()
+        self.assertEqual(BlobDocumento.objects.get(pk=blob.pk).referencias, 3)
+        huerfano = BlobDocumento.objects.exclude(pk=blob.pk).get()
+        self.assertEqual(huerfano.referencias, 0)
+
+        del_cliente.delete()
+        DocumentoAnalisis.objects.filter(pk=del_analisis.pk).delete()
+        # Descuadre que no pasa por señales: lo corrige el recuento
+        BlobDocumento.objects.filter(pk=blob.pk).update(referencias=7)
+
+        salida = StringIO()
+        call_command('gc_document_blobs', '--margen-horas', '1', stdout=salida)
+        self.assertIn('Borrados 0 blobs', salida.getvalue())
+        self.assertEqual(BlobDocumento.objects.get(pk=blob.pk).referencias, 1)
+
+        call_command('gc_document_blobs', '--margen-horas', '0', stdout=salida)
+        self.assertEqual(list(BlobDocumento.objects.values_list('pk', flat=True)), [blob.pk])
+        self.assertFalse((self.media / huerfano.nombre).exists())
+        self.assertTrue((self.media / blob.nombre).exists())
+
+
+class SubidasFragmentadasTests(TestCase):
+    CONTENIDO = b'extracto bancario escaneado'  # 27 bytes: fragmentos de 10, 10 y 7
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(
+            MEDIA_ROOT=directorio.name, SUBIDAS_DIR=str(Path(directorio.name) / 'subidas'), SUBIDAS_TAMANO_FRAGMENTO=10
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.usuario = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(self.usuario)
+        self.cliente = crear_cliente()
+        self.analisis = crear_analisis(self.cliente)
+
+    def iniciar(self, **datos):
+        datos = dict({'tipo_documento': 'ING', 'nombre_archivo': 'extracto.pdf', 'tamano': len(self.CONTENIDO)}, **datos)
+        return self.client.post(reverse('creditos:api_iniciar_subida'), json.dumps(datos), content_type='application/json')
+
+    def fragmento(self, subida, numero, cuerpo=None, checksum=None):
+        if cuerpo is None:
+            cuerpo = self.CONTENIDO[numero * 10:(numero + 1) * 10]
+        cabeceras = {'X-Checksum-SHA256': checksum or hashlib.sha256(cuerpo).hexdigest()}
+        return self.client.put(
+            reverse('creditos:api_subir_fragmento', args=[subida['id'], numero]), cuerpo,
+            content_type='application/octet-stream', headers=cabeceras,
+        )
+
+    def finalizar(self, subida, sha256):
+        return self.client.post(
+            reverse('creditos:api_finalizar_subida', args=[subida['id']]),
+            json.dumps({'sha256': sha256}), content_type='application/json',
+        )
+
+    def suma(self):
+        partes = [self.CONTENIDO[inicio:inicio + 10] for inicio in range(0, len(self.CONTENIDO), 10)]
+        return hashlib.sha256(b''.join(hashlib.sha256(parte).digest() for parte in partes)).hexdigest()
+
+    def test_subida_reanudable_de_documento_de_analisis(self):
+        respuesta = self.iniciar(analisis=self.analisis.pk)
+        self.assertEqual(respuesta.status_code, 201)
+        subida = respuesta.json()['subida']
+        self.assertEqual((subida['total_fragmentos'], subida['fragmentos_recibidos']), (3, 0))
+
+        self.assertEqual(self.fragmento(subida, 1).status_code, 409)
+        self.assertEqual(self.fragmento(subida, 0, checksum='0' * 64).status_code, 400)
+        self.assertEqual(self.fragmento(subida, 0, cuerpo=b'corto').status_code, 400)
+        self.assertTrue(self.fragmento(subida, 0).json()['escrito'])
+        # Un reintento de un fragmento ya recibido no escribe nada
+        self.assertFalse(self.fragmento(subida, 0).json()['escrito'])
+        self.assertEqual(self.finalizar(subida, self.suma()).status_code, 409)
+        self.fragmento(subida, 1)
+        self.fragmento(subida, 2)
+        estado = self.client.get(subida['url']).json()['subida']
+        self.assertEqual(estado['fragmentos_recibidos'], 3)
+
+        respuesta = self.finalizar(subida, self.suma())
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['redirect'], reverse('creditos:analisis_detalle', args=[self.analisis.pk]))
+        documento = DocumentoAnalisis.objects.get(analisis=self.analisis)
+        self.assertEqual((documento.tipo_documento, documento.archivo.read()), ('ING', self.CONTENIDO))
+        self.assertEqual(BlobDocumento.objects.get(nombre=documento.archivo.name).referencias, 1)
+        self.assertFalse(SubidaFragmentada.objects.exists())
+        self.assertEqual(list(Path(settings.SUBIDAS_DIR).iterdir()), [])
+
+    def test_finalizar_una_sola_vez(self):
+        subida = self.iniciar(analisis=self.analisis.pk).json()['subida']
+        for numero in range(3):
+            self.fragmento(subida, numero)
+        # Otra petición de finalizar la está procesando
+        SubidaFragmentada.objects.update(estado=SubidaFragmentada.EstadoSubida.FINALIZANDO)
+        self.assertEqual(self.finalizar(subida, self.suma()).status_code, 409)
+        self.assertFalse(DocumentoAnalisis.objects.exists())
+
+        SubidaFragmentada.objects.update(estado=SubidaFragmentada.EstadoSubida.ABIERTA)
+        pendiente = SubidaFragmentada.objects.get()
+        self.assertEqual(self.finalizar(subida, self.suma()).status_code, 201)
+        # Una segunda petición que leyó la subida antes de que se eliminara
+        with self.assertRaises(subidas.ErrorSubida) as error:
+            subidas.finalizar(pendiente, self.suma())
+        self.assertEqual(error.exception.estado, 409)
+        self.assertEqual(DocumentoAnalisis.objects.count(), 1)
+
+    def test_cancelar_durante_la_finalizacion(self):
+        subida = self.iniciar(analisis=self.analisis.pk).json()['subida']
+        for numero in range(3):
+            self.fragmento(subida, numero)
+        cancelaciones = []
+        suma_fragmentos = subidas.suma_fragmentos
+
+        def suma_con_cancelacion(*args):
+            # El DELETE llega mientras se comprueba el archivo
+            cancelaciones.append(self.client.delete(subida['url']))
+            return suma_fragmentos(*args)
+
+        with mock.patch.object(subidas, 'suma_fragmentos', suma_con_cancelacion):
+            respuesta = self.finalizar(subida, self.suma())
+        self.assertEqual(cancelaciones[0].status_code, 409)
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(DocumentoAnalisis.objects.get().archivo.read(), self.CONTENIDO)
+        self.assertFalse(SubidaFragmentada.objects.exists())
+
+    def test_validacion_propietario_y_caducidad(self):
+        self.assertEqual(self.iniciar(analisis=self.analisis.pk, cliente=self.cliente.pk).status_code, 400)
+        self.assertEqual(self.iniciar(analisis=self.analisis.pk, nombre_archivo='macro.exe').status_code, 400)
+        self.assertEqual(self.iniciar(cliente=self.cliente.pk).status_code, 400)  # 'ING' no es un tipo de cliente
+
+        subida = self.iniciar(cliente=self.cliente.pk, tipo_documento='recibo_sueldo').json()['subida']
+        for numero in range(3):
+            self.fragmento(subida, numero)
+        # Suma incorrecta: la subida se descarta
+        self.assertEqual(self.finalizar(subida, '0' * 64).status_code, 400)
+        self.assertFalse(SubidaFragmentada.objects.exists())
+
+        subida = self.iniciar(cliente=self.cliente.pk, tipo_documento='recibo_sueldo').json()['subida']
+        otro = get_user_model().objects.create_user('otro', password='clave-segura-123')
+        self.client.force_login(otro)
+        self.assertEqual(self.client.get(subida['url']).status_code, 404)
+        self.client.force_login(self.usuario)
+
+        SubidaFragmentada.objects.update(actualizado=timezone.now() - timedelta(days=2))
+        call_command('gc_document_blobs', stdout=StringIO())
+        self.assertFalse(SubidaFragmentada.objects.exists())
+        self.assertEqual(self.client.get(subida['url']).status_code, 404)
@@ -8,6 +8,15 @@ urlpatterns = [
     # Lista de análisis de crédito
     path('', views.AnalisisCreditoListView.as_view(), name='analisis_lista'),
     
+    # Panel de cartera
+    path('panel/', views.PanelCarteraView.as_view(), name='panel_cartera'),
+    
+    # Resultado de la última simulación de pérdidas
+    path('simulacion/', views.SimulacionPerdidasView.as_view(), name='simulacion_perdidas'),
+    
+    # Exportación de la lista de análisis (CSV o JSONL)
+    path('exportar/', views.exportar_analisis, name='analisis_exportar'),
+    
     # Detalle de análisis de crédito
     path('<int:pk>/', views.AnalisisCreditoDetailView.as_view(), name='analisis_detalle'),
     
@@ -34,7 +43,18 @@ urlpatterns = [
     path('api/calcular-puntaje/', api_views.calcular_puntaje_credito, name='api_calcular_puntaje'),
     
     # API v2 - Mejorada y con más funcionalidades
+    path('api/v2/clientes/', api_views.listar_clientes, name='api_listar_clientes'),
+    path('api/v2/analisis/', api_views.listar_analisis, name='api_listar_analisis'),
     path('api/v2/clientes/buscar/', api_views.buscar_clientes, name='api_buscar_clientes'),
     path('api/v2/calcular-puntaje/', api_views.calcular_puntaje_credito, name='api_v2_calcular_puntaje'),
+    path('api/v2/calcular-puntaje/lote/', api_views.calcular_puntaje_credito_lote, name='api_v2_calcular_puntaje_lote'),
     path('api/v2/clientes/<int:cliente_id>/', api_views.obtener_datos_cliente, name='api_obtener_cliente'),
+    path('api/v2/amortizacion/', api_views.tabla_amortizacion, name='api_tabla_amortizacion'),
+
+    # Subidas de documentos por fragmentos, reanudables
+    path('api/v2/subidas/', api_views.iniciar_subida, name='api_iniciar_subida'),
+    path('api/v2/subidas/<uuid:subida_id>/', api_views.estado_subida, name='api_subida'),
+    path('api/v2/subidas/<uuid:subida_id>/fragmentos/<int:numero>/', api_views.subir_fragmento,
+         name='api_subir_fragmento'),
+    path('api/v2/subidas/<uuid:subida_id>/finalizar/', api_views.finalizar_subida, name='api_finalizar_subida'),
 ]
@@ -1,20 +1,92 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views.generic import (
-    ListView, DetailView, CreateView, UpdateView, DeleteView
+    ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 )
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db.models import Q
+from django.utils import timezone
+from django.views.decorators.http import require_GET
 
+from clientes import busqueda
+from gestion_riesgo.paginacion import KeysetPaginationMixin
 from clientes.models import Cliente
-from .models import AnalisisCredito, DocumentoAnalisis
-from .forms import AnalisisCreditoForm, DocumentoAnalisisForm
+from . import cartera, exportacion
+from .models import AnalisisCredito, DocumentoAnalisis, SimulacionPerdidas
+from .forms import TAMANO_MAXIMO_FORMULARIO, AnalisisCreditoForm, DocumentoAnalisisForm
 
 
-class AnalisisCreditoListView(LoginRequiredMixin, ListView):
+# Ordenamientos permitidos en la lista de análisis (parámetro GET "orden")
+ORDENAMIENTOS_ANALISIS = {
+    'fecha': ('fecha_analisis', 'pk'),
+    '-fecha': ('-fecha_analisis', '-pk'),
+    'cuota': ('cuota_mensual_estimada', 'pk'),
+    '-cuota': ('-cuota_mensual_estimada', '-pk'),
+    'capacidad': ('capacidad_pago', 'pk'),
+    '-capacidad': ('-capacidad_pago', '-pk'),
+    'monto': ('monto_solicitado', 'pk'),
+    '-monto': ('-monto_solicitado', '-pk'),
+    'puntaje': ('puntaje_credito', 'pk'),
+    '-puntaje': ('-puntaje_credito', '-pk'),
+}
+ORDEN_ANALISIS_DEFECTO = ('-fecha_analisis', '-pk')
+# El puntaje admite NULL, por lo que ese orden se pagina por número de página
+ORDENAMIENTOS_KEYSET = {
+    orden: campos for orden, campos in ORDENAMIENTOS_ANALISIS.items()
+    if orden not in ('puntaje', '-puntaje')
+}
+
+
+def orden_keyset_analisis(params):
+    """Ordenación para paginar por cursor según el parámetro "orden", o None si no es posible"""
+    orden = params.get('orden', '')
+    if orden in ORDENAMIENTOS_ANALISIS:
+        return ORDENAMIENTOS_KEYSET.get(orden)
+    return ORDEN_ANALISIS_DEFECTO
+
+
+def filtrar_analisis(queryset, params):
+    """
+    Aplica los filtros de la lista de análisis a partir de un diccionario de
+    parámetros GET: q, estado, tipo, nivel, aprobable y orden. Todos los
+    filtros usan columnas persistidas, de modo que se resuelven en la base de datos.
+    """
+    # Filtro por búsqueda
+    search = params.get('q', '')
+    if search:
+        queryset = queryset.filter(
+            busqueda.q_clientes(search, campo='cliente_id', prefijo='cliente__') |
+            Q(estado__icontains=search)
+        )
+    
+    estado = params.get('estado', '')
+    if estado in AnalisisCredito.EstadoAnalisis.values:
+        queryset = queryset.filter(estado=estado)
+    
+    tipo = params.get('tipo', '')
+    if tipo in AnalisisCredito.TipoCredito.values:
+        queryset = queryset.filter(tipo_credito=tipo)
+    
+    nivel = params.get('nivel', '')
+    if nivel in AnalisisCredito.NivelRiesgo.values:
+        queryset = queryset.filter(banda_riesgo=nivel)
+    
+    aprobable = params.get('aprobable', '')
+    if aprobable in ('1', '0'):
+        queryset = queryset.filter(es_aprobable=aprobable == '1')
+    
+    orden = params.get('orden', '')
+    if orden in ORDENAMIENTOS_ANALISIS:
+        queryset = queryset.order_by(*ORDENAMIENTOS_ANALISIS[orden])
+    return queryset
+
+
+class AnalisisCreditoListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """Vista para listar todos los análisis de crédito"""
     model = AnalisisCredito
     template_name = 'creditos/analisis_list.html'
@@ -23,33 +95,109 @@ class AnalisisCreditoListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         queryset = super().get_queryset().select_related('cliente')
-        # Filtro por búsqueda
-        search = self.request.GET.get('q', '')
-        if search:
-            queryset = queryset.filter(
-                Q(cliente__nombres__icontains=search) |
-                Q(cliente__apellidos__icontains=search) |
-                Q(cliente__numero_identificacion__icontains=search) |
-                Q(estado__icontains=search)
-            )
-        return queryset
+        return filtrar_analisis(queryset, self.request.GET)
+    
+    def get_keyset_ordering(self):
+        return orden_keyset_analisis(self.request.GET)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = _('Análisis de Crédito')
         context['search'] = self.request.GET.get('q', '')
+        context['filtros'] = {
+            campo: self.request.GET.get(campo, '')
+            for campo in ('estado', 'tipo', 'nivel', 'aprobable', 'orden')
+        }
+        context['estados'] = AnalisisCredito.EstadoAnalisis.choices
+        context['tipos_credito'] = AnalisisCredito.TipoCredito.choices
+        context['niveles_riesgo'] = AnalisisCredito.NivelRiesgo.choices
+        return context
+
+
+class PanelCarteraView(LoginRequiredMixin, TemplateView):
+    """Panel de la cartera: distribuciones y montos leídos del resumen de cartera"""
+    template_name = 'creditos/panel_cartera.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = _('Panel de Cartera')
+        context.update(cartera.datos_panel())
         return context
 
 
+class SimulacionPerdidasView(LoginRequiredMixin, TemplateView):
+    """
+    Resultado de la última simulación de pérdidas guardada por el comando
+    simulate_losses: la vista nunca simula, solo lee el resultado guardado.
+    """
+    template_name = 'creditos/simulacion_perdidas.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = _('Simulación de Pérdidas')
+        simulacion = SimulacionPerdidas.objects.first()
+        context['simulacion'] = simulacion
+        if simulacion:
+            resultados = simulacion.resultados
+            context['niveles'] = [
+                {'nivel': float(nivel) * 100, 'var': valor, 'es': resultados['es'][nivel]}
+                for nivel, valor in resultados['var'].items()
+            ]
+            conteos = resultados['histograma']['conteos']
+            bordes = resultados['histograma']['bordes']
+            maximo = max(conteos, default=0) or 1
+            context['histograma'] = [
+                {'desde': bordes[i], 'hasta': bordes[i + 1], 'conteo': conteo, 'porcentaje': 100 * conteo / maximo}
+                for i, conteo in enumerate(conteos)
+            ]
+        return context
+
+
+@login_required
+@require_GET
+def exportar_analisis(request):
+    """
+    Exporta en streaming los análisis de la lista, con sus mismos filtros.
+    Parámetros GET adicionales: formato (csv o jsonl) y columnas (separadas por comas).
+    """
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportacion.FORMATOS:
+        return JsonResponse({'success': False, 'error': _('Formato no soportado')}, status=400)
+    try:
+        columnas = exportacion.parsear_columnas(request.GET.get('columnas', ''))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    queryset = filtrar_analisis(AnalisisCredito.objects.all(), request.GET)
+    respuesta = StreamingHttpResponse(
+        exportacion.exportar(queryset, columnas, formato),
+        content_type='text/csv; charset=utf-8' if formato == 'csv' else 'application/x-ndjson; charset=utf-8',
+    )
+    respuesta['Content-Disposition'] = 'attachment; filename="cartera-%s.%s"' % (
+        timezone.localdate().strftime('%Y%m%d'), formato
+    )
+    return respuesta
+
+
 class AnalisisCreditoDetailView(LoginRequiredMixin, DetailView):
     """Vista para ver los detalles de un análisis de crédito"""
     model = AnalisisCredito
     template_name = 'creditos/analisis_detail.html'
     context_object_name = 'analisis'
     
+    def get_queryset(self):
+        # Cliente, analista y documentos se muestran en la plantilla
+        return (
+            super().get_queryset()
+            .select_related('cliente', 'usuario')
+            .prefetch_related('documentos')
+        )
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = _('Detalle del Análisis de Crédito')
+        if self.object.plazo_meses:
+            context['tabla_amortizacion'] = self.object.get_tabla_amortizacion()
         return context
 
 
@@ -81,9 +229,14 @@ class AnalisisCreditoCreateView(LoginRequiredMixin, CreateView):
         return context
 
 
-class AnalisisCreditoUpdateView(LoginRequiredMixin, UpdateView):
-    """Vista para editar un análisis de crédito existente"""
+class AnalisisConClienteMixin:
+    """Carga el cliente junto al análisis: las plantillas y los mensajes usan __str__, que lo muestra"""
     model = AnalisisCredito
+    queryset = AnalisisCredito.objects.select_related('cliente')
+
+
+class AnalisisCreditoUpdateView(LoginRequiredMixin, AnalisisConClienteMixin, UpdateView):
+    """Vista para editar un análisis de crédito existente"""
     form_class = AnalisisCreditoForm
     template_name = 'creditos/analisis_form.html'
     
@@ -101,9 +254,8 @@ class AnalisisCreditoUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
 
-class AnalisisCreditoDeleteView(LoginRequiredMixin, DeleteView):
+class AnalisisCreditoDeleteView(LoginRequiredMixin, AnalisisConClienteMixin, DeleteView):
     """Vista para eliminar un análisis de crédito"""
-    model = AnalisisCredito
     template_name = 'creditos/analisis_confirm_delete.html'
     success_url = reverse_lazy('creditos:analisis_lista')
     
@@ -163,12 +315,21 @@ class DocumentoAnalisisCreateView(LoginRequiredMixin, CreateView):
         analisis_id = self.kwargs.get('analisis_id')
         context['analisis'] = get_object_or_404(AnalisisCredito, pk=analisis_id)
         context['title'] = _('Subir Documento')
+        # Los archivos mayores que el umbral se suben por fragmentos (ver creditos/subidas.py) si el
+        # navegador lo permite; si no, se envían con el formulario y rige su máximo
+        context['subida_umbral'] = settings.SUBIDAS_UMBRAL
+        context['subida_maximo'] = settings.SUBIDAS_TAMANO_MAXIMO
+        context['subida_maximo_mb'] = settings.SUBIDAS_TAMANO_MAXIMO // (1024 * 1024)
+        context['formulario_maximo'] = TAMANO_MAXIMO_FORMULARIO
+        context['formulario_maximo_mb'] = TAMANO_MAXIMO_FORMULARIO // (1024 * 1024)
         return context
 
 
 class DocumentoAnalisisDeleteView(LoginRequiredMixin, DeleteView):
     """Vista para eliminar un documento adjunto"""
     model = DocumentoAnalisis
+    # __str__ muestra el análisis y su cliente
+    queryset = DocumentoAnalisis.objects.select_related('analisis__cliente')
     template_name = 'creditos/documento_confirm_delete.html'
     
     def get_success_url(self):
@@ -183,9 +344,8 @@ class DocumentoAnalisisDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-class AnalisisCreditoAprobarView(LoginRequiredMixin, UpdateView):
+class AnalisisCreditoAprobarView(LoginRequiredMixin, AnalisisConClienteMixin, UpdateView):
     """Vista para aprobar un análisis de crédito"""
-    model = AnalisisCredito
     fields = []  # No necesitamos campos ya que solo actualizamos el estado
     template_name = 'creditos/analisis_aprobar.html'
     
@@ -203,9 +363,8 @@ class AnalisisCreditoAprobarView(LoginRequiredMixin, UpdateView):
         return reverse_lazy('creditos:analisis_detalle', kwargs={'pk': self.object.pk})
 
 
-class AnalisisCreditoRechazarView(LoginRequiredMixin, UpdateView):
+class AnalisisCreditoRechazarView(LoginRequiredMixin, AnalisisConClienteMixin, UpdateView):
     """Vista para rechazar un análisis de crédito"""
-    model = AnalisisCredito
     fields = ['motivo_rechazo']  # Solo necesitamos el campo de motivo
     template_name = 'creditos/analisis_rechazar.html'
     
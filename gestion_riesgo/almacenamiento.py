@@ -0,0 +1,236 @@
+"""
+Almacenamiento de documentos direccionado por contenido.
+
+AlmacenamientoPorContenido guarda cada archivo una sola vez con su SHA-256
+como nombre (blobs/ab/cd/<sha256>.<ext>). El resumen se calcula mientras el
+archivo se copia por bloques a un temporal del mismo volumen; si el
+contenido ya existía, la copia se descarta y se devuelve el nombre
+existente, así que el mismo DNI escaneado para cada análisis de un cliente
+ocupa disco una sola vez.
+
+Cada blob tiene una fila creditos.BlobDocumento con el número de documentos
+(DocumentoAnalisis y DocumentoCliente) que lo usan, mantenido por
+contar_referencia_blob y descontar_referencia_blob, que cada app conecta a
+las señales de su modelo de documentos. Eliminar un documento nunca borra su archivo: lo hace el comando
+gc_document_blobs, que recuenta las referencias (las operaciones masivas no
+envían señales) y borra los blobs sin referencias que no se han usado en
+DOCUMENTOS_GC_MARGEN_HORAS, margen que protege las subidas cuyo documento
+todavía no se ha guardado.
+
+Los archivos subidos antes de activar este almacenamiento conservan su ruta
+y no tienen fila BlobDocumento: ni se cuentan ni se recolectan.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+
+DIRECTORIO = 'blobs'
+DIRECTORIO_TEMPORAL = 'tmp'
+TAMANO_LOTE = 500
+# Modelos cuyos archivos se cuentan como referencias de los blobs
+MODELOS_DOCUMENTO = ('creditos.DocumentoAnalisis', 'clientes.DocumentoCliente')
+
+
+def almacenamiento_documentos():
+    """Almacenamiento de los archivos de documentos (STORAGES['documentos'])"""
+    return storages['documentos']
+
+
+def nombre_blob(digest, extension=''):
+    return f'{DIRECTORIO}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def _extension(nombre):
+    extension = os.path.splitext(nombre)[1].lower()
+    # Solo extensiones razonables; el resto de blobs se guarda sin extensión
+    return extension if 2 <= len(extension) <= 10 and extension[1:].isalnum() else ''
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+    """FileSystemStorage que guarda cada contenido una sola vez, bajo su SHA-256"""
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo depende del contenido y se decide en _save
+        return name
+
+    def _save(self, name, content):
+        BlobDocumento = apps.get_model('creditos', 'BlobDocumento')
+
+        directorio_temporal = os.path.join(self.location, DIRECTORIO, DIRECTORIO_TEMPORAL)
+        os.makedirs(directorio_temporal, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=directorio_temporal)
+        try:
+            resumen = hashlib.sha256()
+            tamano = 0
+            with os.fdopen(descriptor, 'wb') as archivo:
+                for bloque in content.chunks():
+                    resumen.update(bloque)
+                    archivo.write(bloque)
+                    tamano += len(bloque)
+            digest = resumen.hexdigest()
+
+            blob, creado = BlobDocumento.objects.get_or_create(
+                digest=digest, defaults={'nombre': nombre_blob(digest, _extension(name)), 'tamano': tamano}
+            )
+            if not creado and not BlobDocumento.objects.filter(pk=blob.pk).update(ultimo_uso=timezone.now()):
+                # El recolector acaba de borrarlo (y su archivo): se vuelve a crear
+                blob = BlobDocumento.objects.create(digest=digest, nombre=blob.nombre, tamano=tamano)
+
+            destino = self.path(blob.nombre)
+            if not os.path.exists(destino):
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporal, self.file_permissions_mode)
+                os.replace(temporal, destino)
+        finally:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+        return blob.nombre
+
+    def delete(self, name):
+        # Un blob puede estar compartido por varios documentos: solo lo borra el recolector
+        if not name.startswith(DIRECTORIO + '/'):
+            super().delete(name)
+
+    def borrar_blob(self, name):
+        super().delete(name)
+
+
+def actualizar_referencias(anterior, actual):
+    """
+    Ajusta el recuento de referencias cuando un documento pasa de usar el
+    archivo `anterior` a `actual` (nombres; vacío si no hay archivo)
+    """
+    BlobDocumento = apps.get_model('creditos', 'BlobDocumento')
+
+    if anterior == actual:
+        return
+    if actual:
+        BlobDocumento.objects.filter(nombre=actual).update(referencias=F('referencias') + 1)
+    if anterior:
+        BlobDocumento.objects.filter(nombre=anterior, referencias__gt=0).update(referencias=F('referencias') - 1)
+
+
+def contar_referencia_blob(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Receptor de post_save de los modelos de documentos: suma la referencia al
+    blob del archivo guardado y la resta del anterior si cambió
+    """
+    original = '' if created else getattr(instance, '_archivo_original', None)
+    # Con el archivo diferido al cargar (original None), save() no lo modifica
+    if raw or original is None:
+        return
+    actual = instance.archivo.name or ''
+    actualizar_referencias(original, actual)
+    instance._archivo_original = actual
+
+
+def descontar_referencia_blob(sender, instance, **kwargs):
+    """Receptor de post_delete: resta la referencia del blob; el archivo lo borra gc_document_blobs"""
+    if 'archivo' in instance.__dict__:
+        actualizar_referencias(instance.archivo.name or '', '')
+
+
+def contar_referencias(nombres):
+    """{nombre: documentos que lo usan} para los nombres de archivo dados"""
+    cuentas = dict.fromkeys(nombres, 0)
+    for etiqueta in MODELOS_DOCUMENTO:
+        filas = (
+            apps.get_model(etiqueta).objects.filter(archivo__in=nombres)
+            .order_by().values('archivo').annotate(total=Count('pk')).values_list('archivo', 'total')
+        )
+        for nombre, total in filas:
+            cuentas[nombre] += total
+    return cuentas
+
+
+def recontar(tamano_lote=TAMANO_LOTE):
+    """
+    Recalcula las referencias de todos los blobs a partir de los documentos,
+    por bloques de clave primaria. Devuelve cuántos blobs se corrigieron.
+    """
+    BlobDocumento = apps.get_model('creditos', 'BlobDocumento')
+
+    corregidos = 0
+    ultimo = 0
+    while True:
+        blobs = list(
+            BlobDocumento.objects.filter(pk__gt=ultimo).order_by('pk').only('nombre', 'referencias')[:tamano_lote]
+        )
+        if not blobs:
+            return corregidos
+        ultimo = blobs[-1].pk
+        cuentas = contar_referencias([blob.nombre for blob in blobs])
+        cambiados = []
+        for blob in blobs:
+            if blob.referencias != cuentas[blob.nombre]:
+                blob.referencias = cuentas[blob.nombre]
+                cambiados.append(blob)
+        BlobDocumento.objects.bulk_update(cambiados, ['referencias'])
+        corregidos += len(cambiados)
+
+
+def margen_gc():
+    return timedelta(hours=getattr(settings, 'DOCUMENTOS_GC_MARGEN_HORAS', 24))
+
+
+def recolectar(margen=None, tamano_lote=TAMANO_LOTE, dry_run=False, almacenamiento=None):
+    """
+    Borra los blobs sin referencias que no se han usado en `margen` (por
+    defecto DOCUMENTOS_GC_MARGEN_HORAS), con una transacción por bloque.
+    Devuelve (blobs, bytes) borrados, o que se borrarían con dry_run.
+    """
+    BlobDocumento = apps.get_model('creditos', 'BlobDocumento')
+
+    margen = margen_gc() if margen is None else margen
+    almacenamiento = almacenamiento or almacenamiento_documentos()
+    limite = timezone.now() - margen
+    candidatos = BlobDocumento.objects.filter(referencias=0, ultimo_uso__lt=limite)
+    borrados = liberados = 0
+    ultimo = 0
+    while True:
+        bloque = list(candidatos.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:tamano_lote])
+        if not bloque:
+            break
+        ultimo = bloque[-1]
+        with transaction.atomic():
+            # Bajo bloqueo: una subida del mismo contenido espera a que termine el bloque
+            blobs = list(candidatos.select_for_update().filter(pk__in=bloque))
+            # Comprobación contra los documentos, por si alguno se creó sin señales
+            cuentas = contar_referencias([blob.nombre for blob in blobs])
+            blobs = [blob for blob in blobs if not cuentas[blob.nombre]]
+            if not dry_run:
+                for blob in blobs:
+                    almacenamiento.borrar_blob(blob.nombre)
+                BlobDocumento.objects.filter(pk__in=[blob.pk for blob in blobs]).delete()
+        borrados += len(blobs)
+        liberados += sum(blob.tamano for blob in blobs)
+    if not dry_run:
+        limpiar_temporales(almacenamiento, margen)
+    return borrados, liberados
+
+
+def limpiar_temporales(almacenamiento, margen):
+    """Borra los temporales de subidas interrumpidas más antiguos que `margen`"""
+    directorio = os.path.join(almacenamiento.location, DIRECTORIO, DIRECTORIO_TEMPORAL)
+    limite = time.time() - margen.total_seconds()
+    try:
+        entradas = list(os.scandir(directorio))
+    except FileNotFoundError:
+        return
+    for entrada in entradas:
+        try:
+            if entrada.is_file() and entrada.stat().st_mtime < limite:
+                os.unlink(entrada.path)
+        except FileNotFoundError:
+            continue
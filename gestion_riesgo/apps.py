@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class GestionRiesgoConfig(AppConfig):
+    name = 'gestion_riesgo'
+    verbose_name = 'Gestión de Riesgo'
+
+    def ready(self):
+        from . import checks  # noqa: F401
@@ -0,0 +1,97 @@
+"""
+Caché de páginas cuyo contenido solo cambia con cada despliegue (inicio,
+páginas legales y libro).
+
+Cada respuesta lleva un ETag y un Last-Modified derivados de DEPLOY_VERSION
+y de la fecha de modificación más reciente de las plantillas, de modo que
+las visitas repetidas reciben un 304 sin renderizar nada. Para los usuarios
+anónimos, además, la respuesta completa se guarda en la caché compartida y
+se sirve sin pasar por el motor de plantillas. Las páginas de usuarios
+autenticados muestran su nombre en la barra de navegación, así que nunca se
+guardan en la caché compartida: solo reciben un ETag propio de cada usuario.
+
+Si hay mensajes pendientes (django.contrib.messages) la página se renderiza
+siempre, para que los mensajes se muestren y se consuman.
+"""
+import hashlib
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.template import engines
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import get_language
+
+
+_version_plantillas = None
+
+
+def version_plantillas():
+    """
+    Marca de tiempo de la plantilla modificada más recientemente. Fuera de
+    DEBUG se calcula una vez por proceso, ya que las plantillas solo cambian
+    al desplegar (y el despliegue reinicia los procesos).
+    """
+    global _version_plantillas
+    if _version_plantillas is None or settings.DEBUG:
+        mtime = 0
+        for directorio in engines['django'].template_dirs:
+            for raiz, _dirs, archivos in os.walk(directorio):
+                for archivo in archivos:
+                    mtime = max(mtime, os.path.getmtime(os.path.join(raiz, archivo)))
+        _version_plantillas = int(mtime)
+    return _version_plantillas
+
+
+def calcular_etag(request, ultima_modificacion):
+    partes = [
+        getattr(settings, 'DEPLOY_VERSION', ''),
+        str(ultima_modificacion),
+        get_language() or '',
+        # El pie de página muestra el año actual
+        str(timezone.now().year),
+    ]
+    if request.user.is_authenticated:
+        partes += ['usuario', str(request.user.pk), request.user.get_username()]
+    return hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()
+
+
+def cache_pagina(vista):
+    """Decorador para vistas GET cuyo contenido depende solo de las plantillas y del usuario"""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+            return vista(request, *args, **kwargs)
+
+        ultima_modificacion = version_plantillas()
+        etag = quote_etag(calcular_etag(request, ultima_modificacion))
+        anonimo = not request.user.is_authenticated
+
+        respuesta = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+        if respuesta is None:
+            clave = 'pagina:%s:%s' % (
+                hashlib.sha1(request.get_full_path().encode('utf-8')).hexdigest(), etag.strip('"')
+            )
+            respuesta = cache.get(clave) if anonimo else None
+            if respuesta is None:
+                respuesta = vista(request, *args, **kwargs)
+                if hasattr(respuesta, 'render') and callable(respuesta.render):
+                    respuesta = respuesta.render()
+                # No guardar respuestas que fijan cookies (sesión, CSRF) para otros visitantes
+                if anonimo and respuesta.status_code == 200 and not respuesta.cookies:
+                    cache.set(clave, respuesta, getattr(settings, 'PAGINAS_CACHE_TIMEOUT', 3600))
+            if respuesta.status_code != 200:
+                return respuesta
+
+        respuesta['ETag'] = etag
+        respuesta['Last-Modified'] = http_date(ultima_modificacion)
+        # Los navegadores revalidan con el ETag; la página varía según la sesión
+        patch_cache_control(respuesta, max_age=0, must_revalidate=True, private=not anonimo)
+        patch_vary_headers(respuesta, ('Cookie',))
+        return respuesta
+
+    return envoltura
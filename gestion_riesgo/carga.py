@@ -0,0 +1,281 @@
+"""
+Prueba de carga de extremo a extremo contra un servidor en marcha.
+
+Cada usuario virtual es un hilo con su propia sesión HTTP (urllib con un
+CookieJar, de modo que la sesión y el token CSRF se comportan como en un
+navegador) que inicia sesión y repite la sesión típica de un analista: la
+lista de clientes con y sin búsqueda, el autocompletado de
+api/v2/clientes/buscar/ mientras se escribe, el detalle de un cliente
+encontrado y sus datos por la API, el cálculo de puntaje y el alta de un
+análisis. Cada petición se registra con el nombre de URL de Django, así que
+el informe (peticiones por segundo, errores y percentiles de latencia por
+nombre de URL) se puede cruzar con /metrics y comparar entre ejecuciones.
+
+El alta de análisis escribe en la base de datos: la prueba debe lanzarse
+contra una base de pruebas (ver generate_synthetic) o con escritura=False.
+"""
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+import numpy as np
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+
+VERSION = 1
+CONCURRENCIA = 4
+DURACION = 60
+TIEMPO_ESPERA = 30
+PERCENTILES = (50, 90, 99)
+UMBRAL = 20.0  # % de empeoramiento de p99 o del rendimiento a partir del cual hay regresión
+SEMILLA = 1
+
+# Términos con los que los analistas buscan clientes; coinciden con los datos de generate_synthetic
+TERMINOS = (
+    'García', 'Rodríguez', 'González', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Pérez', 'Gómez',
+    'Torres', 'Ramírez', 'Flores', 'Vargas', 'Castillo', 'Mendoza', 'Quispe', 'Chávez', 'María', 'José',
+)
+TIPOS_CREDITO = ('PER', 'HIP', 'AUT', 'EDU', 'OTR')
+
+_TOKEN_FORMULARIO = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class ErrorInicioSesion(Exception):
+    pass
+
+
+class Registro:
+    """Peticiones registradas por todos los hilos: (nombre de URL, método, estado, segundos, bytes)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.peticiones = []
+
+    def agregar(self, *peticion):
+        with self._lock:
+            self.peticiones.append(peticion)
+
+
+class _SinRedirecciones(HTTPRedirectHandler):
+    """Devuelve las redirecciones como respuesta, para medir cada petición con su propio nombre de URL"""
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class SesionHTTP:
+    """Sesión de un usuario virtual: cookies, token CSRF y registro de cada petición"""
+    def __init__(self, url_base, registro, tiempo_espera=TIEMPO_ESPERA):
+        self.url_base = url_base.rstrip('/') + '/'
+        self.registro = registro
+        self.tiempo_espera = tiempo_espera
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _SinRedirecciones)
+
+    def cookie(self, nombre):
+        for cookie in self.cookies:
+            if cookie.name == nombre:
+                return cookie.value
+        return ''
+
+    def token_csrf(self):
+        return self.cookie(settings.CSRF_COOKIE_NAME)
+
+    def peticion(self, nombre, ruta, metodo='GET', datos=None, json_datos=None, params=None):
+        """
+        Hace una petición y la registra con `nombre`. Devuelve (estado, cuerpo);
+        las redirecciones no se siguen y los errores HTTP no lanzan excepción.
+        """
+        url = urljoin(self.url_base, ruta.lstrip('/'))
+        if params:
+            url += '?' + urlencode(params)
+        cabeceras = {'Referer': self.url_base}
+        cuerpo = None
+        if json_datos is not None:
+            cuerpo = json.dumps(json_datos).encode()
+            cabeceras['Content-Type'] = 'application/json'
+        elif datos is not None:
+            cuerpo = urlencode(datos).encode()
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        if metodo != 'GET':
+            cabeceras['X-CSRFToken'] = self.token_csrf()
+
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(Request(url, cuerpo, cabeceras, method=metodo), timeout=self.tiempo_espera) as respuesta:
+                estado, contenido = respuesta.status, respuesta.read()
+        except HTTPError as e:
+            estado, contenido = e.code, e.read()
+        except (URLError, OSError):
+            # Conexión rechazada o tiempo de espera agotado
+            estado, contenido = 0, b''
+        self.registro.agregar(nombre, metodo, estado, time.perf_counter() - inicio, len(contenido))
+        return estado, contenido
+
+    def iniciar_sesion(self, usuario, password):
+        ruta = reverse('login')
+        _estado, contenido = self.peticion('login', ruta)
+        token = _TOKEN_FORMULARIO.search(contenido.decode(errors='replace'))
+        datos = {
+            'username': usuario, 'password': password,
+            'csrfmiddlewaretoken': token.group(1) if token else self.token_csrf(),
+        }
+        estado, _contenido = self.peticion('login', ruta, 'POST', datos=datos)
+        # Un inicio de sesión fallido vuelve a mostrar el formulario en lugar de redirigir
+        if estado != 302 or not self.cookie(settings.SESSION_COOKIE_NAME):
+            raise ErrorInicioSesion(f'No se pudo iniciar sesión como {usuario} (estado {estado})')
+
+
+def _json(contenido):
+    try:
+        return json.loads(contenido)
+    except ValueError:
+        return {}
+
+
+def sesion_analista(sesion, rng, escritura=True):
+    """Una sesión típica de un analista, de la lista de clientes al alta de un análisis"""
+    lista = reverse('clientes:lista')
+    sesion.peticion('clientes:lista', lista)
+    termino = rng.choice(TERMINOS)
+    sesion.peticion('clientes:lista', lista, params={'q': termino})
+
+    # Autocompletado: una petición por tecla a partir del tercer carácter
+    resultados = []
+    for largo in range(3, len(termino) + 1):
+        estado, contenido = sesion.peticion(
+            'creditos:api_buscar_clientes', reverse('creditos:api_buscar_clientes'), params={'q': termino[:largo]}
+        )
+        if estado == 200:
+            resultados = _json(contenido).get('results') or resultados
+
+    cliente_id = rng.choice(resultados)['id'] if resultados else None
+    if cliente_id:
+        sesion.peticion('clientes:detalle', reverse('clientes:detalle', args=[cliente_id]))
+        sesion.peticion('creditos:api_obtener_cliente', reverse('creditos:api_obtener_cliente', args=[cliente_id]))
+
+    ingresos = round(rng.uniform(1200, 9000), 2)
+    solicitud = {
+        'ingresos_mensuales': ingresos,
+        'gastos_mensuales': round(ingresos * rng.uniform(0.3, 0.8), 2),
+        'deuda_actual': round(rng.uniform(0, 20000), 2),
+        'monto_solicitado': round(rng.uniform(2000, 60000), 2),
+        'plazo_meses': rng.choice((12, 24, 36, 48, 60)),
+        'tasa_interes': round(rng.uniform(6, 25), 2),
+    }
+    sesion.peticion('creditos:api_v2_calcular_puntaje', reverse('creditos:api_v2_calcular_puntaje'),
+                    'POST', json_datos=solicitud)
+
+    if escritura and cliente_id:
+        nuevo = reverse('creditos:analisis_nuevo')
+        sesion.peticion('creditos:analisis_nuevo', nuevo)
+        sesion.peticion('creditos:analisis_nuevo', nuevo, 'POST', datos={
+            **solicitud, 'cliente': cliente_id, 'tipo_credito': rng.choice(TIPOS_CREDITO),
+            'historial_crediticio': '', 'observaciones': 'Prueba de carga',
+        })
+
+
+def _usuario_virtual(indice, url_base, usuario, password, registro, fin, sesiones, semilla, pausa, escritura,
+                     tiempo_espera):
+    rng = random.Random(f'{semilla}-{indice}')
+    sesion = SesionHTTP(url_base, registro, tiempo_espera)
+    sesion.iniciar_sesion(usuario, password)
+    completadas = 0
+    while time.monotonic() < fin and (sesiones is None or completadas < sesiones):
+        sesion_analista(sesion, rng, escritura)
+        completadas += 1
+        if pausa:
+            time.sleep(rng.expovariate(1 / pausa))
+    return completadas
+
+
+def ejecutar_prueba(url_base, usuario, password, concurrencia=CONCURRENCIA, duracion=DURACION, sesiones=None,
+                    semilla=SEMILLA, pausa=0.0, escritura=True, tiempo_espera=TIEMPO_ESPERA):
+    """
+    Lanza `concurrencia` usuarios virtuales durante `duracion` segundos (o
+    hasta completar `sesiones` sesiones cada uno) y devuelve el informe.
+    Lanza ErrorInicioSesion si algún usuario no puede iniciar sesión.
+    """
+    registro = Registro()
+    inicio = time.monotonic()
+    fin = inicio + duracion
+    with ThreadPoolExecutor(concurrencia) as ejecutor:
+        futuros = [
+            ejecutor.submit(_usuario_virtual, i, url_base, usuario, password, registro, fin, sesiones,
+                            semilla, pausa, escritura, tiempo_espera)
+            for i in range(concurrencia)
+        ]
+        completadas = sum(futuro.result() for futuro in futuros)
+    segundos = time.monotonic() - inicio
+    return {
+        'version': VERSION,
+        'fecha': timezone.now().isoformat(),
+        'parametros': {
+            'url': url_base, 'concurrencia': concurrencia, 'duracion': duracion, 'sesiones': sesiones,
+            'semilla': semilla, 'pausa': pausa, 'escritura': escritura,
+        },
+        'segundos': round(segundos, 3),
+        'sesiones_completadas': completadas,
+        'urls': resumir(registro.peticiones, segundos),
+    }
+
+
+def _estadisticas(filas, segundos):
+    latencias = np.array([fila[3] for fila in filas]) * 1000
+    errores = sum(1 for fila in filas if not 200 <= fila[2] < 400)
+    return {
+        'peticiones': len(filas),
+        'errores': errores,
+        'por_segundo': round(len(filas) / segundos, 2) if segundos else 0.0,
+        **{f'p{p}_ms': round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(latencias, PERCENTILES))},
+        'max_ms': round(float(latencias.max()), 2),
+        'bytes': sum(fila[4] for fila in filas),
+        'estados': {str(estado): sum(1 for fila in filas if fila[2] == estado) for estado in sorted({f[2] for f in filas})},
+    }
+
+
+def resumir(peticiones, segundos):
+    """Estadísticas por nombre de URL y del total ('*')"""
+    por_nombre = {}
+    for peticion in peticiones:
+        por_nombre.setdefault(peticion[0], []).append(peticion)
+    urls = {nombre: _estadisticas(filas, segundos) for nombre, filas in sorted(por_nombre.items())}
+    if peticiones:
+        urls['*'] = _estadisticas(peticiones, segundos)
+    return urls
+
+
+def comparar(base, actual, umbral=UMBRAL):
+    """
+    Compara dos informes por nombre de URL. Hay regresión cuando el p99
+    empeora, o el número de peticiones por segundo cae, más de `umbral` %.
+    Devuelve una fila por URL con los cambios y el estado ('regresion',
+    'mejora', 'igual', 'nuevo' o 'ausente').
+    """
+    filas = []
+    for nombre in list(base['urls']) + [n for n in actual['urls'] if n not in base['urls']]:
+        antes, despues = base['urls'].get(nombre), actual['urls'].get(nombre)
+        if antes is None or despues is None:
+            filas.append({'nombre': nombre, 'estado': 'nuevo' if antes is None else 'ausente'})
+            continue
+        cambio_p99 = (despues['p99_ms'] / antes['p99_ms'] - 1) * 100 if antes['p99_ms'] else 0.0
+        cambio_rps = (despues['por_segundo'] / antes['por_segundo'] - 1) * 100 if antes['por_segundo'] else 0.0
+        if cambio_p99 > umbral or cambio_rps < -umbral:
+            estado = 'regresion'
+        elif cambio_p99 < -umbral or cambio_rps > umbral:
+            estado = 'mejora'
+        else:
+            estado = 'igual'
+        filas.append({
+            'nombre': nombre, 'estado': estado,
+            'p99_base': antes['p99_ms'], 'p99_actual': despues['p99_ms'], 'cambio_p99': cambio_p99,
+            'rps_base': antes['por_segundo'], 'rps_actual': despues['por_segundo'], 'cambio_rps': cambio_rps,
+        })
+    return filas
@@ -0,0 +1,49 @@
+"""
+Comprobaciones de despliegue (python manage.py check --deploy).
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.template import engines
+
+
+# Rutas a /static/ escritas a mano (o con STATIC_URL) en lugar de usar {% static %},
+# que no reciben el nombre con hash del manifiesto
+PATRON_ESTATICO_SIN_HASH = re.compile(
+    r'''(?:src|href|url\()\s*=?\s*["']?\s*(?:%s|\{\{\s*STATIC_URL\s*\}\})''' % re.escape(settings.STATIC_URL or '/static/')
+)
+
+
+def referencias_sin_hash(directorios):
+    """Devuelve tuplas (ruta, número de línea, línea) con referencias a estáticos sin hash"""
+    for directorio in directorios:
+        for raiz, _dirs, archivos in os.walk(directorio):
+            for nombre in archivos:
+                if not nombre.endswith(('.html', '.txt', '.xml')):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                with open(ruta, encoding='utf-8', errors='replace') as plantilla:
+                    for numero, linea in enumerate(plantilla, 1):
+                        if PATRON_ESTATICO_SIN_HASH.search(linea):
+                            yield ruta, numero, linea.strip()
+
+
+@register(Tags.templates, deploy=True)
+def comprobar_estaticos_en_plantillas(app_configs, **kwargs):
+    """
+    Con el almacenamiento de manifiesto los estáticos se sirven con un nombre
+    con hash y caché inmutable; una referencia escrita a mano apuntaría al
+    archivo sin hash (sin caché de larga duración).
+    """
+    # Solo las plantillas del proyecto: las de paquetes de terceros no se controlan aquí
+    directorios = [str(directorio) for directorio in engines['django'].dirs]
+    return [
+        Error(
+            f'{ruta}:{numero} referencia un archivo estático sin usar {{% static %}}: {linea}',
+            hint="Use {% load static %} y {% static 'ruta' %} para obtener el nombre con hash.",
+            id='gestion_riesgo.E001',
+        )
+        for ruta, numero, linea in referencias_sin_hash(directorios)
+    ]
@@ -0,0 +1,119 @@
+"""
+Presupuesto de consultas SQL por petición y detección de N+1.
+
+PresupuestoConsultasMiddleware registra las consultas de cada petición con
+connection.execute_wrapper y, al terminar, las agrupa por forma (el SQL sin
+literales ni listas de parámetros). Se registra un aviso con el nombre de la
+vista cuando la petición supera el presupuesto de su URL (QUERY_BUDGETS, por
+nombre de URL con espacio de nombres, p. ej. 'clientes:detalle'), cuando la
+misma consulta se repite con los mismos parámetros o cuando una misma forma
+se repite QUERY_N1_UMBRAL veces o más (el patrón típico de N+1).
+
+Los tests usan el mismo análisis con gestion_riesgo.testing.PresupuestoConsultasMixin,
+de modo que una regresión hace fallar los tests en lugar de llegar a producción.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+N1_UMBRAL = 5
+
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTAS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_sql(sql):
+    """Forma de una consulta: sin literales, con las listas IN colapsadas y los espacios normalizados"""
+    forma = _CADENAS.sub('%s', sql)
+    forma = _NUMEROS.sub('%s', forma)
+    forma = _LISTAS.sub('(...)', forma)
+    return _ESPACIOS.sub(' ', forma).strip()
+
+
+def presupuesto(nombre_vista):
+    """Máximo de consultas permitido para un nombre de URL, o None si no tiene"""
+    presupuestos = getattr(settings, 'QUERY_BUDGETS', {})
+    return presupuestos.get(nombre_vista, getattr(settings, 'QUERY_BUDGET_DEFECTO', None))
+
+
+def analizar(consultas, umbral_n1=None):
+    """
+    Analiza una lista de (sql, parámetros). Devuelve un diccionario con el
+    total, las consultas duplicadas (mismo SQL y parámetros) y las formas
+    repetidas al menos `umbral_n1` veces, ambas como listas de (sql, veces).
+    """
+    if umbral_n1 is None:
+        umbral_n1 = getattr(settings, 'QUERY_N1_UMBRAL', N1_UMBRAL)
+    identicas = Counter((sql, repr(parametros)) for sql, parametros in consultas)
+    formas = Counter(normalizar_sql(sql) for sql, _parametros in consultas)
+    return {
+        'total': len(consultas),
+        'duplicadas': [(sql, veces) for (sql, _parametros), veces in identicas.items() if veces > 1],
+        'repetidas': [(forma, veces) for forma, veces in formas.most_common() if veces >= umbral_n1],
+    }
+
+
+def describir(nombre_vista, analisis, limite):
+    """Texto con los problemas encontrados en las consultas de una vista"""
+    lineas = ['%s: %d consultas (presupuesto %s)' % (nombre_vista, analisis['total'], limite)]
+    lineas += ['  duplicada x%d: %s' % (veces, sql) for sql, veces in analisis['duplicadas']]
+    lineas += ['  repetida x%d (posible N+1): %s' % (veces, forma) for forma, veces in analisis['repetidas']]
+    return '\n'.join(lineas)
+
+
+class RegistroConsultas:
+    """Envoltorio para connection.execute_wrapper que guarda el SQL y los parámetros de cada consulta"""
+    def __init__(self):
+        self.consultas = []
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas.append((sql, params))
+
+
+@contextmanager
+def registrar_consultas():
+    """Registra en un RegistroConsultas las consultas de todas las conexiones dentro del bloque"""
+    registro = RegistroConsultas()
+    with ExitStack() as pila:
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(registro))
+        yield registro
+
+
+class PresupuestoConsultasMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Las TemplateResponse ya están renderizadas cuando get_response devuelve
+        # la respuesta, así que las consultas de las plantillas también cuentan
+        with registrar_consultas() as registro:
+            respuesta = self.get_response(request)
+
+        nombre_vista = request.resolver_match.view_name if request.resolver_match else request.path
+        limite = presupuesto(nombre_vista)
+        analisis = analizar(registro.consultas)
+        if (limite is not None and analisis['total'] > limite) or analisis['duplicadas'] or analisis['repetidas']:
+            logger.warning(describir(nombre_vista, analisis, limite))
+        if settings.DEBUG:
+            respuesta['X-Query-Count'] = str(analisis['total'])
+        return respuesta
@@ -0,0 +1,98 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_riesgo import carga
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga contra un servidor en marcha: usuarios virtuales concurrentes que '
+        'repiten la sesión de un analista (lista y búsqueda de clientes, autocompletado, '
+        'detalle, cálculo de puntaje y alta de análisis). Informa del rendimiento y de los '
+        'percentiles de latencia por nombre de URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='URL base del servidor (por defecto %(default)s)')
+        parser.add_argument('--usuario', required=True, help='Usuario con el que inician sesión los analistas virtuales')
+        parser.add_argument('--password', help='Contraseña (por defecto la variable de entorno LOAD_TEST_PASSWORD)')
+        parser.add_argument('--concurrencia', type=int, default=carga.CONCURRENCIA,
+                            help='Usuarios virtuales simultáneos (por defecto %(default)s)')
+        parser.add_argument('--duracion', type=float, default=carga.DURACION,
+                            help='Segundos de prueba (por defecto %(default)s)')
+        parser.add_argument('--sesiones', type=int,
+                            help='Sesiones por usuario virtual; termina antes si se completan')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Pausa media en segundos entre sesiones (por defecto sin pausa)')
+        parser.add_argument('--semilla', type=int, default=carga.SEMILLA,
+                            help='Semilla de las sesiones (por defecto %(default)s)')
+        parser.add_argument('--sin-escritura', action='store_true', help='No crear análisis')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar el informe')
+        parser.add_argument('--comparar', metavar='BASE', help='Comparar con un informe anterior y fallar si hay regresiones')
+        parser.add_argument('--umbral', type=float, default=carga.UMBRAL,
+                            help='Empeoramiento en %% del p99 o del rendimiento que cuenta como regresión '
+                                 '(por defecto %(default)s)')
+
+    def handle(self, *args, **options):
+        if options['concurrencia'] < 1:
+            raise CommandError('--concurrencia debe ser mayor que cero')
+        if options['duracion'] <= 0:
+            raise CommandError('--duracion debe ser mayor que cero')
+        if options['sesiones'] is not None and options['sesiones'] < 1:
+            raise CommandError('--sesiones debe ser mayor que cero')
+        password = options['password'] or os.getenv('LOAD_TEST_PASSWORD')
+        if not password:
+            raise CommandError('Indique la contraseña con --password o LOAD_TEST_PASSWORD')
+        base = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    base = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+
+        try:
+            informe = carga.ejecutar_prueba(
+                options['url'], options['usuario'], password, options['concurrencia'], options['duracion'],
+                options['sesiones'], options['semilla'], options['pausa'], not options['sin_escritura'],
+            )
+        except carga.ErrorInicioSesion as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"{'URL':<36} {'peticiones':>10} {'errores':>8} {'pet/s':>8} "
+            f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'máx ms':>9}"
+        )
+        for nombre, datos in informe['urls'].items():
+            linea = (
+                f"{nombre:<36} {datos['peticiones']:>10} {datos['errores']:>8} {datos['por_segundo']:>8.1f} "
+                f"{datos['p50_ms']:>9.1f} {datos['p90_ms']:>9.1f} {datos['p99_ms']:>9.1f} {datos['max_ms']:>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(linea) if datos['errores'] else linea)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, ensure_ascii=False, indent=2)
+        total = informe['urls'].get('*', {'peticiones': 0, 'por_segundo': 0})
+        self.stdout.write(self.style.SUCCESS(
+            f"{informe['sesiones_completadas']} sesiones y {total['peticiones']} peticiones en "
+            f"{informe['segundos']:.1f}s ({total['por_segundo']:.1f} pet/s) con {options['concurrencia']} usuarios"
+        ))
+
+        if base is not None:
+            filas = carga.comparar(base, informe, options['umbral'])
+            for fila in filas:
+                if 'cambio_p99' not in fila:
+                    self.stdout.write(f"{fila['nombre']:<36} {fila['estado']}")
+                    continue
+                linea = (
+                    f"{fila['nombre']:<36} p99 {fila['p99_base']:.1f} -> {fila['p99_actual']:.1f} ms "
+                    f"({fila['cambio_p99']:+.1f}%), pet/s {fila['rps_base']:.1f} -> {fila['rps_actual']:.1f} "
+                    f"({fila['cambio_rps']:+.1f}%)"
+                )
+                self.stdout.write(self.style.ERROR(linea) if fila['estado'] == 'regresion' else linea)
+            regresiones = [fila['nombre'] for fila in filas if fila['estado'] == 'regresion']
+            if regresiones:
+                raise CommandError(f"Regresiones por encima del {options['umbral']:g}%: " + ', '.join(regresiones))
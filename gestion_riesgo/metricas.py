@@ -0,0 +1,280 @@
+"""
+Métricas por vista en formato de texto de Prometheus.
+
+MetricasMiddleware registra, por nombre de URL resuelto (p. ej.
+'clientes:lista'), el número de peticiones por método y código de estado,
+un histograma de latencia, las consultas SQL y su tiempo, y el tamaño de las
+respuestas. Cada proceso acumula sus métricas en memoria y las vuelca cada
+METRICS_FLUSH_INTERVAL segundos a su propio archivo JSON en METRICS_DIR
+(escritura atómica con rename); el endpoint /metrics suma los archivos de
+todos los procesos, de modo que las cifras agregan todos los workers de
+gunicorn. Los archivos de workers que ya terminaron se conservan para que
+los contadores no retrocedan; METRICS_DIR debe vaciarse al desplegar.
+
+Con cada volcado se guardan también los contadores del buffer de
+consentimientos del proceso (creditos/consent_buffer.py), que /metrics expone
+sumados como consent_buffer_*.
+
+Todo está desactivado mientras METRICS_TOKEN esté vacío.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+# Límites superiores (en segundos) de los intervalos del histograma de latencia
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIN_RESOLVER = '<sin_resolver>'
+# Los demás métodos se agrupan para no crear series arbitrarias
+METODOS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+PREFIJO_ARCHIVO = 'metricas-'
+# Contadores acumulados del buffer de consentimientos; 'pendientes' es un valor instantáneo
+CONTADORES_CONSENTIMIENTOS = ('encolados', 'escritos', 'desbordes', 'fallidos')
+
+
+def habilitado():
+    return bool(getattr(settings, 'METRICS_TOKEN', ''))
+
+
+def _vista_vacia():
+    return {
+        'peticiones': {},
+        'intervalos': [0] * len(LIMITES_LATENCIA),
+        'segundos': 0.0,
+        'cuenta': 0,
+        'consultas': 0,
+        'segundos_bd': 0.0,
+        'bytes': 0,
+    }
+
+
+def combinar(destino, origen):
+    """Suma las métricas de `origen` ({vista: métricas}) en `destino`"""
+    for vista, datos in origen.items():
+        acumulado = destino.setdefault(vista, _vista_vacia())
+        for clave, valor in datos['peticiones'].items():
+            acumulado['peticiones'][clave] = acumulado['peticiones'].get(clave, 0) + valor
+        acumulado['intervalos'] = [a + b for a, b in zip(acumulado['intervalos'], datos['intervalos'])]
+        for campo in ('segundos', 'cuenta', 'consultas', 'segundos_bd', 'bytes'):
+            acumulado[campo] += datos[campo]
+    return destino
+
+
+def _estadisticas_consentimientos():
+    from creditos import consent_buffer
+
+    return consent_buffer.estadisticas()
+
+
+class Colector:
+    """Métricas del proceso actual y su volcado a METRICS_DIR/metricas-<pid>.json"""
+    def __init__(self, directorio, intervalo=5.0):
+        self.directorio = Path(directorio)
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pid = None
+        self._vistas = {}
+        # Contadores del buffer de consentimientos que dejó un proceso anterior con el mismo pid
+        self._consentimientos_previos = {}
+        self._ultimo_volcado = 0.0
+
+    @property
+    def archivo(self):
+        return self.directorio / f'{PREFIJO_ARCHIVO}{os.getpid()}.json'
+
+    def _asegurar_proceso(self):
+        # Tras un fork (gunicorn con --preload) el hijo empieza de cero. Si el pid
+        # se reutiliza, se parte de lo que dejó el proceso anterior con ese pid.
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._vistas = {}
+        self._consentimientos_previos = {}
+        try:
+            datos = json.loads(self.archivo.read_text())
+        except (OSError, ValueError):
+            return
+        self._vistas = datos['vistas']
+        self._consentimientos_previos = {
+            campo: valor for campo, valor in (datos['consentimientos'] or {}).items()
+            if campo in CONTADORES_CONSENTIMIENTOS
+        }
+
+    def registrar(self, vista, metodo, estado, segundos, consultas, segundos_bd, tamano):
+        with self._lock:
+            self._asegurar_proceso()
+            datos = self._vistas.setdefault(vista, _vista_vacia())
+            clave = f'{metodo} {estado}'
+            datos['peticiones'][clave] = datos['peticiones'].get(clave, 0) + 1
+            intervalo = bisect.bisect_left(LIMITES_LATENCIA, segundos)
+            if intervalo < len(LIMITES_LATENCIA):
+                datos['intervalos'][intervalo] += 1
+            datos['segundos'] += segundos
+            datos['cuenta'] += 1
+            datos['consultas'] += consultas
+            datos['segundos_bd'] += segundos_bd
+            if tamano is not None:
+                datos['bytes'] += tamano
+            if time.monotonic() - self._ultimo_volcado >= self.intervalo:
+                self._volcar()
+
+    def volcar(self):
+        with self._lock:
+            self._asegurar_proceso()
+            self._volcar()
+
+    def _volcar(self):
+        self._ultimo_volcado = time.monotonic()
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        temporal = self.archivo.with_suffix('.tmp')
+        temporal.write_text(json.dumps({'vistas': self._vistas, 'consentimientos': self._consentimientos()}))
+        temporal.replace(self.archivo)
+
+    def _consentimientos(self):
+        actuales = _estadisticas_consentimientos()
+        if actuales is None:
+            return self._consentimientos_previos or None
+        for campo, valor in self._consentimientos_previos.items():
+            actuales[campo] += valor
+        return actuales
+
+    def agregado(self):
+        """
+        Métricas de todos los procesos, tras volcar las del actual:
+        {'vistas': {vista: métricas}, 'consentimientos': contadores o None}
+        """
+        self.volcar()
+        vistas, consentimientos = {}, None
+        for archivo in sorted(self.directorio.glob(f'{PREFIJO_ARCHIVO}*.json')):
+            try:
+                datos = json.loads(archivo.read_text())
+            except (OSError, ValueError):
+                # Archivo borrado o reemplazado mientras se leía
+                continue
+            combinar(vistas, datos['vistas'])
+            if datos['consentimientos']:
+                consentimientos = consentimientos or dict.fromkeys(datos['consentimientos'], 0)
+                for campo, valor in datos['consentimientos'].items():
+                    consentimientos[campo] = consentimientos.get(campo, 0) + valor
+        return {'vistas': vistas, 'consentimientos': consentimientos}
+
+
+_colector = None
+_colector_lock = threading.Lock()
+
+
+def obtener_colector():
+    global _colector
+    if _colector is None:
+        with _colector_lock:
+            if _colector is None:
+                _colector = Colector(
+                    getattr(settings, 'METRICS_DIR'), getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0)
+                )
+                atexit.register(_colector.volcar)
+    return _colector
+
+
+def _etiquetas(**valores):
+    return ','.join(
+        '%s="%s"' % (nombre, str(valor).replace('\\', '\\\\').replace('"', '\\"'))
+        for nombre, valor in valores.items()
+    )
+
+
+def exponer(metricas):
+    """Texto en el formato de exposición de Prometheus (versión 0.0.4) de lo que devuelve agregado()"""
+    vistas = metricas['vistas']
+    lineas = [
+        '# HELP django_http_requests_total Peticiones por vista, método y código de estado.',
+        '# TYPE django_http_requests_total counter',
+    ]
+    for vista, datos in sorted(vistas.items()):
+        for clave, valor in sorted(datos['peticiones'].items()):
+            metodo, estado = clave.split(' ', 1)
+            lineas.append('django_http_requests_total{%s} %d' % (_etiquetas(view=vista, method=metodo, status=estado), valor))
+
+    lineas += [
+        '# HELP django_http_request_duration_seconds Latencia de las peticiones por vista.',
+        '# TYPE django_http_request_duration_seconds histogram',
+    ]
+    for vista, datos in sorted(vistas.items()):
+        acumulado = 0
+        for limite, cuenta in zip(LIMITES_LATENCIA, datos['intervalos']):
+            acumulado += cuenta
+            lineas.append('django_http_request_duration_seconds_bucket{%s} %d' % (_etiquetas(view=vista, le=limite), acumulado))
+        lineas.append('django_http_request_duration_seconds_bucket{%s} %d' % (_etiquetas(view=vista, le='+Inf'), datos['cuenta']))
+        lineas.append('django_http_request_duration_seconds_sum{%s} %.6f' % (_etiquetas(view=vista), datos['segundos']))
+        lineas.append('django_http_request_duration_seconds_count{%s} %d' % (_etiquetas(view=vista), datos['cuenta']))
+
+    for nombre, tipo, ayuda, campo, formato in (
+        ('django_db_queries_total', 'counter', 'Consultas SQL por vista.', 'consultas', '%d'),
+        ('django_db_query_duration_seconds_total', 'counter', 'Tiempo en consultas SQL por vista.', 'segundos_bd', '%.6f'),
+        ('django_http_response_size_bytes_total', 'counter', 'Bytes de respuesta por vista (sin respuestas en streaming).', 'bytes', '%d'),
+    ):
+        lineas += ['# HELP %s %s' % (nombre, ayuda), '# TYPE %s %s' % (nombre, tipo)]
+        for vista, datos in sorted(vistas.items()):
+            lineas.append(('%s{%s} ' + formato) % (nombre, _etiquetas(view=vista), datos[campo]))
+
+    consentimientos = metricas['consentimientos']
+    if consentimientos:
+        for nombre, tipo, ayuda, campo in (
+            ('consent_buffer_pending', 'gauge', 'Registros de consentimiento en cola pendientes de guardar.', 'pendientes'),
+            ('consent_buffer_enqueued_total', 'counter', 'Registros de consentimiento encolados.', 'encolados'),
+            ('consent_buffer_written_total', 'counter', 'Registros de consentimiento guardados.', 'escritos'),
+            ('consent_buffer_overflows_total', 'counter', 'Registros guardados de forma síncrona con la cola llena.', 'desbordes'),
+            ('consent_buffer_failed_total', 'counter', 'Registros de consentimiento que no se pudieron guardar.', 'fallidos'),
+        ):
+            lineas += ['# HELP %s %s' % (nombre, ayuda), '# TYPE %s %s' % (nombre, tipo)]
+            lineas.append('%s %d' % (nombre, consentimientos.get(campo, 0)))
+    return '\n'.join(lineas) + '\n'
+
+
+class _ContadorConsultas:
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        if not habilitado():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Se crea ya para que su volcado en atexit sea el último y recoja lo
+        # que el buffer de consentimientos guarde al terminar el proceso
+        obtener_colector()
+
+    def __call__(self, request):
+        contador = _ContadorConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(contador))
+            respuesta = self.get_response(request)
+        segundos = time.perf_counter() - inicio
+
+        vista = request.resolver_match.view_name if request.resolver_match else SIN_RESOLVER
+        metodo = request.method if request.method in METODOS else 'OTRO'
+        tamano = None if respuesta.streaming else len(respuesta.content)
+        obtener_colector().registrar(
+            vista, metodo, respuesta.status_code, segundos, contador.consultas, contador.segundos, tamano
+        )
+        return respuesta
@@ -0,0 +1,173 @@
+"""
+Paginación por clave (keyset / cursor).
+
+En lugar de OFFSET y COUNT(*), cada página se pide a partir de los valores de
+ordenación de la última (o primera) fila de la página anterior, de modo que
+el costo no depende de la profundidad de la página. Los cursores son opacos y
+van firmados para que no puedan manipularse.
+
+La ordenación debe terminar en un campo único (normalmente la pk) y sus
+campos no deben admitir NULL.
+"""
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.http import Http404
+from django.utils.translation import gettext_lazy as _
+
+
+SALT_CURSOR = 'gestion_riesgo.paginacion'
+SIGUIENTE = 'n'
+ANTERIOR = 'p'
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(valores, direccion):
+    return signing.dumps({'v': valores, 'd': direccion}, salt=SALT_CURSOR, compress=True)
+
+
+def decodificar_cursor(cursor):
+    try:
+        datos = signing.loads(cursor, salt=SALT_CURSOR)
+        valores, direccion = datos['v'], datos['d']
+    except (signing.BadSignature, KeyError, TypeError):
+        raise CursorInvalido(_('Cursor de paginación inválido'))
+    if direccion not in (SIGUIENTE, ANTERIOR) or not isinstance(valores, list):
+        raise CursorInvalido(_('Cursor de paginación inválido'))
+    return valores, direccion
+
+
+class PaginaKeyset:
+    """Página de resultados con los cursores para la página siguiente y la anterior"""
+    def __init__(self, object_list, cursor_siguiente=None, cursor_anterior=None):
+        self.object_list = object_list
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = [
+            (campo.lstrip('-'), campo.startswith('-')) for campo in ordering
+        ]
+        self.per_page = per_page
+        opts = queryset.model._meta
+        self.campos = [
+            opts.pk if nombre == 'pk' else opts.get_field(nombre) for nombre, _desc in self.ordering
+        ]
+
+    def _valores(self, obj):
+        """Valores de ordenación de una fila, serializados como texto"""
+        return [
+            campo.value_to_string(obj) if nombre != 'pk' else str(obj.pk)
+            for campo, (nombre, _desc) in zip(self.campos, self.ordering)
+        ]
+
+    def _filtro(self, valores, direccion):
+        """Condición para las filas posteriores (o anteriores) a los valores dados"""
+        valores = [campo.to_python(valor) for campo, valor in zip(self.campos, valores)]
+        filtro = Q()
+        igualdad = Q()
+        for (nombre, descendente), valor in zip(self.ordering, valores):
+            mayor = descendente == (direccion == ANTERIOR)
+            filtro |= igualdad & Q(**{f"{nombre}__{'gt' if mayor else 'lt'}": valor})
+            igualdad &= Q(**{nombre: valor})
+        return filtro
+
+    def _orden(self, invertir=False):
+        return [
+            ('-' if descendente != invertir else '') + nombre
+            for nombre, descendente in self.ordering
+        ]
+
+    def page(self, cursor=None):
+        """Devuelve la página indicada por el cursor (la primera si no hay cursor)"""
+        queryset = self.queryset
+        direccion = SIGUIENTE
+        if cursor:
+            valores, direccion = decodificar_cursor(cursor)
+            if len(valores) != len(self.ordering):
+                raise CursorInvalido(_('Cursor de paginación inválido'))
+            try:
+                queryset = queryset.filter(self._filtro(valores, direccion))
+            except Exception:
+                raise CursorInvalido(_('Cursor de paginación inválido'))
+
+        # Se pide una fila de más para saber si hay otra página en esa dirección
+        filas = list(queryset.order_by(*self._orden(invertir=direccion == ANTERIOR))[:self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[:self.per_page]
+        if direccion == ANTERIOR:
+            filas.reverse()
+
+        if not filas:
+            return PaginaKeyset([])
+
+        hay_siguiente = hay_mas if direccion == SIGUIENTE else True
+        hay_anterior = bool(cursor) if direccion == SIGUIENTE else hay_mas
+        return PaginaKeyset(
+            filas,
+            cursor_siguiente=codificar_cursor(self._valores(filas[-1]), SIGUIENTE) if hay_siguiente else None,
+            cursor_anterior=codificar_cursor(self._valores(filas[0]), ANTERIOR) if hay_anterior else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin para ListView que pagina por cursor cuando PAGINACION_KEYSET está
+    activo o la petición trae un parámetro `cursor`. Las vistas indican la
+    ordenación con `keyset_ordering` o get_keyset_ordering(); si devuelve
+    None se usa la paginación estándar por número de página.
+    """
+    keyset_ordering = None
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def usa_keyset(self):
+        return self.get_keyset_ordering() is not None and (
+            getattr(settings, 'PAGINACION_KEYSET', False) or self.cursor_kwarg in self.request.GET
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.usa_keyset():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, self.get_keyset_ordering(), page_size)
+        try:
+            pagina = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except CursorInvalido as e:
+            raise Http404(str(e))
+        # Sin paginador numérico: la plantilla usa los cursores de page_obj
+        return (None, pagina, pagina.object_list, False)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['paginacion_keyset'] = isinstance(context.get('page_obj'), PaginaKeyset)
+        # Parámetros actuales sin página ni cursor, para conservarlos en los enlaces
+        parametros = self.request.GET.copy()
+        parametros.pop('page', None)
+        parametros.pop(self.cursor_kwarg, None)
+        context['parametros'] = parametros.urlencode()
+        return context
@@ -52,13 +52,17 @@ INSTALLED_APPS = [
     'crispy_bootstrap5',
     
     # Local apps
+    'gestion_riesgo.apps.GestionRiesgoConfig',
     'clientes.apps.ClientesConfig',
     'creditos.apps.CreditosConfig',
     'libro.apps.LibroConfig',  # Añadido para la aplicación libro
 ]
 
 MIDDLEWARE = [
+    'gestion_riesgo.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'gestion_riesgo.consultas.PresupuestoConsultasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -140,14 +144,101 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# En producción collectstatic genera nombres con hash del contenido y versiones
+# .gz/.br precomprimidas; WhiteNoise las sirve con caché inmutable de un año
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Documentos de clientes y análisis: cada contenido se guarda una vez (ver gestion_riesgo/almacenamiento.py)
+    'documentos': {
+        'BACKEND': 'gestion_riesgo.almacenamiento.AlmacenamientoPorContenido',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Horas sin uso tras las que gc_document_blobs puede borrar un blob sin referencias
+DOCUMENTOS_GC_MARGEN_HORAS = float(os.getenv('DOCUMENTOS_GC_MARGEN_HORAS', '24'))
+
+# Subidas de documentos por fragmentos (ver creditos/subidas.py). Los formularios usan el
+# envío multipart de siempre hasta SUBIDAS_UMBRAL bytes y fragmentos por encima
+SUBIDAS_DIR = os.getenv('SUBIDAS_DIR', str(BASE_DIR / 'subidas'))
+SUBIDAS_UMBRAL = int(os.getenv('SUBIDAS_UMBRAL', str(5 * 1024 * 1024)))
+SUBIDAS_TAMANO_FRAGMENTO = int(os.getenv('SUBIDAS_TAMANO_FRAGMENTO', str(8 * 1024 * 1024)))
+SUBIDAS_TAMANO_MAXIMO = int(os.getenv('SUBIDAS_TAMANO_MAXIMO', str(250 * 1024 * 1024)))
+# Horas sin actividad tras las que gc_document_blobs elimina una subida abandonada
+SUBIDAS_CADUCIDAD_HORAS = float(os.getenv('SUBIDAS_CADUCIDAD_HORAS', '24'))
 
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
+# Índice en memoria para el autocompletado de clientes (por worker)
+CLIENTES_INDICE_PREFIJOS = os.getenv('CLIENTES_INDICE_PREFIJOS', 'False') == 'True'
+# Segundos tras los que cada worker reconstruye el índice para recoger cambios de otros workers
+CLIENTES_INDICE_PREFIJOS_TTL = int(os.getenv('CLIENTES_INDICE_PREFIJOS_TTL', '300'))
+
+# Paginación por cursor (sin OFFSET ni COUNT) en las listas de clientes y análisis.
+# Aunque esté desactivada, las listas la usan cuando la petición trae un cursor.
+PAGINACION_KEYSET = os.getenv('PAGINACION_KEYSET', 'False') == 'True'
+
+# Escritura diferida de los registros de consentimiento de cookies (ver creditos/consent_buffer.py)
+CONSENT_BUFFER_ENABLED = os.getenv('CONSENT_BUFFER_ENABLED', 'True') == 'True'
+CONSENT_BUFFER_TAMANO_LOTE = int(os.getenv('CONSENT_BUFFER_TAMANO_LOTE', '100'))
+CONSENT_BUFFER_INTERVALO = float(os.getenv('CONSENT_BUFFER_INTERVALO', '2'))
+CONSENT_BUFFER_CAPACIDAD = int(os.getenv('CONSENT_BUFFER_CAPACIDAD', '10000'))
+# Directorio de los archivos JSONL comprimidos de archive_consent
+CONSENT_ARCHIVE_DIR = os.getenv('CONSENT_ARCHIVE_DIR', str(BASE_DIR / 'archivo' / 'consentimientos'))
+
+# Versión del despliegue: forma parte del ETag de las páginas cacheadas (ver gestion_riesgo/cache_paginas.py)
+DEPLOY_VERSION = os.getenv('DEPLOY_VERSION', '')
+# Segundos que las páginas de visitantes anónimos se guardan en la caché
+PAGINAS_CACHE_TIMEOUT = int(os.getenv('PAGINAS_CACHE_TIMEOUT', '3600'))
+# Segundos que se guardan los fragmentos de la ficha del cliente (referencias, documentos y
+# análisis); la clave cambia con cada modificación, así que no sirven datos viejos
+CLIENTES_DETALLE_CACHE_TIMEOUT = int(os.getenv('CLIENTES_DETALLE_CACHE_TIMEOUT', '86400'))
+
+# Simulación Monte Carlo de pérdidas (ver creditos/simulacion.py): PD anual por banda de
+# riesgo, LGD por tipo de crédito y correlación con el factor sistémico
+SIMULACION_PD = {'EXC': 0.005, 'BUE': 0.015, 'ACE': 0.04, 'RIE': 0.12, 'NOE': 0.08}
+SIMULACION_LGD = {'PER': 0.65, 'HIP': 0.25, 'AUT': 0.45, 'EDU': 0.6, 'OTR': 0.6}
+SIMULACION_CORRELACION = float(os.getenv('SIMULACION_CORRELACION', '0.12'))
+# Procesos de la simulación (0: uno por CPU)
+SIMULACION_PROCESOS = int(os.getenv('SIMULACION_PROCESOS', '0'))
+
+# Presupuesto de consultas SQL por petición (ver gestion_riesgo/consultas.py). Se registra un
+# aviso cuando una vista supera su presupuesto o repite consultas; los tests lo comprueban.
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET_ENABLED', str(DEBUG)) == 'True'
+# Máximo de consultas por nombre de URL
+QUERY_BUDGETS = {
+    'home': 2,
+    'clientes:lista': 4,
+    'clientes:detalle': 6,
+    'creditos:analisis_detalle': 5,
+    'creditos:panel_cartera': 6,
+    'creditos:simulacion_perdidas': 3,
+    'creditos:api_listar_clientes': 3,
+    'creditos:api_listar_analisis': 3,
+    'creditos:api_obtener_cliente': 3,
+}
+# Veces que una misma forma de consulta puede repetirse antes de considerarse un N+1
+QUERY_N1_UMBRAL = int(os.getenv('QUERY_N1_UMBRAL', '5'))
+
+# Métricas por vista en /metrics (ver gestion_riesgo/metricas.py); desactivadas sin token
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Directorio compartido por los workers donde cada proceso vuelca sus métricas
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / 'metricas'))
+# Segundos entre volcados de las métricas de cada proceso
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
 # Auth redirects
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'curso'
@@ -0,0 +1,65 @@
+"""
+Utilidades para los tests: comprobación del presupuesto de consultas SQL
+por URL (QUERY_BUDGETS) con el mismo análisis que PresupuestoConsultasMiddleware,
+y datos de prueba de clientes y análisis compartidos por los tests de las apps.
+"""
+from datetime import date
+
+from clientes.models import Cliente
+from creditos.models import AnalisisCredito
+from .consultas import analizar, describir, presupuesto, registrar_consultas
+
+
+# Solicitud de crédito válida: puntaje 700 (Bueno), cuota de 470,73
+SOLICITUD = {
+    'ingresos_mensuales': 3000,
+    'gastos_mensuales': 1500,
+    'deuda_actual': 2000,
+    'monto_solicitado': 10000,
+    'plazo_meses': 24,
+    'tasa_interes': 12,
+}
+
+
+def crear_cliente(numero='12345678', **kwargs):
+    datos = {
+        'numero_identificacion': numero,
+        'nombres': 'Ana',
+        'apellidos': 'Pérez',
+        'fecha_nacimiento': date(1985, 5, 20),
+        'lugar_nacimiento': 'Valencia',
+        'estado_civil': 'soltero',
+        'direccion': 'Calle Mayor 1',
+        'telefono': '600000000',
+        'celular': '600000001',
+        'ocupacion': 'Contadora',
+        'lugar_trabajo': 'Empresa S.A.',
+        'ingreso_mensual': 3000,
+    }
+    datos.update(kwargs)
+    return Cliente.objects.create(**datos)
+
+
+def crear_analisis(cliente, **kwargs):
+    datos = dict(SOLICITUD)
+    datos.update(kwargs)
+    return AnalisisCredito.objects.create(cliente=cliente, **datos)
+
+
+class PresupuestoConsultasMixin:
+    """
+    Mixin para TestCase. get_con_presupuesto hace un GET con el cliente de
+    pruebas y falla si la URL no declara presupuesto, si lo supera o si hay
+    consultas duplicadas o repetidas (N+1).
+    """
+    def get_con_presupuesto(self, ruta, datos=None, **extra):
+        with registrar_consultas() as registro:
+            respuesta = self.client.get(ruta, datos, **extra)
+        nombre_vista = respuesta.resolver_match.view_name
+        limite = presupuesto(nombre_vista)
+        if limite is None:
+            self.fail('%s no declara presupuesto de consultas en QUERY_BUDGETS' % nombre_vista)
+        analisis = analizar(registro.consultas)
+        if analisis['total'] > limite or analisis['duplicadas'] or analisis['repetidas']:
+            self.fail(describir(nombre_vista, analisis, limite))
+        return respuesta
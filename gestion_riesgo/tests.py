@@ -0,0 +1,178 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from clientes.models import ReferenciaPersonal
+from creditos import consent_buffer
+from creditos.consent_buffer import BufferConsentimientos
+from creditos.models import ConsentLog
+from .checks import comprobar_estaticos_en_plantillas
+from . import carga, metricas
+from .consultas import analizar, normalizar_sql
+from .testing import PresupuestoConsultasMixin, crear_analisis, crear_cliente
+
+
+class CachePaginasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_anonimo_cacheado_y_condicional(self):
+        url = reverse('politica_cookies')
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('Cookie', respuesta['Vary'])
+        etag = respuesta['ETag']
+
+        with mock.patch('django.views.generic.base.TemplateResponseMixin.render_to_response') as render:
+            repetida = self.client.get(url)
+            render.assert_not_called()
+        self.assertEqual(repetida.content, respuesta.content)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified']).status_code, 304
+        )
+
+    def test_etag_por_usuario_y_version(self):
+        url = reverse('home')
+        anonimo = self.client.get(url)['ETag']
+        with override_settings(DEPLOY_VERSION='otra'):
+            self.assertNotEqual(self.client.get(url)['ETag'], anonimo)
+
+        usuario = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(usuario)
+        respuesta = self.client.get(url)
+        self.assertNotEqual(respuesta['ETag'], anonimo)
+        self.assertIn('private', respuesta['Cache-Control'])
+        self.assertContains(respuesta, 'analista')
+
+
+class EstaticosSinHashTests(TestCase):
+    def test_plantillas_del_proyecto_sin_errores(self):
+        self.assertEqual(comprobar_estaticos_en_plantillas(None), [])
+
+    def test_detecta_referencia_escrita_a_mano(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            (Path(directorio) / 'pagina.html').write_text(
+                '{% load static %}\n<link href="{% static \'css/styles.css\' %}">\n<img src="/static/img/logo.png">\n'
+            )
+            plantillas = [{'BACKEND': 'django.template.backends.django.DjangoTemplates', 'DIRS': [directorio]}]
+            with override_settings(TEMPLATES=plantillas):
+                errores = comprobar_estaticos_en_plantillas(None)
+        self.assertEqual([error.id for error in errores], ['gestion_riesgo.E001'])
+        self.assertIn('pagina.html:3', errores[0].msg)
+
+
+class PresupuestoConsultasTests(PresupuestoConsultasMixin, TestCase):
+    def test_detecta_duplicadas_y_n1(self):
+        self.assertEqual(
+            normalizar_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND nombre = 'Ana' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND nombre = %s LIMIT %s'
+        )
+        consultas = [('SELECT * FROM t WHERE id = %s', (i,)) for i in range(5)] + [('SELECT 1', ())] * 2
+        analisis = analizar(consultas, umbral_n1=5)
+        self.assertEqual(analisis['total'], 7)
+        self.assertEqual(analisis['duplicadas'], [('SELECT 1', 2)])
+        self.assertEqual(analisis['repetidas'], [('SELECT * FROM t WHERE id = %s', 5)])
+
+    def test_vistas_dentro_del_presupuesto(self):
+        cliente = crear_cliente()
+        for i in range(3):
+            ReferenciaPersonal.objects.create(
+                cliente=cliente, nombre_completo='Referencia %d' % i, parentesco='Hermano',
+                telefono='600000000', direccion='Calle Mayor 1'
+            )
+            crear_analisis(cliente, monto_solicitado=1000 * (i + 1))
+        user = get_user_model().objects.create_user('analista', password='clave-segura-123')
+        self.client.force_login(user)
+
+        self.get_con_presupuesto(reverse('home'))
+        self.get_con_presupuesto(reverse('clientes:lista'))
+        self.get_con_presupuesto(reverse('clientes:detalle', args=[cliente.pk]))
+        self.get_con_presupuesto(reverse('creditos:panel_cartera'))
+        self.get_con_presupuesto(reverse('creditos:simulacion_perdidas'))
+        self.get_con_presupuesto(reverse('creditos:api_listar_clientes'))
+        self.get_con_presupuesto(reverse('creditos:api_listar_analisis'))
+        self.get_con_presupuesto(reverse('creditos:api_obtener_cliente', args=[cliente.pk]))
+        # creditos:analisis_detalle no se comprueba: su plantilla usa humanize (no instalado), un
+        # filtro div inexistente y URLs que no existen (creditos:accion_analisis...), así que no se renderiza
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        ajustes = override_settings(METRICS_TOKEN='secreto', METRICS_DIR=directorio.name, METRICS_FLUSH_INTERVAL=0)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        colector = mock.patch.object(metricas, '_colector', None)
+        colector.start()
+        self.addCleanup(colector.stop)
+
+    def test_agrega_procesos_y_requiere_token(self):
+        self.client.get(reverse('politica_cookies'))
+        self.client.get(reverse('politica_cookies'))
+        # Métricas volcadas por otro worker
+        (self.directorio / 'metricas-999999.json').write_text(json.dumps({
+            'vistas': {'politica_cookies': dict(metricas._vista_vacia(), peticiones={'GET 200': 3}, cuenta=3)},
+            'consentimientos': None,
+        }))
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        respuesta = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        texto = respuesta.content.decode()
+        self.assertIn('django_http_requests_total{view="politica_cookies",method="GET",status="200"} 5', texto)
+        self.assertIn('django_http_request_duration_seconds_count{view="politica_cookies"} 5', texto)
+        self.assertIn('django_http_requests_total{view="metricas",method="GET",status="401"} 1', texto)
+
+    def test_contadores_del_buffer_de_consentimientos(self):
+        buffer = BufferConsentimientos(tamano_lote=10, capacidad=1)
+        with mock.patch.object(consent_buffer, '_buffer', buffer):
+            for _i in range(2):
+                buffer.registrar(ConsentLog(action='accept', expires_at=ConsentLog.default_expiry()), iniciar_hilo=False)
+            (self.directorio / 'metricas-999999.json').write_text(json.dumps({
+                'vistas': {},
+                'consentimientos': {'pendientes': 0, 'encolados': 5, 'escritos': 4, 'desbordes': 0, 'fallidos': 1},
+            }))
+            texto = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+
+        self.assertIn('# TYPE consent_buffer_pending gauge\nconsent_buffer_pending 1\n', texto)
+        self.assertIn('consent_buffer_enqueued_total 6\n', texto)
+        self.assertIn('consent_buffer_written_total 5\n', texto)
+        self.assertIn('consent_buffer_overflows_total 1\n', texto)
+        self.assertIn('consent_buffer_failed_total 1\n', texto)
+
+    def test_sin_token_desactivado(self):
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class PruebaCargaTests(LiveServerTestCase):
+    def test_sesion_de_analista_contra_servidor(self):
+        get_user_model().objects.create_user('analista', password='clave-segura-123')
+        informe = carga.ejecutar_prueba(
+            self.live_server_url, 'analista', 'clave-segura-123', concurrencia=2, sesiones=1, escritura=False
+        )
+        urls = informe['urls']
+        self.assertEqual(informe['sesiones_completadas'], 2)
+        self.assertEqual(urls['login']['peticiones'], 4)
+        self.assertEqual(urls['creditos:api_v2_calcular_puntaje']['errores'], 0)
+        self.assertEqual(urls['clientes:lista']['estados'], {'200': 4})
+        self.assertLessEqual(urls['*']['p50_ms'], urls['*']['p99_ms'])
+
+        peor = json.loads(json.dumps(informe))
+        peor['urls']['clientes:lista']['p99_ms'] = urls['clientes:lista']['p99_ms'] * 2
+        estados = {fila['nombre']: fila['estado'] for fila in carga.comparar(informe, peor)}
+        self.assertEqual(estados['clientes:lista'], 'regresion')
+        self.assertEqual(estados['login'], 'igual')
+
+        with self.assertRaises(carga.ErrorInicioSesion):
+            carga.ejecutar_prueba(self.live_server_url, 'analista', 'incorrecta', concurrencia=1, sesiones=1)
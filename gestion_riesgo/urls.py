@@ -24,6 +24,7 @@ from django.contrib.auth.decorators import login_required
 
 # Import views
 from . import views
+from .cache_paginas import cache_pagina
 
 urlpatterns = [
     # Admin
@@ -47,10 +48,13 @@ urlpatterns = [
     # API
     path('api/consent/', views.log_consent, name='api_consent'),
     
+    # Métricas (Prometheus)
+    path('metrics', views.metricas, name='metricas'),
+    
     # Legal
-    path('legal/aviso-legal/', TemplateView.as_view(template_name='legal/aviso_legal.html'), name='aviso_legal'),
-    path('legal/politica-privacidad/', TemplateView.as_view(template_name='legal/politica_privacidad.html'), name='politica_privacidad'),
-    path('legal/politica-cookies/', TemplateView.as_view(template_name='legal/politica_cookies.html'), name='politica_cookies'),
+    path('legal/aviso-legal/', cache_pagina(TemplateView.as_view(template_name='legal/aviso_legal.html')), name='aviso_legal'),
+    path('legal/politica-privacidad/', cache_pagina(TemplateView.as_view(template_name='legal/politica_privacidad.html')), name='politica_privacidad'),
+    path('legal/politica-cookies/', cache_pagina(TemplateView.as_view(template_name='legal/politica_cookies.html')), name='politica_cookies'),
     
     # Test pages - wrapped in login_required using the method_decorator
     path('test-responsive/', 
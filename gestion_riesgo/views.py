@@ -1,12 +1,19 @@
+import hmac
+
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.views.generic import TemplateView
 import json
 
+from . import metricas as metricas_proceso
+from .cache_paginas import cache_pagina
+
 # Create your views here.
+@cache_pagina
 def home(request):
     """
     Vista para la página de inicio
@@ -24,6 +31,7 @@ def curso(request):
     return render(request, 'curso.html', context)
 
 @login_required
+@cache_pagina
 def libro_riesgo_credito(request):
     context = {
         'title': 'Libro: ¿Qué es el riesgo de crédito?'
@@ -31,6 +39,7 @@ def libro_riesgo_credito(request):
     return render(request, 'libro/intro_riesgo_credito.html', context)
 
 @login_required
+@cache_pagina
 def libro_portada(request):
     context = {
         'title': 'Libro: Riesgo de Crédito',
@@ -72,8 +81,9 @@ def log_consent(request):
     user = request.user if request.user.is_authenticated else None
 
     try:
+        from creditos import consent_buffer
         from creditos.models import ConsentLog
-        ConsentLog.objects.create(
+        consentimiento = ConsentLog(
             action=action or 'update',
             analytics=analytics,
             expires_at=expires_at,
@@ -81,8 +91,33 @@ def log_consent(request):
             user_agent=ua,
             user=user,
         )
+        if consent_buffer.habilitado():
+            # Escritura diferida por lotes; con la cola llena se guarda en el momento
+            if not consent_buffer.obtener_buffer().registrar(consentimiento):
+                return JsonResponse({'status': 'ok', 'logged': False})
+        else:
+            consentimiento.save()
     except Exception as e:
         # Evitar romper UX si hay un problema guardando
         return JsonResponse({'status': 'ok', 'logged': False})
 
     return JsonResponse({'status': 'ok', 'logged': True})
+
+
+def metricas(request):
+    """
+    Métricas de todos los workers en formato de texto de Prometheus. Requiere
+    el token METRICS_TOKEN en la cabecera "Authorization: Bearer <token>";
+    sin token configurado la URL no existe.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404
+    autorizacion = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(autorizacion.encode(), ('Bearer ' + token).encode()):
+        return HttpResponse('No autorizado\n', status=401, content_type='text/plain; charset=utf-8',
+                            headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(
+        metricas_proceso.exponer(metricas_proceso.obtener_colector().agregado()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,10 +1,14 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
+from gestion_riesgo.cache_paginas import cache_pagina
+
 @login_required
+@cache_pagina
 def libro_portada(request):
     return render(request, 'libro/portada.html')
 
 @login_required
+@cache_pagina
 def libro_intro(request):
     return render(request, 'libro/intro_riesgo_credito.html')
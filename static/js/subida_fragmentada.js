@@ -0,0 +1,165 @@
+/*
+ * Subida de documentos por fragmentos, reanudable (ver creditos/subidas.py).
+ *
+ * Se activa en los formularios con data-subida-url (URL de inicio de la
+ * subida), data-subida-destino ('analisis' o 'cliente'), data-subida-objeto
+ * (su id) y data-subida-umbral (bytes). Los archivos hasta el umbral, o si el
+ * navegador no tiene fetch y crypto.subtle, se envían con el formulario como
+ * siempre. Si la subida se interrumpe, al volver a enviar el mismo archivo se
+ * continúa desde el último fragmento recibido.
+ */
+(function () {
+    'use strict';
+
+    const REINTENTOS = 5;
+
+    function hexadecimal(buffer) {
+        return Array.from(new Uint8Array(buffer), function (b) {
+            return b.toString(16).padStart(2, '0');
+        }).join('');
+    }
+
+    function esperar(milisegundos) {
+        return new Promise(function (resolver) { setTimeout(resolver, milisegundos); });
+    }
+
+    async function peticion(url, opciones) {
+        const respuesta = await fetch(url, Object.assign({credentials: 'same-origin'}, opciones));
+        let datos = null;
+        try {
+            datos = await respuesta.json();
+        } catch (e) {
+            datos = {success: false, error: respuesta.statusText};
+        }
+        if (!respuesta.ok || !datos.success) {
+            const error = new Error(datos.error || respuesta.statusText);
+            error.estado = respuesta.status;
+            throw error;
+        }
+        return datos;
+    }
+
+    async function enviarFragmento(url, cuerpo, cabeceras) {
+        // Reintentos con espera creciente ante cortes de red y errores del servidor
+        for (let intento = 0; ; intento++) {
+            try {
+                return await peticion(url, {method: 'PUT', headers: cabeceras, body: cuerpo});
+            } catch (error) {
+                const reintentable = error.estado === undefined || error.estado >= 500;
+                if (!reintentable || intento + 1 >= REINTENTOS) {
+                    throw error;
+                }
+                await esperar(1000 * Math.pow(2, intento));
+            }
+        }
+    }
+
+    async function subir(form, archivo, progreso) {
+        const token = form.elements.csrfmiddlewaretoken.value;
+        const cabecerasJson = {'Content-Type': 'application/json', 'X-CSRFToken': token};
+        const clave = ['subida', form.dataset.subidaDestino, form.dataset.subidaObjeto,
+                       archivo.name, archivo.size, archivo.lastModified].join(':');
+
+        let subida = null;
+        const pendiente = window.localStorage.getItem(clave);
+        if (pendiente) {
+            try {
+                subida = (await peticion(pendiente, {headers: cabecerasJson})).subida;
+            } catch (error) {
+                window.localStorage.removeItem(clave);
+            }
+        }
+        if (!subida) {
+            const datos = {
+                tipo_documento: form.elements.tipo_documento.value,
+                notas: form.elements.notas ? form.elements.notas.value : '',
+                nombre_archivo: archivo.name,
+                tamano: archivo.size
+            };
+            datos[form.dataset.subidaDestino] = form.dataset.subidaObjeto;
+            subida = (await peticion(form.dataset.subidaUrl, {
+                method: 'POST', headers: cabecerasJson, body: JSON.stringify(datos)
+            })).subida;
+            window.localStorage.setItem(clave, subida.url);
+        }
+
+        // Cada fragmento se lee y se resume por separado: nunca hay más de uno en memoria
+        const resumenes = [];
+        let recibidos = subida.fragmentos_recibidos;
+        let numero = 0;
+        while (numero < subida.total_fragmentos) {
+            const inicio = numero * subida.tamano_fragmento;
+            const cuerpo = await archivo.slice(inicio, inicio + subida.tamano_fragmento).arrayBuffer();
+            const resumen = await window.crypto.subtle.digest('SHA-256', cuerpo);
+            resumenes[numero] = new Uint8Array(resumen);
+            if (numero >= recibidos) {
+                try {
+                    recibidos = (await enviarFragmento(subida.url + 'fragmentos/' + numero + '/', cuerpo, {
+                        'Content-Type': 'application/octet-stream',
+                        'X-CSRFToken': token,
+                        'X-Checksum-SHA256': hexadecimal(resumen)
+                    })).subida.fragmentos_recibidos;
+                } catch (error) {
+                    if (error.estado !== 409) {
+                        throw error;
+                    }
+                    // El servidor espera otro fragmento: seguir desde el que indique
+                    recibidos = (await peticion(subida.url, {headers: cabecerasJson})).subida.fragmentos_recibidos;
+                    numero = Math.min(numero, recibidos);
+                    continue;
+                }
+            }
+            numero++;
+            progreso(numero / subida.total_fragmentos);
+        }
+
+        const concatenados = new Uint8Array(resumenes.length * 32);
+        resumenes.forEach(function (resumen, indice) { concatenados.set(resumen, indice * 32); });
+        const sha256 = hexadecimal(await window.crypto.subtle.digest('SHA-256', concatenados));
+        const resultado = await peticion(subida.url + 'finalizar/', {
+            method: 'POST', headers: cabecerasJson, body: JSON.stringify({sha256: sha256})
+        });
+        window.localStorage.removeItem(clave);
+        return resultado;
+    }
+
+    function barraProgreso(form) {
+        let barra = form.querySelector('.progress-bar');
+        if (!barra) {
+            const contenedor = document.createElement('div');
+            contenedor.className = 'progress mt-3';
+            barra = document.createElement('div');
+            barra.className = 'progress-bar';
+            barra.setAttribute('role', 'progressbar');
+            contenedor.appendChild(barra);
+            form.appendChild(contenedor);
+        }
+        return function (fraccion) {
+            barra.style.width = Math.round(fraccion * 100) + '%';
+            barra.textContent = Math.round(fraccion * 100) + '%';
+        };
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('form[data-subida-url]').forEach(function (form) {
+            form.addEventListener('submit', async function (evento) {
+                const campo = form.elements.archivo;
+                if (evento.defaultPrevented || !campo || !campo.files.length ||
+                        campo.files[0].size <= Number(form.dataset.subidaUmbral) ||
+                        !window.fetch || !window.crypto || !window.crypto.subtle) {
+                    return;  // Envío multipart normal
+                }
+                evento.preventDefault();
+                const botones = form.querySelectorAll('[type=submit]');
+                botones.forEach(function (boton) { boton.disabled = true; });
+                try {
+                    const resultado = await subir(form, campo.files[0], barraProgreso(form));
+                    window.location.href = resultado.redirect;
+                } catch (error) {
+                    alert((form.dataset.subidaError || '') + '\n' + error.message);
+                    botones.forEach(function (boton) { boton.disabled = false; });
+                }
+            });
+        });
+    });
+})();